@@ -0,0 +1,89 @@
+"""
+Per-athlete cost of turning a year of activities into daily metrics, with
+rest days filled by placeholder Activity objects (add_missing_dates) versus
+indexed directly on the calendar
+
+    python -m benchmarks.gap_filling --runs-per-week 4 --repeat 50
+"""
+
+import argparse
+import datetime
+import random
+import time
+import tracemalloc
+from typing import Callable, List
+
+from src.activities import (
+    add_missing_dates,
+    aggregate_daily_activity,
+    aggregate_daily_metrics,
+)
+from src.types.activity import Activity
+
+
+def get_activities(
+    start_date: datetime.datetime, n_weeks: int, runs_per_week: int, seed: int = 0
+) -> List[Activity]:
+    """A year of synthetic runs on random days of each week"""
+    rng = random.Random(seed)
+    activities = []
+    for week in range(n_weeks):
+        for day in sorted(rng.sample(range(7), runs_per_week)):
+            start = start_date + datetime.timedelta(weeks=week, days=day, hours=7)
+            activities.append(
+                Activity(
+                    id=rng.randrange(10**9),
+                    distance=rng.uniform(3000, 30000),
+                    total_elevation_gain=rng.uniform(0, 300),
+                    moving_time=datetime.timedelta(seconds=rng.uniform(900, 9000)),
+                    start_date=start,
+                    start_date_local=start,
+                )
+            )
+    return activities
+
+
+def measure(func: Callable, repeat: int) -> tuple:
+    """Mean seconds per call and peak bytes allocated by a single call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    seconds = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs-per-week", type=int, default=4)
+    parser.add_argument("--num-weeks", type=int, default=52)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    end_date = datetime.datetime(2024, 11, 15, 20)
+    start_date = end_date - datetime.timedelta(weeks=args.num_weeks)
+    activities = get_activities(start_date, args.num_weeks, args.runs_per_week)
+
+    candidates = {
+        "placeholders + list aggregation": lambda: aggregate_daily_metrics(
+            add_missing_dates(activities, start_date, end_date)
+        ),
+        "placeholders + columnar aggregation": lambda: aggregate_daily_activity(
+            add_missing_dates(activities, start_date, end_date)
+        ),
+        "calendar-indexed columnar aggregation": lambda: aggregate_daily_activity(
+            activities, start_date=start_date, end_date=end_date
+        ),
+    }
+    print(f"{len(activities)} activities over {args.num_weeks} weeks, per athlete:")
+    for name, func in candidates.items():
+        seconds, peak = measure(func, args.repeat)
+        print(f"  {name:<40} {seconds * 1000:8.2f} ms {peak / 1024:10.1f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+End-to-end update pipeline benchmark over recorded sessions
+
+Record a session against the real services (run with TEST_FLAG=true to keep
+the training week upserts out of the production tables):
+
+    python -m benchmarks.replay_pipeline record fixtures/mid_week.pkl \
+        --athlete-ids 1 2 3 --exe-type mid_week
+
+Replay it offline with injected latency:
+
+    python -m benchmarks.replay_pipeline replay fixtures/mid_week.pkl \
+        --llm-latency 2 --strava-latency 0.5 --db-latency 0.05 --max-workers 16
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import time
+
+from src import metrics, replay, supabase_client, update_pipeline, utils
+from src.types.replay import LatencyConfig, ReplayMode
+from src.types.update_pipeline import ConcurrencyConfig, ExeType
+
+
+def run(args: argparse.Namespace, replay_session: replay.ReplaySession) -> dict:
+    """
+    Run the update pipeline over the session's users and summarize throughput
+
+    :param args: parsed command line arguments
+    :param replay_session: active ReplaySession
+    :return: summarize_run output
+    """
+    metadata = replay_session.metadata
+    exe_type = ExeType(metadata["exe_type"])
+    dt = metadata["dt"]
+    users = [
+        supabase_client.get_user(athlete_id) for athlete_id in metadata["athlete_ids"]
+    ]
+
+    start_time = time.perf_counter()
+    with metrics.track_run() as run_stages:
+        if args.use_async:
+            responses = asyncio.run(
+                update_pipeline.update_users_async(
+                    users,
+                    exe_type,
+                    dt,
+                    concurrency_config=ConcurrencyConfig(max_workers=args.max_workers),
+                )
+            )
+        else:
+            concurrency_config = (
+                ConcurrencyConfig(max_workers=args.max_workers)
+                if args.max_workers > 1
+                else None
+            )
+            responses = update_pipeline.update_users(
+                users, exe_type, dt, concurrency_config=concurrency_config
+            )
+    return update_pipeline.summarize_run(
+        responses,
+        exe_type=exe_type,
+        start_time=start_time,
+        run_id=f"{args.mode}:{args.fixture}",
+        run_stages=run_stages,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("mode", type=ReplayMode, choices=list(ReplayMode))
+    parser.add_argument("fixture")
+    parser.add_argument("--athlete-ids", type=int, nargs="+", default=[])
+    parser.add_argument("--exe-type", type=ExeType, default=ExeType.MID_WEEK)
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--use-async", action="store_true")
+    parser.add_argument("--strava-latency", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--db-latency", type=float, default=0.0)
+    parser.add_argument(
+        "--loose",
+        action="store_true",
+        help="replay calls whose arguments changed since recording",
+    )
+    args = parser.parse_args()
+
+    # start every run from cold local stores so it reads Strava in full
+    os.environ.setdefault("ACTIVITY_STORE_DB_PATH", ":memory:")
+    os.environ.setdefault("FEATURE_STORE_DB_PATH", ":memory:")
+
+    latency = LatencyConfig(
+        strava=args.strava_latency, llm=args.llm_latency, db=args.db_latency
+    )
+    with replay.session(
+        args.fixture, args.mode, latency=latency, strict=not args.loose
+    ) as replay_session:
+        if args.mode == ReplayMode.RECORD:
+            replay_session.metadata = {
+                "athlete_ids": args.athlete_ids,
+                "exe_type": args.exe_type,
+                "dt": (
+                    utils.get_last_sunday()
+                    if args.exe_type == ExeType.NEW_WEEK
+                    else utils.datetime_now_est()
+                ),
+                "recorded_at": datetime.datetime.now(datetime.timezone.utc),
+            }
+        print(json.dumps(run(args, replay_session), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cost of computing rolling training load (acute/chronic workload, ramp rate,
+monotony) for the whole user base in one pass over a stacked athletes x days
+matrix versus looping over each athlete's days in Python
+
+    python -m benchmarks.training_load --num-athletes 10000 --num-days 365
+"""
+
+import argparse
+import datetime
+import statistics
+import time
+import tracemalloc
+from typing import List
+
+import numpy as np
+from src.training_load import ACUTE_WINDOW, CHRONIC_WINDOW, compute_training_load
+
+
+def get_daily_load(num_athletes: int, num_days: int, seed: int = 0) -> np.ndarray:
+    """Synthetic miles per day, with rest days on about a third of them"""
+    rng = np.random.default_rng(seed)
+    daily_load = np.round(rng.uniform(2, 14, (num_athletes, num_days)), 2)
+    daily_load[rng.random(daily_load.shape) < 0.35] = 0
+    return daily_load
+
+
+def get_training_load_per_athlete(daily_load: List[float]) -> List[tuple]:
+    """The per-user loop: every day's windows summed from the athlete's list"""
+    training_load = []
+    for day in range(CHRONIC_WINDOW - 1, len(daily_load)):
+        week = daily_load[day - ACUTE_WINDOW + 1 : day + 1]
+        previous_week = daily_load[day - 2 * ACUTE_WINDOW + 1 : day - ACUTE_WINDOW + 1]
+        acute = sum(week)
+        chronic = sum(daily_load[day - CHRONIC_WINDOW + 1 : day + 1]) / 4
+        previous = sum(previous_week)
+        std = statistics.pstdev(week)
+        training_load.append(
+            (
+                acute,
+                chronic,
+                acute / chronic if chronic else None,
+                (acute - previous) / previous if previous else None,
+                acute / ACUTE_WINDOW / std if std else None,
+            )
+        )
+    return training_load
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--num-athletes", type=int, default=10000)
+    parser.add_argument("--num-days", type=int, default=365)
+    parser.add_argument(
+        "--loop-athletes",
+        type=int,
+        default=200,
+        help="athletes timed with the per-athlete loop, extrapolated to all",
+    )
+    args = parser.parse_args()
+
+    daily_load = get_daily_load(args.num_athletes, args.num_days)
+    first_date = datetime.date(2024, 1, 1)
+
+    start = time.perf_counter()
+    for athlete_load in daily_load[: args.loop_athletes].tolist():
+        get_training_load_per_athlete(athlete_load)
+    loop_seconds = (
+        (time.perf_counter() - start) / args.loop_athletes * args.num_athletes
+    )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    training_load = compute_training_load(daily_load, first_date)
+    vectorized_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    at_risk = training_load.get_injury_risk()[:, -1].sum()
+    print(f"{args.num_athletes} athletes x {args.num_days} days:")
+    print(f"  {'per-athlete loop (extrapolated)':<35} {loop_seconds:8.2f} s")
+    print(
+        f"  {'stacked matrix, one pass':<35} {vectorized_seconds:8.2f} s "
+        f"{peak / 1024**2:8.1f} MiB peak"
+    )
+    print(f"  {at_risk} athletes flagged at injury risk on the last day")
+
+
+if __name__ == "__main__":
+    main()
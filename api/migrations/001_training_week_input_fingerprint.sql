@@ -0,0 +1,4 @@
+-- Fingerprint of the pipeline inputs each training week was generated from,
+-- used by update_pipeline.update_training_week to skip no-op regenerations
+alter table training_week add column if not exists input_fingerprint text;
+alter table test_training_week add column if not exists input_fingerprint text;
@@ -0,0 +1,12 @@
+-- Status of background /refresh/ jobs, polled via GET /refresh/{job_id}/.
+-- Kept in the database so any replica can report on a job another one runs
+create table if not exists refresh_job (
+    job_id text primary key,
+    athlete_id bigint not null,
+    status text not null,
+    steps_completed integer not null default 0,
+    total_steps integer not null,
+    error text,
+    updated_at timestamptz not null default now()
+);
+create table if not exists test_refresh_job (like refresh_job including all);
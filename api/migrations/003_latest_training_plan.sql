@@ -0,0 +1,34 @@
+-- Weeks of each athlete's most recent training plan, so
+-- supabase_client.get_training_plan fetches them in a single round trip.
+-- Every week of a plan is bulk inserted in one statement and shares its
+-- created_at, the plan_id tie-break only keeps the choice deterministic.
+-- The views run as the querying role (security_invoker) so the tables' row
+-- level security still applies, rather than as the view owner who bypasses it
+create index if not exists training_plan_athlete_id_created_at_idx
+    on training_plan (athlete_id, created_at desc);
+create index if not exists test_training_plan_athlete_id_created_at_idx
+    on test_training_plan (athlete_id, created_at desc);
+
+create or replace view latest_training_plan
+with (security_invoker = on) as
+select *
+from training_plan
+where plan_id = (
+    select latest.plan_id
+    from training_plan latest
+    where latest.athlete_id = training_plan.athlete_id
+    order by latest.created_at desc, latest.plan_id desc
+    limit 1
+);
+
+create or replace view test_latest_training_plan
+with (security_invoker = on) as
+select *
+from test_training_plan
+where plan_id = (
+    select latest.plan_id
+    from test_training_plan latest
+    where latest.athlete_id = test_training_plan.athlete_id
+    order by latest.created_at desc, latest.plan_id desc
+    limit 1
+);
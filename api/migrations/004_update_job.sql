@@ -0,0 +1,14 @@
+-- Per-athlete jobs of the nightly update runs, see src/job_queue.py.
+-- Kept in the database so a run survives redeploys and can be resumed or
+-- retried from any replica
+create table if not exists update_job (
+    run_id text not null,
+    athlete_id bigint not null,
+    exe_type text not null,
+    status text not null,
+    attempts integer not null default 0,
+    last_error text,
+    updated_at timestamptz not null default now(),
+    primary key (run_id, athlete_id)
+);
+create table if not exists test_update_job (like update_job including all);
@@ -0,0 +1,10 @@
+-- ExeType each training week was generated by, so update_pipeline compares
+-- input fingerprints against the last run of the same type: /refresh/ stores
+-- a new week row right before a mid-week one
+alter table training_week add column if not exists exe_type text;
+alter table test_training_week add column if not exists exe_type text;
+
+create index if not exists training_week_athlete_exe_type_created_at_idx
+    on training_week (athlete_id, exe_type, created_at desc);
+create index if not exists test_training_week_athlete_exe_type_created_at_idx
+    on test_training_week (athlete_id, exe_type, created_at desc);
@@ -0,0 +1,71 @@
+-- Strava activities and their daily & weekly totals, see src/activity_store.py,
+-- and the prompt features computed from them, see src/feature_store.py.
+-- Kept in the database so every replica sees the same activities, webhook
+-- events included, and a deploy does not refetch every athlete from Strava.
+-- Dates are ordinals (datetime.date.toordinal) and times epoch seconds
+create table if not exists activity (
+    athlete_id bigint not null,
+    activity_id bigint not null,
+    start_date double precision not null,
+    local_date integer not null,
+    distance double precision not null,
+    total_elevation_gain double precision not null,
+    moving_time double precision not null,
+    data text not null,
+    created_at timestamptz not null default now(),
+    primary key (athlete_id, activity_id)
+);
+create index if not exists activity_athlete_local_date_idx
+    on activity (athlete_id, local_date);
+create index if not exists activity_athlete_start_date_idx
+    on activity (athlete_id, start_date, activity_id);
+
+create table if not exists activity_sync (
+    athlete_id bigint primary key,
+    synced_after double precision not null,
+    synced_before double precision not null,
+    reconciled_at double precision not null,
+    created_at timestamptz not null default now()
+);
+
+create table if not exists activity_day (
+    athlete_id bigint not null,
+    local_date integer not null,
+    distance double precision not null,
+    total_elevation_gain double precision not null,
+    moving_time double precision not null,
+    activity_count integer not null,
+    created_at timestamptz not null default now(),
+    primary key (athlete_id, local_date)
+);
+
+create table if not exists activity_week (
+    athlete_id bigint not null,
+    week_start integer not null,
+    total_distance double precision not null,
+    longest_run double precision not null,
+    created_at timestamptz not null default now(),
+    primary key (athlete_id, week_start)
+);
+
+-- changes whenever an athlete's daily totals do, see ActivityStore.get_revision
+create table if not exists activity_revision (
+    athlete_id bigint primary key,
+    revision bigint not null,
+    created_at timestamptz not null default now()
+);
+
+-- single row identifying the store, see ActivityStore.get_generation
+create table if not exists activity_store (
+    id integer primary key check (id = 1),
+    generation text not null,
+    created_at timestamptz not null default now()
+);
+
+create table if not exists athlete_features (
+    athlete_id bigint not null,
+    week_start integer not null,
+    data text not null,
+    created_at timestamptz not null default now(),
+    primary key (athlete_id, week_start)
+);
@@ -1,9 +1,15 @@
+import asyncio
 import datetime
+import math
+import os
+import time
 from collections import defaultdict
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple, Union
 
-from src import constants
-from src.types.activity import Activity, DailyMetrics, WeekSummary
+import numpy as np
+from src import activity_store, constants, metrics
+from src.daily_activity import WEEKDAY_ABBREVIATIONS, DailyActivity
+from src.types.activity import Activity, DailyMetrics, DailyTotals, WeekSummary
 from src.utils import round_all_floats
 from stravalib.client import Client
 
@@ -94,74 +100,627 @@ def aggregate_daily_metrics(activities: List[Activity]) -> List[DailyMetrics]:
     return results
 
 
-def get_daily_activity(
-    strava_client: Client, dt: datetime.datetime, num_weeks: int = 8
+def _sum_by_day(
+    activities: List[Activity],
+    calendar: Optional[Tuple[datetime.date, datetime.date]] = None,
+) -> Tuple[np.ndarray, ...]:
+    """
+    Bucket activities by day index in bulk. Per-day sums accumulate in input
+    order like Python's sum does, so results match aggregate_daily_metrics
+    before rounding.
+
+    :param activities: List of Activity Pydantic models containing activity data
+    :param calendar: (first, last) day to index every day of, rest days
+        included, rather than only the days with activities
+    :return: ordinals of the days and, for each of these days, distance in
+        miles, elevation gain in feet, moving time in minutes, pace in minutes
+        per mile (NaN without distance) and activity count
+    """
+    n_activities = len(activities)
+    ordinals = np.fromiter(
+        (a.start_date_local.toordinal() for a in activities),
+        dtype=np.int64,
+        count=n_activities,
+    )
+    bounds = [int(ordinals.min()), int(ordinals.max())] if n_activities else []
+    if calendar is not None:
+        bounds += [calendar[0].toordinal(), calendar[1].toordinal()]
+    first_ordinal = min(bounds)
+    day_index = ordinals - first_ordinal
+    n_days = max(bounds) - first_ordinal + 1
+
+    def sum_by_day(values) -> np.ndarray:
+        weights = np.fromiter(values, dtype=np.float64, count=n_activities)
+        return np.bincount(day_index, weights=weights, minlength=n_days)
+
+    total_distance = sum_by_day(a.distance for a in activities)
+    total_elevation_gain = sum_by_day(a.total_elevation_gain for a in activities)
+    total_moving_time = sum_by_day(a.moving_time.total_seconds() for a in activities)
+    is_real = np.fromiter(
+        (a.id != -1 for a in activities), dtype=bool, count=n_activities
+    )
+    activity_count = np.bincount(day_index[is_real], minlength=n_days)
+
+    if calendar is None:
+        days = np.flatnonzero(np.bincount(day_index, minlength=n_days))
+    else:
+        days = np.arange(n_days)
+    return _to_daily_columns(
+        days + first_ordinal,
+        total_distance[days],
+        total_elevation_gain[days],
+        total_moving_time[days],
+        activity_count[days],
+    )
+
+
+def _to_daily_columns(
+    ordinals: np.ndarray,
+    total_distance: np.ndarray,
+    total_elevation_gain: np.ndarray,
+    total_moving_time: np.ndarray,
+    activity_count: np.ndarray,
+) -> Tuple[np.ndarray, ...]:
+    """
+    Convert per-day sums in Strava units to the daily metrics units
+
+    :return: ordinals of the days and, for each of these days, distance in
+        miles, elevation gain in feet, moving time in minutes, pace in minutes
+        per mile (NaN without distance) and activity count
+    """
+    pace_minutes_per_mile = np.divide(
+        total_moving_time / 60,
+        total_distance / constants.METERS_PER_MILE,
+        out=np.full(len(ordinals), np.nan),
+        where=total_distance > 0,
+    )
+    return (
+        ordinals,
+        total_distance / constants.METERS_PER_MILE,
+        total_elevation_gain * constants.FEET_PER_METER,
+        total_moving_time / 60,
+        pace_minutes_per_mile,
+        activity_count,
+    )
+
+
+def _round(values: np.ndarray, precision: int = 2) -> np.ndarray:
+    """
+    Python's round over an array, np.round rounds differently. Zeros (rest
+    days) are left as they are.
+
+    :param values: array of floats
+    :param precision: number of decimals
+    :return: rounded copy of values
+    """
+    rounded = values.copy()
+    nonzero = np.flatnonzero(values)
+    rounded[nonzero] = [round(value, precision) for value in values[nonzero].tolist()]
+    return rounded
+
+
+def aggregate_daily_metrics_vectorized(
+    activities: List[Activity],
 ) -> List[DailyMetrics]:
+    """
+    NumPy-backed aggregate_daily_metrics, bucketing activities by day index in
+    bulk instead of grouping them into per-day lists. The output matches
+    aggregate_daily_metrics exactly: per-day sums accumulate in input order
+    like Python's sum and rounding goes through Python's round.
+
+    :param activities: List of Activity Pydantic models containing activity data
+    :return: A list of DailyMetrics objects with aggregated and transformed metrics
+    """
+    ordinals, distance, elevation_gain, moving_time, pace, activity_count = _sum_by_day(
+        activities
+    )
+
+    results = [
+        DailyMetrics.construct(
+            date=activity_date,
+            day_of_week=WEEKDAY_ABBREVIATIONS[activity_date.weekday()],
+            week_of_year=iso_calendar.week,
+            year=iso_calendar.year,
+            distance_in_miles=distance_in_miles,
+            elevation_gain_in_feet=elevation_gain_in_feet,
+            moving_time_in_minutes=moving_time_in_minutes,
+            pace_minutes_per_mile=(
+                None if math.isnan(pace_minutes_per_mile) else pace_minutes_per_mile
+            ),
+            activity_count=count,
+        )
+        for (
+            ordinal,
+            distance_in_miles,
+            elevation_gain_in_feet,
+            moving_time_in_minutes,
+            pace_minutes_per_mile,
+            count,
+        ) in zip(
+            ordinals.tolist(),
+            _round(distance).tolist(),
+            _round(elevation_gain).tolist(),
+            _round(moving_time).tolist(),
+            _round(pace).tolist(),
+            activity_count.tolist(),
+        )
+        for activity_date in [datetime.date.fromordinal(ordinal)]
+        for iso_calendar in [activity_date.isocalendar()]
+    ]
+
+    # chop off remainder/leftover days near start date
+    first_year_week = (results[0].year, results[0].week_of_year)
+    return [
+        item for item in results if (item.year, item.week_of_year) != first_year_week
+    ]
+
+
+def aggregate_daily_activity(
+    activities: List[Activity],
+    start_date: Optional[datetime.datetime] = None,
+    end_date: Optional[datetime.datetime] = None,
+) -> DailyActivity:
+    """
+    Columnar aggregate_daily_metrics. Given start & end dates, every day of
+    the range is indexed directly, so rest days cost a zero in each column
+    rather than a placeholder Activity (see add_missing_dates). Holds the same
+    values as the DailyMetrics aggregate_daily_metrics would return for
+    add_missing_dates(activities, start_date, end_date).
+
+    :param activities: List of Activity Pydantic models containing activity data
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range.
+    :return: DailyActivity object
+    """
+    calendar = None
+    if start_date is not None and end_date is not None:
+        calendar = (start_date.date(), end_date.date())
+    return _to_daily_activity(*_sum_by_day(activities, calendar=calendar))
+
+
+def aggregate_daily_totals(
+    daily_totals: List[DailyTotals],
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+) -> DailyActivity:
+    """
+    aggregate_daily_activity over per-day totals the activity store keeps up
+    to date, every day from start to end date indexed directly
+
+    :param daily_totals: List of DailyTotals, ordered by date
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range.
+    :return: DailyActivity object
+    """
+    first_ordinal = start_date.date().toordinal()
+    n_days = end_date.date().toordinal() - first_ordinal + 1
+    day_index = np.fromiter(
+        (totals.date.toordinal() - first_ordinal for totals in daily_totals),
+        dtype=np.int64,
+        count=len(daily_totals),
+    )
+
+    def by_day(values, dtype=np.float64) -> np.ndarray:
+        column = np.zeros(n_days, dtype=dtype)
+        column[day_index] = np.fromiter(values, dtype=dtype, count=len(day_index))
+        return column
+
+    return _to_daily_activity(
+        *_to_daily_columns(
+            np.arange(n_days) + first_ordinal,
+            by_day(totals.distance for totals in daily_totals),
+            by_day(totals.total_elevation_gain for totals in daily_totals),
+            by_day(totals.moving_time for totals in daily_totals),
+            by_day((totals.activity_count for totals in daily_totals), np.int64),
+        )
+    )
+
+
+def _to_daily_activity(
+    ordinals: np.ndarray,
+    distance: np.ndarray,
+    elevation_gain: np.ndarray,
+    moving_time: np.ndarray,
+    pace: np.ndarray,
+    activity_count: np.ndarray,
+) -> DailyActivity:
+    """Round daily columns into a DailyActivity made of whole weeks"""
+    if len(ordinals) != ordinals[-1] - ordinals[0] + 1:
+        raise ValueError("aggregate_daily_activity requires activities on every day")
+
+    # chop off remainder/leftover days near start date, ordinal 1 is a Monday
+    first_ordinal = int(ordinals[0])
+    start = 7 - (first_ordinal - 1) % 7
+    return DailyActivity(
+        first_date=datetime.date.fromordinal(first_ordinal + start),
+        distance_in_miles=_round(distance[start:]),
+        elevation_gain_in_feet=_round(elevation_gain[start:]),
+        moving_time_in_minutes=_round(moving_time[start:]),
+        pace_minutes_per_mile=_round(pace[start:]),
+        activity_count=activity_count[start:],
+    )
+
+
+# activities started shortly before the last sync can still be uploaded after it
+SYNC_OVERLAP = datetime.timedelta(days=2)
+
+# edits & deletes older than SYNC_OVERLAP only reach the store through webhook
+# events, which can be missed (or reach another replica's local store); the
+# whole synced range is refetched once it was last fetched in full longer ago
+# than this
+RECONCILE_INTERVAL = datetime.timedelta(
+    days=float(os.getenv("ACTIVITY_STORE_RECONCILE_DAYS", 7))
+)
+
+
+# Strava's maximum page size, fewest round trips per fetch
+STRAVA_PAGE_SIZE = 200
+
+
+def _parse_strava_datetime(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def parse_run(raw: dict) -> Optional[Activity]:
+    """
+    Build an Activity out of a raw Strava activity, carrying only the fields
+    aggregation and the activity store use
+
+    :param raw: activity JSON as returned by the Strava API
+    :return: Activity object, None for other sport types
+    """
+    if raw.get("sport_type") != "Run":
+        return None
+    return Activity.construct(
+        id=raw["id"],
+        distance=float(raw["distance"]),
+        total_elevation_gain=float(raw["total_elevation_gain"]),
+        moving_time=datetime.timedelta(seconds=raw["moving_time"]),
+        start_date=_parse_strava_datetime(raw["start_date"]),
+        # local wall-clock time, naive like stravalib makes it
+        start_date_local=_parse_strava_datetime(raw["start_date_local"]).replace(
+            tzinfo=None
+        ),
+    )
+
+
+def fetch_run(strava_client: Client, activity_id: int) -> Optional[Activity]:
+    """
+    Fetch a single activity from Strava
+
+    :param strava_client: The Strava client object to fetch data.
+    :param activity_id: The ID of the activity
+    :return: Activity object, None if the activity is not a run
+    """
+    with metrics.timer("strava_fetch"):
+        return parse_run(strava_client.protocol.get("/activities/{id}", id=activity_id))
+
+
+def iter_runs(
+    strava_client: Client,
+    after: datetime.datetime,
+    before: datetime.datetime,
+    page_size: int = STRAVA_PAGE_SIZE,
+) -> Iterator[Activity]:
+    """
+    Lazily page through an athlete's activities started between after &
+    before, reading the raw JSON pages. Other sport types are dropped before
+    any model is built and runs only carry the fields aggregation and the
+    activity store use.
+
+    :param strava_client: The Strava client object to fetch data.
+    :param after: start of the range
+    :param before: end of the range
+    :param page_size: activities per page requested from Strava
+    :return: iterator of Activity objects
+    """
+    page = 1
+    while True:
+        raw_activities = strava_client.protocol.get(
+            "/athlete/activities",
+            after=int(activity_store.to_timestamp(after)),
+            before=int(activity_store.to_timestamp(before)),
+            page=page,
+            per_page=page_size,
+        )
+        for raw in raw_activities:
+            run = parse_run(raw)
+            if run is not None:
+                yield run
+        if len(raw_activities) < page_size:
+            return
+        page += 1
+
+
+def fetch_activities(
+    strava_client: Client, after: datetime.datetime, before: datetime.datetime
+) -> List[Activity]:
+    """
+    Fetch an athlete's runs started between after & before from Strava
+
+    :param strava_client: The Strava client object to fetch data.
+    :param after: start of the range
+    :param before: end of the range
+    :return: List of Activity objects
+    """
+    with metrics.timer("strava_fetch"):
+        return list(iter_runs(strava_client, after=after, before=before))
+
+
+def sync_activity_store(
+    strava_client: Client,
+    athlete_id: int,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    full_resync: bool = False,
+) -> None:
+    """
+    Bring the athlete's activity store up to date over [start_date, end_date].
+    Only the part of the range not synced before is fetched from Strava,
+    unless a full resync is requested or the athlete was last fetched in full
+    longer than RECONCILE_INTERVAL ago.
+
+    :param strava_client: The Strava client object to fetch data.
+    :param athlete_id: The ID of the athlete
+    :param start_date: start of the range
+    :param end_date: end of the range
+    :param full_resync: drop the stored activities and fetch the whole range
+    """
+    store = activity_store.get_activity_store()
+    start, end = activity_store.to_timestamp(start_date), activity_store.to_timestamp(
+        end_date
+    )
+    synced_range = None if full_resync else store.get_synced_range(athlete_id)
+
+    now = time.time()
+    if (
+        synced_range is not None
+        and now - store.get_reconciled_at(athlete_id)
+        > RECONCILE_INTERVAL.total_seconds()
+    ):
+        # refetch everything synced so far, not only the requested range
+        start, end = min(start, synced_range[0]), max(end, synced_range[1])
+        synced_range = None
+
+    if synced_range is None:
+        store.clear(athlete_id)
+        store.upsert_activities(
+            athlete_id,
+            fetch_activities(
+                strava_client,
+                after=datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc),
+                before=datetime.datetime.fromtimestamp(end, tz=datetime.timezone.utc),
+            ),
+        )
+        store.set_synced_range(athlete_id, start, end, reconciled_at=now)
+    else:
+        synced_after, synced_before = synced_range
+        if start < synced_after:
+            store.upsert_activities(
+                athlete_id,
+                fetch_activities(
+                    strava_client,
+                    after=start_date,
+                    before=datetime.datetime.fromtimestamp(
+                        synced_after, tz=datetime.timezone.utc
+                    ),
+                ),
+            )
+        if end > synced_before:
+            store.upsert_activities(
+                athlete_id,
+                fetch_activities(
+                    strava_client,
+                    after=datetime.datetime.fromtimestamp(
+                        synced_before, tz=datetime.timezone.utc
+                    )
+                    - SYNC_OVERLAP,
+                    before=end_date,
+                ),
+            )
+        store.set_synced_range(
+            athlete_id, min(start, synced_after), max(end, synced_before)
+        )
+
+
+def sync_activities(
+    strava_client: Client,
+    athlete_id: int,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    full_resync: bool = False,
+) -> List[Activity]:
+    """
+    Bring the athlete's activity store up to date over [start_date, end_date]
+    (see sync_activity_store) and read the range back from it
+
+    :param strava_client: The Strava client object to fetch data.
+    :param athlete_id: The ID of the athlete
+    :param start_date: start of the range
+    :param end_date: end of the range
+    :param full_resync: drop the stored activities and fetch the whole range
+    :return: List of Activity objects
+    """
+    sync_activity_store(
+        strava_client, athlete_id, start_date, end_date, full_resync=full_resync
+    )
+    return activity_store.get_activity_store().list_activities(
+        athlete_id, after=start_date, before=end_date
+    )
+
+
+def get_daily_activity(
+    strava_client: Client,
+    dt: datetime.datetime,
+    num_weeks: int = 8,
+    athlete_id: Optional[int] = None,
+) -> DailyActivity:
     """
     Fetches activities for a given athlete ID and returns a DataFrame with daily aggregated activities
 
     :param strava_client: The Strava client object to fetch data.
     :param num_weeks: The number of weeks to fetch activities for.
+    :param athlete_id: read through the athlete's activity store when given,
+        fetching only activities not stored yet and reading the daily totals
+        the store keeps
     :return: A cleaned and processed DataFrame of the athlete's daily aggregated activities.
     """
     start_date = dt - datetime.timedelta(weeks=num_weeks)
 
-    all_strava_activities = strava_client.get_activities(after=start_date, before=dt)
+    if athlete_id is not None:
+        sync_activity_store(
+            strava_client, athlete_id, start_date=start_date, end_date=dt
+        )
+        daily_totals = activity_store.get_activity_store().list_daily_totals(
+            athlete_id, start_date=start_date.date(), end_date=dt.date()
+        )
+        with metrics.timer("aggregation"):
+            return aggregate_daily_totals(
+                daily_totals, start_date=start_date, end_date=dt
+            )
 
-    # filter and convert to our Activity type
-    activities = [
-        Activity(**activity.__dict__)
-        for activity in all_strava_activities
-        if activity.sport_type == "Run"
-    ]
+    activities = fetch_activities(strava_client, after=start_date, before=dt)
+    with metrics.timer("aggregation"):
+        # aggregate metrics over every date of the range, rest days included
+        return aggregate_daily_activity(activities, start_date=start_date, end_date=dt)
+
+
+def get_first_monday(start_date: datetime.date) -> datetime.date:
+    """
+    First day of the first whole week after start date, windows chop off the
+    remainder/leftover days near their start date
+
+    :param start_date: start of the window
+    :return: date of a Monday
+    """
+    return start_date + datetime.timedelta(days=7 - start_date.weekday())
+
+
+def slice_daily_activity(
+    daily_activity: DailyActivity, dt: datetime.datetime, num_weeks: int
+) -> DailyActivity:
+    """
+    Cut the window get_daily_activity(dt=dt, num_weeks=num_weeks) would return
+    out of a longer daily activity history, so one fetch can serve several
+    windows
 
-    # add empty activities for missing dates
-    all_dates_activities = add_missing_dates(
-        activities=activities, start_date=start_date, end_date=dt
+    :param daily_activity: DailyActivity object covering the window
+    :param dt: end of the window
+    :param num_weeks: length of the window in weeks
+    :return: DailyActivity view of the window
+    """
+    start_date = (dt - datetime.timedelta(weeks=num_weeks)).date()
+    return daily_activity.between(get_first_monday(start_date), dt.date())
+
+
+async def get_daily_activity_async(
+    strava_client: Client,
+    dt: datetime.datetime,
+    num_weeks: int = 8,
+    athlete_id: Optional[int] = None,
+) -> DailyActivity:
+    """
+    Async variant of get_daily_activity. stravalib has no async transport, so
+    the paged fetch runs on a worker thread to keep the event loop free.
+
+    :param strava_client: The Strava client object to fetch data.
+    :param dt: datetime injection, helpful for testing
+    :param num_weeks: The number of weeks to fetch activities for.
+    :param athlete_id: read through the athlete's activity store when given
+    :return: A list of the athlete's daily aggregated activities.
+    """
+    return await asyncio.to_thread(
+        get_daily_activity,
+        strava_client,
+        dt=dt,
+        num_weeks=num_weeks,
+        athlete_id=athlete_id,
     )
 
-    # aggregate metrics
-    return aggregate_daily_metrics(all_dates_activities)
+
+def get_stored_weekly_summaries(
+    athlete_id: int, start_date: datetime.date, end_date: datetime.date
+) -> List[WeekSummary]:
+    """
+    Weekly summaries from the first Monday on or after start date through the
+    week of end date, read from the summaries the activity store maintains.
+    Weeks without runs are included with zero distance, matching
+    DailyActivity.get_weekly_summaries over the same days.
+
+    :param athlete_id: The ID of the athlete
+    :param start_date: start of the range
+    :param end_date: end of the range
+    :return: A list of WeekSummary objects ordered by week
+    """
+    stored_summaries = {
+        summary.week_start_date: summary
+        for summary in activity_store.get_activity_store().list_weekly_summaries(
+            athlete_id, start_date=start_date, end_date=end_date
+        )
+    }
+
+    weekly_summaries = []
+    week_start_date = start_date + datetime.timedelta(days=-start_date.weekday() % 7)
+    while week_start_date <= end_date:
+        iso_calendar = week_start_date.isocalendar()
+        weekly_summaries.append(
+            stored_summaries.get(
+                week_start_date,
+                WeekSummary(
+                    year=iso_calendar.year,
+                    week_of_year=iso_calendar.week,
+                    week_start_date=week_start_date,
+                    longest_run=0.0,
+                    total_distance=0.0,
+                ),
+            )
+        )
+        week_start_date += datetime.timedelta(weeks=1)
+    return weekly_summaries
 
 
 def get_weekly_summaries(
     strava_client: Optional[Client] = None,
-    daily_metrics: Optional[List[DailyMetrics]] = None,
+    daily_metrics: Optional[Union[List[DailyMetrics], DailyActivity]] = None,
     dt: Optional[datetime.datetime] = None,
+    athlete_id: Optional[int] = None,
 ) -> List[WeekSummary]:
     """
     Aggregate daily metrics by week of the year and calculate load for each week.
 
     :param strava_client: The Strava client object to fetch data.
-    :param daily_metrics: List of DailyMetrics objects
+    :param daily_metrics: List of DailyMetrics objects or a DailyActivity object
     :param dt: datetime injection, helpful for testing
+    :param athlete_id: read through the athlete's activity store when given
     :return: A list of WeekSummary objects with summary statistics
     """
     if strava_client is None and daily_metrics is None:
         raise ValueError("Either strava_client or daily_metrics must be provided")
 
     if daily_metrics is None:
-        daily_metrics = get_daily_activity(strava_client, dt=dt)
+        daily_metrics = get_daily_activity(strava_client, dt=dt, athlete_id=athlete_id)
+    if isinstance(daily_metrics, DailyActivity):
+        return daily_metrics.get_weekly_summaries()
 
     weekly_aggregates = defaultdict(
         lambda: {"total_distance": 0, "longest_run": 0, "start_of_week": None}
     )
 
-    for metrics in daily_metrics:
-        key = (metrics.year, metrics.week_of_year)
+    for day_metrics in daily_metrics:
+        key = (day_metrics.year, day_metrics.week_of_year)
 
         # calculate total distance and longest run
-        weekly_aggregates[key]["total_distance"] += metrics.distance_in_miles
+        weekly_aggregates[key]["total_distance"] += day_metrics.distance_in_miles
         weekly_aggregates[key]["longest_run"] = max(
-            weekly_aggregates[key]["longest_run"], metrics.distance_in_miles
+            weekly_aggregates[key]["longest_run"], day_metrics.distance_in_miles
         )
 
         # update start of week
         if (
             weekly_aggregates[key]["start_of_week"] is None
-            or metrics.date < weekly_aggregates[key]["start_of_week"]
+            or day_metrics.date < weekly_aggregates[key]["start_of_week"]
         ):
-            weekly_aggregates[key]["start_of_week"] = metrics.date
+            weekly_aggregates[key]["start_of_week"] = day_metrics.date
 
     weekly_summaries = [
         WeekSummary(
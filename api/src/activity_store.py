@@ -0,0 +1,896 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src import concurrency, constants
+from src.types.activity import Activity, DailyTotals, WeekSummary
+from src.types.update_pipeline import Stage
+from supabase import Client
+
+# bumped whenever the tables change, older stores are dropped and resynced
+SCHEMA_VERSION = 5
+
+
+def to_timestamp(dt: datetime.datetime) -> float:
+    """Seconds since epoch, naive datetimes are taken as UTC like stravalib does"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def get_week_start(local_date: int) -> int:
+    """Ordinal of the Monday starting the week of local_date, ordinal 1 is a Monday"""
+    return local_date - (local_date - 1) % 7
+
+
+def get_activity_row(athlete_id: int, activity: Activity) -> dict:
+    return {
+        "athlete_id": athlete_id,
+        "activity_id": activity.id,
+        "start_date": to_timestamp(activity.start_date),
+        "local_date": activity.start_date_local.toordinal(),
+        "distance": activity.distance,
+        "total_elevation_gain": activity.total_elevation_gain,
+        "moving_time": activity.moving_time.total_seconds(),
+        "data": activity.json(),
+    }
+
+
+def sum_days(activity_rows: Iterable[dict]) -> Dict[int, List[float]]:
+    """
+    Totals of each day from its activity rows. Sums accumulate in start date
+    order, the order aggregation reads activities in, so totals match
+    aggregating the activities.
+
+    :param activity_rows: activity rows ordered by start_date, activity_id
+    :return: dict of local_date to [distance, total_elevation_gain, moving_time, activity_count]
+    """
+    totals: Dict[int, List[float]] = {}
+    for row in activity_rows:
+        day_totals = totals.setdefault(row["local_date"], [0, 0, 0, 0])
+        day_totals[0] += row["distance"]
+        day_totals[1] += row["total_elevation_gain"]
+        day_totals[2] += row["moving_time"]
+        day_totals[3] += 1
+    return totals
+
+
+def sum_weeks(day_rows: Iterable[dict]) -> Dict[int, Tuple[float, float]]:
+    """
+    Summaries of each week from its daily totals, the way
+    DailyActivity.get_weekly_summaries does: daily distances are rounded to
+    miles before being added up in date order
+
+    :param day_rows: activity_day rows ordered by local_date
+    :return: dict of week_start to (total_distance, longest_run)
+    """
+    daily_distances: Dict[int, List[float]] = {}
+    for row in day_rows:
+        daily_distances.setdefault(get_week_start(row["local_date"]), []).append(
+            round(row["distance"] / constants.METERS_PER_MILE, 2)
+        )
+    return {
+        week_start: (round(sum(distances), 2), max(distances))
+        for week_start, distances in daily_distances.items()
+    }
+
+
+def get_daily_totals(row: Any) -> DailyTotals:
+    return DailyTotals(
+        date=datetime.date.fromordinal(row["local_date"]),
+        distance=row["distance"],
+        total_elevation_gain=row["total_elevation_gain"],
+        moving_time=row["moving_time"],
+        activity_count=row["activity_count"],
+    )
+
+
+def get_week_summary(row: Any) -> WeekSummary:
+    week_start_date = datetime.date.fromordinal(row["week_start"])
+    iso_calendar = week_start_date.isocalendar()
+    return WeekSummary(
+        year=iso_calendar.year,
+        week_of_year=iso_calendar.week,
+        week_start_date=week_start_date,
+        longest_run=row["longest_run"],
+        total_distance=row["total_distance"],
+    )
+
+
+class ActivityStore(ABC):
+    """
+    Persistent per-athlete copy of Strava run activities, along with the time
+    range already synced from Strava, so only newer activities are fetched.
+    Daily totals and weekly summaries are kept up to date on every write, and
+    a per-athlete revision tells readers of derived data when they changed.
+    """
+
+    @abstractmethod
+    def upsert_activities(self, athlete_id: int, activities: List[Activity]) -> None:
+        """Insert or replace activities, keyed by (athlete_id, activity id)"""
+
+    @abstractmethod
+    def delete_activity(self, athlete_id: int, activity_id: int) -> bool:
+        """Delete an activity, False if it was not stored"""
+
+    @abstractmethod
+    def list_activities(
+        self,
+        athlete_id: int,
+        after: datetime.datetime,
+        before: datetime.datetime,
+    ) -> List[Activity]:
+        """List activities started between after & before, ordered by start date"""
+
+    @abstractmethod
+    def list_daily_totals(
+        self,
+        athlete_id: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> List[DailyTotals]:
+        """Totals of the days with activities between start & end date (local), ordered by date"""
+
+    @abstractmethod
+    def list_weekly_summaries(
+        self,
+        athlete_id: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> List[WeekSummary]:
+        """Summaries of the weeks with activities starting between start & end date, ordered by week"""
+
+    @abstractmethod
+    def get_revision(self, athlete_id: int) -> int:
+        """Changes whenever the athlete's daily totals change, 0 if never written"""
+
+    @abstractmethod
+    def get_generation(self) -> str:
+        """
+        Identifier of the store, new whenever it is created from scratch and
+        its revisions start over, so a revision is only meaningful along with it
+        """
+
+    @abstractmethod
+    def get_synced_range(self, athlete_id: int) -> Optional[Tuple[float, float]]:
+        """(synced_after, synced_before) timestamps covered so far, None if never synced"""
+
+    @abstractmethod
+    def set_synced_range(
+        self,
+        athlete_id: int,
+        synced_after: float,
+        synced_before: float,
+        reconciled_at: Optional[float] = None,
+    ) -> None:
+        """
+        Record the time range covered by the activities stored, along with
+        the time it was last fetched in full (kept as is when None, now when
+        the athlete was never synced)
+        """
+
+    @abstractmethod
+    def get_reconciled_at(self, athlete_id: int) -> Optional[float]:
+        """Timestamp of the last full fetch of the synced range, None if never synced"""
+
+    @abstractmethod
+    def clear(self, athlete_id: int) -> None:
+        """Drop an athlete's activities and sync state, forcing a full resync"""
+
+
+class SQLiteActivityStore(ActivityStore):
+    """Local ActivityStore persisted to a single SQLite file"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                for table in (
+                    "activity_store",
+                    "activity",
+                    "activity_sync",
+                    "activity_day",
+                    "activity_week",
+                    "activity_revision",
+                ):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS activity (
+                    athlete_id INTEGER NOT NULL,
+                    activity_id INTEGER NOT NULL,
+                    start_date REAL NOT NULL,
+                    local_date INTEGER NOT NULL,
+                    distance REAL NOT NULL,
+                    total_elevation_gain REAL NOT NULL,
+                    moving_time REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (athlete_id, activity_id)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS activity_local_date
+                ON activity (athlete_id, local_date)
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS activity_sync (
+                    athlete_id INTEGER PRIMARY KEY,
+                    synced_after REAL NOT NULL,
+                    synced_before REAL NOT NULL,
+                    reconciled_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS activity_day (
+                    athlete_id INTEGER NOT NULL,
+                    local_date INTEGER NOT NULL,
+                    distance REAL NOT NULL,
+                    total_elevation_gain REAL NOT NULL,
+                    moving_time REAL NOT NULL,
+                    activity_count INTEGER NOT NULL,
+                    PRIMARY KEY (athlete_id, local_date)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS activity_week (
+                    athlete_id INTEGER NOT NULL,
+                    week_start INTEGER NOT NULL,
+                    total_distance REAL NOT NULL,
+                    longest_run REAL NOT NULL,
+                    PRIMARY KEY (athlete_id, week_start)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS activity_revision (
+                    athlete_id INTEGER PRIMARY KEY,
+                    revision INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS activity_store (generation TEXT NOT NULL)"
+            )
+            row = self._conn.execute("SELECT generation FROM activity_store").fetchone()
+            if row is None:
+                self._generation = str(uuid.uuid4())
+                self._conn.execute(
+                    "INSERT INTO activity_store (generation) VALUES (?)",
+                    (self._generation,),
+                )
+            else:
+                self._generation = row["generation"]
+
+    def _get_local_dates(
+        self, athlete_id: int, activity_ids: Iterable[int]
+    ) -> List[int]:
+        """Days the given stored activities fall on"""
+        activity_ids = list(activity_ids)
+        return [
+            row["local_date"]
+            for row in self._conn.execute(
+                f"""
+                SELECT DISTINCT local_date FROM activity
+                WHERE athlete_id = ? AND activity_id IN ({", ".join("?" * len(activity_ids))})
+                """,
+                (athlete_id, *activity_ids),
+            )
+        ]
+
+    def _refresh_days(self, athlete_id: int, local_dates: Iterable[int]) -> None:
+        """Recompute the totals of the given days from their activities"""
+        local_dates = sorted(set(local_dates))
+        if not local_dates:
+            return
+        placeholders = ", ".join("?" * len(local_dates))
+        totals = sum_days(
+            self._conn.execute(
+                f"""
+                SELECT local_date, distance, total_elevation_gain, moving_time
+                FROM activity
+                WHERE athlete_id = ? AND local_date IN ({placeholders})
+                ORDER BY start_date, activity_id
+                """,
+                (athlete_id, *local_dates),
+            )
+        )
+
+        previous_totals = {
+            row["local_date"]: [
+                row["distance"],
+                row["total_elevation_gain"],
+                row["moving_time"],
+                row["activity_count"],
+            ]
+            for row in self._conn.execute(
+                f"SELECT * FROM activity_day WHERE athlete_id = ? AND local_date IN ({placeholders})",
+                (athlete_id, *local_dates),
+            )
+        }
+        # re-synced activities usually leave their days as they were
+        if totals == previous_totals:
+            return
+
+        self._bump_revision(athlete_id)
+        self._conn.execute(
+            f"DELETE FROM activity_day WHERE athlete_id = ? AND local_date IN ({placeholders})",
+            (athlete_id, *local_dates),
+        )
+        self._conn.executemany(
+            """
+            INSERT INTO activity_day (
+                athlete_id, local_date, distance, total_elevation_gain,
+                moving_time, activity_count
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (athlete_id, local_date, *day_totals)
+                for local_date, day_totals in totals.items()
+            ],
+        )
+        self._refresh_weeks(athlete_id, local_dates)
+
+    def _bump_revision(self, athlete_id: int) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO activity_revision (athlete_id, revision) VALUES (?, 1)
+            ON CONFLICT (athlete_id) DO UPDATE SET revision = revision + 1
+            """,
+            (athlete_id,),
+        )
+
+    def _refresh_weeks(self, athlete_id: int, local_dates: List[int]) -> None:
+        """Recompute the summaries of the weeks the given days fall on"""
+        week_starts = sorted({get_week_start(local_date) for local_date in local_dates})
+        placeholders = ", ".join("?" * len(week_starts))
+        summaries = sum_weeks(
+            self._conn.execute(
+                f"""
+                SELECT local_date, distance FROM activity_day
+                WHERE athlete_id = ? AND local_date - (local_date - 1) % 7 IN ({placeholders})
+                ORDER BY local_date
+                """,
+                (athlete_id, *week_starts),
+            )
+        )
+
+        self._conn.execute(
+            f"DELETE FROM activity_week WHERE athlete_id = ? AND week_start IN ({placeholders})",
+            (athlete_id, *week_starts),
+        )
+        self._conn.executemany(
+            """
+            INSERT INTO activity_week (athlete_id, week_start, total_distance, longest_run)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (athlete_id, week_start, *summary)
+                for week_start, summary in summaries.items()
+            ],
+        )
+
+    def upsert_activities(self, athlete_id: int, activities: List[Activity]) -> None:
+        with self._lock, self._conn:
+            # days replaced activities move away from need refreshing too
+            local_dates = self._get_local_dates(
+                athlete_id, (activity.id for activity in activities)
+            )
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO activity (
+                    athlete_id, activity_id, start_date, local_date, distance,
+                    total_elevation_gain, moving_time, data
+                )
+                VALUES (
+                    :athlete_id, :activity_id, :start_date, :local_date, :distance,
+                    :total_elevation_gain, :moving_time, :data
+                )
+                """,
+                [get_activity_row(athlete_id, activity) for activity in activities],
+            )
+            self._refresh_days(
+                athlete_id,
+                local_dates
+                + [activity.start_date_local.toordinal() for activity in activities],
+            )
+
+    def delete_activity(self, athlete_id: int, activity_id: int) -> bool:
+        with self._lock, self._conn:
+            local_dates = self._get_local_dates(athlete_id, [activity_id])
+            self._conn.execute(
+                "DELETE FROM activity WHERE athlete_id = ? AND activity_id = ?",
+                (athlete_id, activity_id),
+            )
+            self._refresh_days(athlete_id, local_dates)
+        return bool(local_dates)
+
+    def list_activities(
+        self,
+        athlete_id: int,
+        after: datetime.datetime,
+        before: datetime.datetime,
+    ) -> List[Activity]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT data FROM activity
+                WHERE athlete_id = ? AND start_date >= ? AND start_date <= ?
+                ORDER BY start_date, activity_id
+                """,
+                (athlete_id, to_timestamp(after), to_timestamp(before)),
+            ).fetchall()
+        return [Activity.parse_raw(row["data"]) for row in rows]
+
+    def list_daily_totals(
+        self,
+        athlete_id: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> List[DailyTotals]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT * FROM activity_day
+                WHERE athlete_id = ? AND local_date >= ? AND local_date <= ?
+                ORDER BY local_date
+                """,
+                (athlete_id, start_date.toordinal(), end_date.toordinal()),
+            ).fetchall()
+        return [get_daily_totals(row) for row in rows]
+
+    def list_weekly_summaries(
+        self,
+        athlete_id: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> List[WeekSummary]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT * FROM activity_week
+                WHERE athlete_id = ? AND week_start >= ? AND week_start <= ?
+                ORDER BY week_start
+                """,
+                (athlete_id, start_date.toordinal(), end_date.toordinal()),
+            ).fetchall()
+        return [get_week_summary(row) for row in rows]
+
+    def get_revision(self, athlete_id: int) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision FROM activity_revision WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchone()
+        return 0 if row is None else row["revision"]
+
+    def get_generation(self) -> str:
+        return self._generation
+
+    def get_synced_range(self, athlete_id: int) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_after, synced_before FROM activity_sync WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchone()
+        return None if row is None else (row["synced_after"], row["synced_before"])
+
+    def set_synced_range(
+        self,
+        athlete_id: int,
+        synced_after: float,
+        synced_before: float,
+        reconciled_at: Optional[float] = None,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO activity_sync
+                (athlete_id, synced_after, synced_before, reconciled_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (athlete_id) DO UPDATE SET
+                    synced_after = excluded.synced_after,
+                    synced_before = excluded.synced_before,
+                    reconciled_at = COALESCE(?, reconciled_at)
+                """,
+                (
+                    athlete_id,
+                    synced_after,
+                    synced_before,
+                    time.time() if reconciled_at is None else reconciled_at,
+                    reconciled_at,
+                ),
+            )
+
+    def get_reconciled_at(self, athlete_id: int) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reconciled_at FROM activity_sync WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchone()
+        return None if row is None else row["reconciled_at"]
+
+    def clear(self, athlete_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM activity WHERE athlete_id = ?", (athlete_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM activity_sync WHERE athlete_id = ?", (athlete_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM activity_day WHERE athlete_id = ?", (athlete_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM activity_week WHERE athlete_id = ?", (athlete_id,)
+            )
+            self._bump_revision(athlete_id)
+
+
+class SupabaseActivityStore(ActivityStore):
+    """
+    ActivityStore persisted to the activity tables (migrations/006), shared
+    by every replica and kept across deploys. PostgREST requests are not
+    transactional: the totals of a day are recomputed from its activities on
+    every write, so an interrupted write is repaired by the next one touching
+    the same day.
+    """
+
+    page_size = 500
+
+    def __init__(self, client: Client):
+        self._client = client
+        self._generation: Optional[str] = None
+
+    def _table(self, name: str):
+        return self._client.table(name)
+
+    def _select_all(self, build_query: Callable[[], Any]) -> List[dict]:
+        """
+        Every row of a query ordered on a unique key, paged as a single
+        select is cut off at PostgREST's max-rows
+        """
+        rows = []
+        while True:
+            query = build_query().range(len(rows), len(rows) + self.page_size - 1)
+            page = query.execute().data
+            rows += page
+            if len(page) < self.page_size:
+                return rows
+
+    def _get_local_dates(
+        self, athlete_id: int, activity_ids: Iterable[int]
+    ) -> List[int]:
+        """Days the given stored activities fall on"""
+        activity_ids = list(activity_ids)
+        local_dates = set()
+        # chunked to keep the id list within a request URL
+        for i in range(0, len(activity_ids), self.page_size):
+            local_dates.update(
+                row["local_date"]
+                for row in self._table("activity")
+                .select("local_date")
+                .eq("athlete_id", athlete_id)
+                .in_("activity_id", activity_ids[i : i + self.page_size])
+                .execute()
+                .data
+            )
+        return sorted(local_dates)
+
+    def _refresh_days(self, athlete_id: int, local_dates: Iterable[int]) -> None:
+        """Recompute the totals of the given days from their activities"""
+        local_dates = sorted(set(local_dates))
+        if not local_dates:
+            return
+        totals = sum_days(
+            self._select_all(
+                lambda: self._table("activity")
+                .select("local_date, distance, total_elevation_gain, moving_time")
+                .eq("athlete_id", athlete_id)
+                .in_("local_date", local_dates)
+                .order("start_date")
+                .order("activity_id")
+            )
+        )
+        previous_totals = {
+            row["local_date"]: [
+                row["distance"],
+                row["total_elevation_gain"],
+                row["moving_time"],
+                row["activity_count"],
+            ]
+            for row in self._select_all(
+                lambda: self._table("activity_day")
+                .select("*")
+                .eq("athlete_id", athlete_id)
+                .in_("local_date", local_dates)
+                .order("local_date")
+            )
+        }
+        # re-synced activities usually leave their days as they were
+        if totals == previous_totals:
+            return
+
+        self._bump_revision(athlete_id)
+        self._table("activity_day").delete(returning="minimal").eq(
+            "athlete_id", athlete_id
+        ).in_("local_date", local_dates).execute()
+        if totals:
+            self._table("activity_day").insert(
+                [
+                    {
+                        "athlete_id": athlete_id,
+                        "local_date": local_date,
+                        "distance": day_totals[0],
+                        "total_elevation_gain": day_totals[1],
+                        "moving_time": day_totals[2],
+                        "activity_count": day_totals[3],
+                    }
+                    for local_date, day_totals in totals.items()
+                ],
+                returning="minimal",
+            ).execute()
+        self._refresh_weeks(athlete_id, local_dates)
+
+    def _bump_revision(self, athlete_id: int) -> None:
+        # replicas cannot increment a counter without a read-modify-write
+        # race, a fresh value changes the revision all the same
+        self._table("activity_revision").upsert(
+            {"athlete_id": athlete_id, "revision": time.time_ns()},
+            on_conflict="athlete_id",
+            returning="minimal",
+        ).execute()
+
+    def _refresh_weeks(self, athlete_id: int, local_dates: List[int]) -> None:
+        """Recompute the summaries of the weeks the given days fall on"""
+        week_starts = sorted({get_week_start(local_date) for local_date in local_dates})
+        day_rows = self._select_all(
+            lambda: self._table("activity_day")
+            .select("local_date, distance")
+            .eq("athlete_id", athlete_id)
+            .gte("local_date", week_starts[0])
+            .lte("local_date", week_starts[-1] + 6)
+            .order("local_date")
+        )
+        summaries = sum_weeks(
+            row for row in day_rows if get_week_start(row["local_date"]) in week_starts
+        )
+
+        self._table("activity_week").delete(returning="minimal").eq(
+            "athlete_id", athlete_id
+        ).in_("week_start", week_starts).execute()
+        if summaries:
+            self._table("activity_week").insert(
+                [
+                    {
+                        "athlete_id": athlete_id,
+                        "week_start": week_start,
+                        "total_distance": total_distance,
+                        "longest_run": longest_run,
+                    }
+                    for week_start, (
+                        total_distance,
+                        longest_run,
+                    ) in summaries.items()
+                ],
+                returning="minimal",
+            ).execute()
+
+    @concurrency.limited(Stage.DB)
+    def upsert_activities(self, athlete_id: int, activities: List[Activity]) -> None:
+        # days replaced activities move away from need refreshing too
+        local_dates = self._get_local_dates(
+            athlete_id, (activity.id for activity in activities)
+        )
+        rows = [get_activity_row(athlete_id, activity) for activity in activities]
+        for i in range(0, len(rows), self.page_size):
+            self._table("activity").upsert(
+                rows[i : i + self.page_size],
+                on_conflict="athlete_id,activity_id",
+                returning="minimal",
+            ).execute()
+        self._refresh_days(
+            athlete_id,
+            local_dates
+            + [activity.start_date_local.toordinal() for activity in activities],
+        )
+
+    @concurrency.limited(Stage.DB)
+    def delete_activity(self, athlete_id: int, activity_id: int) -> bool:
+        local_dates = self._get_local_dates(athlete_id, [activity_id])
+        self._table("activity").delete(returning="minimal").eq(
+            "athlete_id", athlete_id
+        ).eq("activity_id", activity_id).execute()
+        self._refresh_days(athlete_id, local_dates)
+        return bool(local_dates)
+
+    @concurrency.limited(Stage.DB)
+    def list_activities(
+        self,
+        athlete_id: int,
+        after: datetime.datetime,
+        before: datetime.datetime,
+    ) -> List[Activity]:
+        rows = self._select_all(
+            lambda: self._table("activity")
+            .select("data")
+            .eq("athlete_id", athlete_id)
+            .gte("start_date", to_timestamp(after))
+            .lte("start_date", to_timestamp(before))
+            .order("start_date")
+            .order("activity_id")
+        )
+        return [Activity.parse_raw(row["data"]) for row in rows]
+
+    @concurrency.limited(Stage.DB)
+    def list_daily_totals(
+        self,
+        athlete_id: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> List[DailyTotals]:
+        rows = self._select_all(
+            lambda: self._table("activity_day")
+            .select("*")
+            .eq("athlete_id", athlete_id)
+            .gte("local_date", start_date.toordinal())
+            .lte("local_date", end_date.toordinal())
+            .order("local_date")
+        )
+        return [get_daily_totals(row) for row in rows]
+
+    @concurrency.limited(Stage.DB)
+    def list_weekly_summaries(
+        self,
+        athlete_id: int,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> List[WeekSummary]:
+        rows = self._select_all(
+            lambda: self._table("activity_week")
+            .select("*")
+            .eq("athlete_id", athlete_id)
+            .gte("week_start", start_date.toordinal())
+            .lte("week_start", end_date.toordinal())
+            .order("week_start")
+        )
+        return [get_week_summary(row) for row in rows]
+
+    @concurrency.limited(Stage.DB)
+    def get_revision(self, athlete_id: int) -> int:
+        rows = (
+            self._table("activity_revision")
+            .select("revision")
+            .eq("athlete_id", athlete_id)
+            .execute()
+            .data
+        )
+        return rows[0]["revision"] if rows else 0
+
+    @concurrency.limited(Stage.DB)
+    def get_generation(self) -> str:
+        if self._generation is None:
+            # the first replica to get here creates it, the others read it back
+            self._table("activity_store").upsert(
+                {"id": 1, "generation": str(uuid.uuid4())},
+                on_conflict="id",
+                ignore_duplicates=True,
+                returning="minimal",
+            ).execute()
+            rows = self._table("activity_store").select("generation").execute().data
+            self._generation = rows[0]["generation"]
+        return self._generation
+
+    @concurrency.limited(Stage.DB)
+    def get_synced_range(self, athlete_id: int) -> Optional[Tuple[float, float]]:
+        rows = (
+            self._table("activity_sync")
+            .select("synced_after, synced_before")
+            .eq("athlete_id", athlete_id)
+            .execute()
+            .data
+        )
+        return (rows[0]["synced_after"], rows[0]["synced_before"]) if rows else None
+
+    @concurrency.limited(Stage.DB)
+    def set_synced_range(
+        self,
+        athlete_id: int,
+        synced_after: float,
+        synced_before: float,
+        reconciled_at: Optional[float] = None,
+    ) -> None:
+        row = {
+            "athlete_id": athlete_id,
+            "synced_after": synced_after,
+            "synced_before": synced_before,
+        }
+        if reconciled_at is not None:
+            self._table("activity_sync").upsert(
+                {**row, "reconciled_at": reconciled_at},
+                on_conflict="athlete_id",
+                returning="minimal",
+            ).execute()
+            return
+
+        # reconciled_at is kept as is, or now for an athlete never synced
+        updated = (
+            self._table("activity_sync")
+            .update(row)
+            .eq("athlete_id", athlete_id)
+            .execute()
+            .data
+        )
+        if not updated:
+            self._table("activity_sync").upsert(
+                {**row, "reconciled_at": time.time()},
+                on_conflict="athlete_id",
+                ignore_duplicates=True,
+                returning="minimal",
+            ).execute()
+
+    @concurrency.limited(Stage.DB)
+    def get_reconciled_at(self, athlete_id: int) -> Optional[float]:
+        rows = (
+            self._table("activity_sync")
+            .select("reconciled_at")
+            .eq("athlete_id", athlete_id)
+            .execute()
+            .data
+        )
+        return rows[0]["reconciled_at"] if rows else None
+
+    @concurrency.limited(Stage.DB)
+    def clear(self, athlete_id: int) -> None:
+        for table in ("activity", "activity_sync", "activity_day", "activity_week"):
+            self._table(table).delete(returning="minimal").eq(
+                "athlete_id", athlete_id
+            ).execute()
+        self._bump_revision(athlete_id)
+
+
+_activity_store: Optional[ActivityStore] = None
+_activity_store_lock = threading.Lock()
+
+
+def get_activity_store() -> ActivityStore:
+    """
+    Process-wide activity store. Activities are kept in the activity tables,
+    shared by every replica and kept across deploys, so a webhook event
+    reaching one replica is seen by all of them and a deploy does not
+    refetch every athlete from Strava. Setting ACTIVITY_STORE_DB_PATH keeps
+    them in a local SQLite file instead, for development and benchmarks.
+
+    :return: ActivityStore
+    """
+    global _activity_store
+    # created once, pipeline worker threads may race to the first call
+    with _activity_store_lock:
+        if _activity_store is None:
+            path = os.environ.get("ACTIVITY_STORE_DB_PATH")
+            if path is not None:
+                _activity_store = SQLiteActivityStore(path)
+            else:
+                # imported here as the client needs Supabase credentials
+                from src import supabase_client
+
+                _activity_store = SupabaseActivityStore(supabase_client.client)
+        return _activity_store
@@ -7,7 +7,7 @@ import traceback
 import httpx
 import jwt
 from dotenv import load_dotenv
-from src.supabase_client import get_user_auth
+from src.supabase_client import get_device_token
 from src.types.user import UserRow
 
 load_dotenv()
@@ -92,14 +92,14 @@ def send_push_notification(device_token: str, title: str, body: str):
 
 def send_push_notif_wrapper(user: UserRow):
     """Send push notification to user if they have a valid device token."""
-    user_auth = get_user_auth(user.athlete_id)
-    if not user_auth.device_token:
+    device_token = get_device_token(user.athlete_id)
+    if not device_token:
         logger.info(f"No device token for user {user.athlete_id}")
         return
 
     try:
         send_push_notification(
-            device_token=user_auth.device_token,
+            device_token=device_token,
             title="Crush Your Race",
             body="Your training week has been updated!",
         )
@@ -150,10 +150,17 @@ def authenticate_athlete(athlete_id: int) -> UserAuthRow:
 
 
 def get_configured_strava_client(user_auth: UserAuthRow) -> Client:
-    strava_client.access_token = user_auth.access_token
-    strava_client.refresh_token = user_auth.refresh_token
-    strava_client.token_expires_at = user_auth.expires_at
-    return strava_client
+    """
+    Build a Strava client for a single athlete. A fresh client is returned on
+    every call so that concurrent pipeline runs never share credentials.
+
+    :param user_auth: UserAuthRow
+    :return: Client
+    """
+    athlete_strava_client = Client(access_token=user_auth.access_token)
+    athlete_strava_client.refresh_token = user_auth.refresh_token
+    athlete_strava_client.token_expires_at = user_auth.expires_at
+    return athlete_strava_client
 
 
 def get_strava_client(athlete_id: int) -> Client:
@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+
+from src.types.update_pipeline import ConcurrencyConfig, Stage
+
+
+class StageLimits:
+    """
+    Per-stage semaphores of one run. Threads hold the threading semaphores,
+    coroutines the asyncio ones; both are sized from the same config.
+    """
+
+    def __init__(self, config: ConcurrencyConfig):
+        self.config = config
+        self.semaphores: Dict[Stage, threading.BoundedSemaphore] = {
+            stage: threading.BoundedSemaphore(getattr(config, stage)) for stage in Stage
+        }
+        self.async_semaphores: Dict[Stage, asyncio.Semaphore] = {
+            stage: asyncio.Semaphore(getattr(config, stage)) for stage in Stage
+        }
+
+
+# limits of the run the current thread or task belongs to, None is unbounded
+_stage_limits: contextvars.ContextVar[Optional[StageLimits]] = contextvars.ContextVar(
+    "stage_limits", default=None
+)
+
+
+@contextmanager
+def limits(config: ConcurrencyConfig) -> Iterator[StageLimits]:
+    """
+    Bound the Strava, LLM and database stages of everything run inside the
+    block, including threads started through propagate and tasks it creates.
+    Limits are scoped to the block, so overlapping runs never share or reset
+    each other's.
+
+    :param config: ConcurrencyConfig object
+    :return: StageLimits of the block
+    """
+    stage_limits = StageLimits(config)
+    token = _stage_limits.set(stage_limits)
+    try:
+        yield stage_limits
+    finally:
+        _stage_limits.reset(token)
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Bind func to the current context (stage limits, metric labels), for
+    callables run on worker threads which otherwise start from an empty one
+
+    :param func: function to run on another thread
+    :return: wrapped function, callable from any number of threads
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def limit(stage: Stage) -> Iterator[None]:
+    """
+    Hold a slot for the given stage for the duration of the block, no-op when
+    no limits are configured
+
+    :param stage: Stage object
+    """
+    stage_limits = _stage_limits.get()
+    if stage_limits is None:
+        yield
+        return
+    with stage_limits.semaphores[stage]:
+        yield
+
+
+@asynccontextmanager
+async def limit_async(stage: Stage) -> AsyncIterator[None]:
+    """
+    Async variant of limit, awaits the slot without blocking the event loop
+
+    :param stage: Stage object
+    """
+    stage_limits = _stage_limits.get()
+    if stage_limits is None:
+        yield
+        return
+    async with stage_limits.async_semaphores[stage]:
+        yield
+
+
+def limited(stage: Stage) -> Callable:
+    """Decorator form of limit and limit_async, wraps the entire function call"""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                async with limit_async(stage):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with limit(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
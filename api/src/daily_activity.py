@@ -0,0 +1,221 @@
+import datetime
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+from src.types.activity import DailyMetrics, WeekSummary
+
+WEEKDAY_ABBREVIATIONS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+class DailyActivity:
+    """
+    Columnar daily metrics of one athlete: one fixed-length array per metric,
+    indexed by day from first_date with no gaps. Slicing returns views, and
+    DailyMetrics are only materialized where prompts and the API need them.
+    Values are held exactly as DailyMetrics would hold them (rounded, with NaN
+    standing in for a missing pace), so materializing round-trips exactly.
+    """
+
+    __slots__ = (
+        "first_date",
+        "distance_in_miles",
+        "elevation_gain_in_feet",
+        "moving_time_in_minutes",
+        "pace_minutes_per_mile",
+        "activity_count",
+    )
+
+    def __init__(
+        self,
+        first_date: datetime.date,
+        distance_in_miles: np.ndarray,
+        elevation_gain_in_feet: np.ndarray,
+        moving_time_in_minutes: np.ndarray,
+        pace_minutes_per_mile: np.ndarray,
+        activity_count: np.ndarray,
+    ):
+        self.first_date = first_date
+        self.distance_in_miles = distance_in_miles
+        self.elevation_gain_in_feet = elevation_gain_in_feet
+        self.moving_time_in_minutes = moving_time_in_minutes
+        self.pace_minutes_per_mile = pace_minutes_per_mile
+        self.activity_count = activity_count
+
+    @classmethod
+    def from_daily_metrics(cls, daily_metrics: List[DailyMetrics]) -> "DailyActivity":
+        """
+        Pack consecutive DailyMetrics into columns
+
+        :param daily_metrics: List of DailyMetrics objects, one per day
+        :return: DailyActivity object
+        """
+        if not daily_metrics:
+            return cls.empty()
+        first_date = daily_metrics[0].date
+        if daily_metrics[-1].date != first_date + datetime.timedelta(
+            days=len(daily_metrics) - 1
+        ):
+            raise ValueError("DailyActivity requires one DailyMetrics per day")
+        return cls(
+            first_date=first_date,
+            distance_in_miles=np.array([m.distance_in_miles for m in daily_metrics]),
+            elevation_gain_in_feet=np.array(
+                [m.elevation_gain_in_feet for m in daily_metrics]
+            ),
+            moving_time_in_minutes=np.array(
+                [m.moving_time_in_minutes for m in daily_metrics]
+            ),
+            pace_minutes_per_mile=np.array(
+                [
+                    (
+                        np.nan
+                        if m.pace_minutes_per_mile is None
+                        else m.pace_minutes_per_mile
+                    )
+                    for m in daily_metrics
+                ]
+            ),
+            activity_count=np.array(
+                [m.activity_count for m in daily_metrics], dtype=np.int64
+            ),
+        )
+
+    @classmethod
+    def empty(cls, first_date: datetime.date = datetime.date.min) -> "DailyActivity":
+        return cls(
+            first_date,
+            *[np.zeros(0) for _ in range(4)],
+            np.zeros(0, dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.distance_in_miles)
+
+    @property
+    def last_date(self) -> datetime.date:
+        return self.first_date + datetime.timedelta(days=len(self) - 1)
+
+    @property
+    def ordinals(self) -> np.ndarray:
+        """Proleptic Gregorian ordinal of every day"""
+        return self.first_date.toordinal() + np.arange(len(self))
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[DailyMetrics, "DailyActivity"]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("DailyActivity only supports contiguous slices")
+            return DailyActivity(
+                self.first_date + datetime.timedelta(days=start),
+                *[column[start:stop] for column in self._columns()],
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("DailyActivity index out of range")
+        return self._get_daily_metrics(index)
+
+    def __iter__(self) -> Iterator[DailyMetrics]:
+        return (self._get_daily_metrics(i) for i in range(len(self)))
+
+    def _columns(self) -> List[np.ndarray]:
+        return [
+            self.distance_in_miles,
+            self.elevation_gain_in_feet,
+            self.moving_time_in_minutes,
+            self.pace_minutes_per_mile,
+            self.activity_count,
+        ]
+
+    def _get_daily_metrics(self, index: int) -> DailyMetrics:
+        date = self.first_date + datetime.timedelta(days=index)
+        iso_calendar = date.isocalendar()
+        pace = float(self.pace_minutes_per_mile[index])
+        return DailyMetrics.construct(
+            date=date,
+            day_of_week=WEEKDAY_ABBREVIATIONS[date.weekday()],
+            week_of_year=iso_calendar.week,
+            year=iso_calendar.year,
+            distance_in_miles=float(self.distance_in_miles[index]),
+            elevation_gain_in_feet=float(self.elevation_gain_in_feet[index]),
+            moving_time_in_minutes=float(self.moving_time_in_minutes[index]),
+            pace_minutes_per_mile=None if np.isnan(pace) else pace,
+            activity_count=int(self.activity_count[index]),
+        )
+
+    def to_daily_metrics(self) -> List[DailyMetrics]:
+        """Materialize every day as a DailyMetrics object"""
+        return list(self)
+
+    def between(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> "DailyActivity":
+        """
+        View of the days from start_date to end_date, both included
+
+        :param start_date: first day of the view
+        :param end_date: last day of the view
+        :return: DailyActivity object
+        """
+        start = max((start_date - self.first_date).days, 0)
+        stop = max((end_date - self.first_date).days + 1, start)
+        return self[start:stop]
+
+    def get_weekly_summaries(self) -> List[WeekSummary]:
+        """
+        Total distance and longest run of every ISO week, computed over the
+        columns. Matches activities.get_weekly_summaries over the same days.
+
+        :return: A list of WeekSummary objects ordered by week
+        """
+        if len(self) == 0:
+            return []
+
+        # ordinal 1 is a Monday, so (ordinal - 1) // 7 numbers ISO weeks
+        week_index = (self.ordinals - 1) // 7
+        week_starts = np.concatenate(([0], np.flatnonzero(np.diff(week_index)) + 1))
+        total_distance = np.add.reduceat(self.distance_in_miles, week_starts)
+        longest_run = np.maximum.reduceat(self.distance_in_miles, week_starts)
+
+        weekly_summaries = []
+        for start, distance, longest in zip(
+            week_starts.tolist(), total_distance.tolist(), longest_run.tolist()
+        ):
+            week_start_date = self.first_date + datetime.timedelta(days=start)
+            iso_calendar = week_start_date.isocalendar()
+            weekly_summaries.append(
+                WeekSummary(
+                    year=iso_calendar.year,
+                    week_of_year=iso_calendar.week,
+                    week_start_date=week_start_date,
+                    longest_run=round(longest, 2),
+                    total_distance=round(distance, 2),
+                )
+            )
+        return weekly_summaries
+
+    def dict(self) -> Dict[str, Optional[object]]:
+        """Plain representation, used to fingerprint pipeline inputs"""
+        return {
+            "first_date": self.first_date,
+            "distance_in_miles": self.distance_in_miles,
+            "elevation_gain_in_feet": self.elevation_gain_in_feet,
+            "moving_time_in_minutes": self.moving_time_in_minutes,
+            "pace_minutes_per_mile": self.pace_minutes_per_mile,
+            "activity_count": self.activity_count,
+        }
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, DailyActivity)
+            and self.first_date == other.first_date
+            and all(
+                np.array_equal(a, b, equal_nan=a.dtype.kind == "f")
+                for a, b in zip(self._columns(), other._columns())
+            )
+        )
+
+    def __repr__(self) -> str:
+        return f"DailyActivity(first_date={self.first_date}, n_days={len(self)})"
@@ -0,0 +1,271 @@
+import datetime
+import math
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+from src import activities, activity_store, concurrency, metrics
+from src.training_load import ACUTE_WINDOW, CHRONIC_WINDOW, compute_training_load
+from src.types.feature_store import (
+    AthleteFeatures,
+    MileageStats,
+    TrainingLoadSummary,
+)
+from src.types.update_pipeline import Stage
+from supabase import Client
+
+# weeks of history the prompt features are computed over
+HISTORY_NUM_WEEKS = 52
+RECENT_NUM_WEEKS = 16
+
+
+class FeatureStore(ABC):
+    """
+    Persistent per-athlete features, keyed by (athlete_id, week_start_date),
+    so prompt builders read them rather than recomputing them on every run
+    """
+
+    @abstractmethod
+    def get_features(
+        self, athlete_id: int, week_start_date: datetime.date
+    ) -> Optional[AthleteFeatures]:
+        """Stored features of the week, None if never computed"""
+
+    @abstractmethod
+    def upsert_features(self, features: AthleteFeatures) -> None:
+        """Insert or replace the features of (athlete_id, week_start_date)"""
+
+
+class SQLiteFeatureStore(FeatureStore):
+    """Local FeatureStore persisted to a single SQLite file"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS athlete_features (
+                    athlete_id INTEGER NOT NULL,
+                    week_start INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (athlete_id, week_start)
+                )
+                """
+            )
+
+    def get_features(
+        self, athlete_id: int, week_start_date: datetime.date
+    ) -> Optional[AthleteFeatures]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM athlete_features WHERE athlete_id = ? AND week_start = ?",
+                (athlete_id, week_start_date.toordinal()),
+            ).fetchone()
+        return None if row is None else AthleteFeatures.parse_raw(row["data"])
+
+    def upsert_features(self, features: AthleteFeatures) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO athlete_features (athlete_id, week_start, data)
+                VALUES (?, ?, ?)
+                """,
+                (
+                    features.athlete_id,
+                    features.week_start_date.toordinal(),
+                    features.json(),
+                ),
+            )
+
+
+class SupabaseFeatureStore(FeatureStore):
+    """FeatureStore persisted to the athlete_features table (migrations/006)"""
+
+    def __init__(self, client: Client):
+        self._client = client
+
+    @concurrency.limited(Stage.DB)
+    def get_features(
+        self, athlete_id: int, week_start_date: datetime.date
+    ) -> Optional[AthleteFeatures]:
+        rows = (
+            self._client.table("athlete_features")
+            .select("data")
+            .eq("athlete_id", athlete_id)
+            .eq("week_start", week_start_date.toordinal())
+            .execute()
+            .data
+        )
+        return AthleteFeatures.parse_raw(rows[0]["data"]) if rows else None
+
+    @concurrency.limited(Stage.DB)
+    def upsert_features(self, features: AthleteFeatures) -> None:
+        self._client.table("athlete_features").upsert(
+            {
+                "athlete_id": features.athlete_id,
+                "week_start": features.week_start_date.toordinal(),
+                "data": features.json(),
+            },
+            on_conflict="athlete_id,week_start",
+            returning="minimal",
+        ).execute()
+
+
+_feature_store: Optional[FeatureStore] = None
+_feature_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """
+    Process-wide feature store. Features are kept in the athlete_features
+    table, shared by every replica and kept across deploys. Setting
+    FEATURE_STORE_DB_PATH keeps them in a local SQLite file instead, for
+    development and benchmarks.
+
+    :return: FeatureStore
+    """
+    global _feature_store
+    # created once, pipeline worker threads may race to the first call
+    with _feature_store_lock:
+        if _feature_store is None:
+            path = os.environ.get("FEATURE_STORE_DB_PATH")
+            if path is not None:
+                _feature_store = SQLiteFeatureStore(path)
+            else:
+                # imported here as the client needs Supabase credentials
+                from src import supabase_client
+
+                _feature_store = SupabaseFeatureStore(supabase_client.client)
+        return _feature_store
+
+
+def get_mileage_stats(weekly_mileages: List[float]) -> MileageStats:
+    """
+    Returns information about the athlete's mileage stats over the past X
+    weeks, LLM-friendly once formatted as a string.
+
+    :param weekly_mileages: A list of weekly mileages.
+    :return: MileageStats object
+    """
+    total_miles = round(sum(weekly_mileages), 1)
+    return MileageStats(
+        total_miles=total_miles,
+        miles_per_week=round(total_miles / len(weekly_mileages), 1),
+        median_weekly_mileage=round(np.median(weekly_mileages), 1),
+        seventy_five_percentile_weekly_mileage=round(
+            np.percentile(weekly_mileages, 75), 1
+        ),
+        ninety_percentile_weekly_mileage=round(np.percentile(weekly_mileages, 90), 1),
+        max_weekly_mileage=max(weekly_mileages),
+    )
+
+
+def get_training_load_summary(
+    athlete_id: int, week_start_date: datetime.date
+) -> TrainingLoadSummary:
+    """
+    Training load on the day before week_start_date, from the daily totals
+    the activity store keeps
+
+    :param athlete_id: The ID of the athlete
+    :param week_start_date: Monday of the week
+    :return: TrainingLoadSummary object
+    """
+    # the ramp rate compares against the week before the chronic window
+    num_days = CHRONIC_WINDOW + ACUTE_WINDOW
+    first_date = week_start_date - datetime.timedelta(days=num_days)
+    last_date = week_start_date - datetime.timedelta(days=1)
+    daily_activity = activities.aggregate_daily_totals(
+        activity_store.get_activity_store().list_daily_totals(
+            athlete_id, start_date=first_date, end_date=last_date
+        ),
+        # the day before the first Monday is chopped off as a partial week
+        start_date=datetime.datetime.combine(
+            first_date - datetime.timedelta(days=1), datetime.time()
+        ),
+        end_date=datetime.datetime.combine(last_date, datetime.time()),
+    )
+    training_load = compute_training_load(
+        daily_activity.distance_in_miles[None, :], daily_activity.first_date
+    )
+    latest = {
+        name: None if math.isnan(value) else value
+        for name, value in training_load.get_latest(0).items()
+    }
+    return TrainingLoadSummary(
+        **latest, injury_risk=bool(training_load.get_injury_risk()[0, -1])
+    )
+
+
+def compute_athlete_features(
+    athlete_id: int, week_start_date: datetime.date, revision: int, generation: str
+) -> AthleteFeatures:
+    """
+    Compute the features of a week from the activity store's weekly summaries
+    and daily totals
+
+    :param athlete_id: The ID of the athlete
+    :param week_start_date: Monday of the week
+    :param revision: activity store revision being read
+    :param generation: activity store generation being read
+    :return: AthleteFeatures object
+    """
+    weekly_summaries = activities.get_stored_weekly_summaries(
+        athlete_id,
+        start_date=week_start_date - datetime.timedelta(weeks=HISTORY_NUM_WEEKS),
+        end_date=week_start_date - datetime.timedelta(days=1),
+    )
+    weekly_mileages = [summary.total_distance for summary in weekly_summaries]
+    return AthleteFeatures(
+        athlete_id=athlete_id,
+        week_start_date=week_start_date,
+        revision=revision,
+        generation=generation,
+        weekly_summaries=weekly_summaries,
+        last_52_weeks_mileage_stats=get_mileage_stats(weekly_mileages),
+        last_16_weeks_mileage_stats=get_mileage_stats(
+            weekly_mileages[-RECENT_NUM_WEEKS:]
+        ),
+        training_load=get_training_load_summary(athlete_id, week_start_date),
+    )
+
+
+def get_athlete_features(
+    athlete_id: int, week_start_date: datetime.date
+) -> AthleteFeatures:
+    """
+    Read-through access to an athlete's features of a week. Stored features
+    are served while the activity store has not changed since they were
+    computed, otherwise they are refreshed and stored again. Revisions start
+    over when the store is created anew, so its generation must match too.
+
+    :param athlete_id: The ID of the athlete
+    :param week_start_date: Monday of the week
+    :return: AthleteFeatures object
+    """
+    if week_start_date.weekday() != 0:
+        raise ValueError("Features are keyed by the Monday starting their week")
+
+    store = get_feature_store()
+    activities_db = activity_store.get_activity_store()
+    revision = activities_db.get_revision(athlete_id)
+    generation = activities_db.get_generation()
+    features = store.get_features(athlete_id, week_start_date)
+    if (
+        features is not None
+        and features.revision == revision
+        and features.generation == generation
+    ):
+        return features
+
+    with metrics.timer("feature_refresh"):
+        features = compute_athlete_features(
+            athlete_id, week_start_date, revision, generation
+        )
+    store.upsert_features(features)
+    return features
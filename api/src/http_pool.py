@@ -0,0 +1,185 @@
+import os
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterator
+
+import httpx
+from src import metrics
+from src.types.http_pool import HttpPoolConfig
+
+
+def get_config(env_prefix: str) -> HttpPoolConfig:
+    """
+    HttpPoolConfig overridden by environment variables named after its
+    fields, e.g. SUPABASE_HTTP_MAX_CONNECTIONS for env_prefix SUPABASE_HTTP_
+
+    :param env_prefix: prefix of the environment variables
+    :return: HttpPoolConfig object
+    """
+    overrides = {}
+    for name in HttpPoolConfig.__fields__:
+        value = os.getenv(f"{env_prefix}{name.upper()}")
+        if value is not None:
+            overrides[name] = value
+    return HttpPoolConfig(**overrides)
+
+
+def get_limits(config: HttpPoolConfig) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+
+
+def get_timeout(config: HttpPoolConfig) -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=config.connect_timeout,
+        read=config.read_timeout,
+        write=config.write_timeout,
+        pool=config.pool_timeout,
+    )
+
+
+class _TrackedByteStream(httpx.SyncByteStream):
+    """Response body that reports back once it is closed"""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class _AsyncTrackedByteStream(httpx.AsyncByteStream):
+    """Async response body that reports back once it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class _PoolStats:
+    """
+    Utilization of a transport's connection pool, published to the
+    http_pool_* gauges whenever a request starts or its response closes
+    """
+
+    def _init_stats(self, name: str, config: HttpPoolConfig) -> None:
+        self.name = name
+        self.requests_in_flight = 0
+        self._stats_lock = threading.Lock()
+        metrics.http_pool_max_connections.set(config.max_connections, name)
+        self._publish()
+
+    def _request_started(self) -> None:
+        with self._stats_lock:
+            self.requests_in_flight += 1
+        self._publish()
+
+    def _request_finished(self) -> None:
+        with self._stats_lock:
+            self.requests_in_flight -= 1
+        self._publish()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Current pool utilization
+
+        :return: dict of active & idle connections and requests in flight
+        """
+        connections = self._pool.connections
+        idle_connections = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "active_connections": len(connections) - idle_connections,
+            "idle_connections": idle_connections,
+            "requests_in_flight": self.requests_in_flight,
+        }
+
+    def _publish(self) -> None:
+        stats = self.get_stats()
+        metrics.http_pool_connections.set(
+            stats["active_connections"], self.name, "active"
+        )
+        metrics.http_pool_connections.set(stats["idle_connections"], self.name, "idle")
+        metrics.http_pool_requests_in_flight.set(stats["requests_in_flight"], self.name)
+
+
+class PooledTransport(httpx.HTTPTransport, _PoolStats):
+    """
+    Keep-alive (and HTTP/2 when enabled) connection pool meant to be shared by
+    every client of a service, so concurrent queries reuse open connections
+    instead of paying a TCP & TLS handshake each
+    """
+
+    def __init__(self, name: str, config: HttpPoolConfig):
+        super().__init__(http2=config.http2, limits=get_limits(config))
+        self._init_stats(name, config)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._request_started()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self._request_finished()
+            raise
+        response.stream = _TrackedByteStream(response.stream, self._request_finished)
+        return response
+
+    def close(self) -> None:
+        """
+        No-op: the pool is shared, a client closing (or leaving a with block)
+        must not close it under every other client. It lives as long as the
+        process.
+        """
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class AsyncPooledTransport(httpx.AsyncHTTPTransport, _PoolStats):
+    """Async variant of PooledTransport"""
+
+    def __init__(self, name: str, config: HttpPoolConfig):
+        super().__init__(http2=config.http2, limits=get_limits(config))
+        self._init_stats(name, config)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._request_started()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self._request_finished()
+            raise
+        response.stream = _AsyncTrackedByteStream(
+            response.stream, self._request_finished
+        )
+        return response
+
+    async def aclose(self) -> None:
+        """No-op, see PooledTransport.close"""
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
@@ -0,0 +1,325 @@
+import datetime
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from src import concurrency, supabase_helpers
+from src.types.job_queue import JobStatus, UpdateJob
+from src.types.update_pipeline import ExeType, ShardSpec, Stage
+from supabase import Client
+
+
+class JobQueue(ABC):
+    """
+    Persistent record of per-athlete update jobs, keyed by (run_id, athlete_id),
+    so an interrupted run can resume and failed athletes can be retried alone
+    """
+
+    @abstractmethod
+    def enqueue(self, run_id: str, athlete_ids: List[int], exe_type: ExeType) -> None:
+        """Add jobs for a run, athletes already enqueued for the run are untouched"""
+
+    @abstractmethod
+    def list_jobs(
+        self, run_id: str, statuses: Optional[List[JobStatus]] = None
+    ) -> List[UpdateJob]:
+        """List jobs for a run, optionally filtered by status"""
+
+    @abstractmethod
+    def mark_running(self, run_id: str, athlete_id: int) -> None:
+        """Mark a job as started and count the attempt"""
+
+    @abstractmethod
+    def mark_succeeded(self, run_id: str, athlete_id: int) -> None:
+        """Mark a job as done"""
+
+    @abstractmethod
+    def mark_failed(self, run_id: str, athlete_id: int, error: str) -> None:
+        """Mark a job as failed, recording the error"""
+
+    @abstractmethod
+    def retry_failed(self, run_id: str, max_attempts: int = 3) -> List[int]:
+        """Reset failed jobs with attempts remaining back to pending"""
+
+    def get_resumable_athlete_ids(self, run_id: str) -> set[int]:
+        """
+        Athletes still to process for a run. Jobs left running belong to a
+        process that died mid-update, so they are picked up again as well.
+
+        :param run_id: identifier of the run
+        :return: set of athlete_ids
+        """
+        jobs = self.list_jobs(run_id, statuses=[JobStatus.PENDING, JobStatus.RUNNING])
+        return {job.athlete_id for job in jobs}
+
+    def get_status_counts(self, run_id: str) -> Dict[JobStatus, int]:
+        """
+        Count the jobs of a run in each status
+
+        :param run_id: identifier of the run
+        :return: dict of status to count
+        """
+        counts = {status: 0 for status in JobStatus}
+        for job in self.list_jobs(run_id):
+            counts[job.status] += 1
+        return counts
+
+
+class SQLiteJobQueue(JobQueue):
+    """Local JobQueue persisted to a single SQLite file"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS update_job (
+                    run_id TEXT NOT NULL,
+                    athlete_id INTEGER NOT NULL,
+                    exe_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (run_id, athlete_id)
+                )
+                """
+            )
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    def enqueue(self, run_id: str, athlete_ids: List[int], exe_type: ExeType) -> None:
+        now = self._now()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT OR IGNORE INTO update_job
+                (run_id, athlete_id, exe_type, status, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (run_id, athlete_id, str(exe_type), str(JobStatus.PENDING), now)
+                    for athlete_id in athlete_ids
+                ],
+            )
+
+    def list_jobs(
+        self, run_id: str, statuses: Optional[List[JobStatus]] = None
+    ) -> List[UpdateJob]:
+        query = "SELECT * FROM update_job WHERE run_id = ?"
+        params = [run_id]
+        if statuses is not None:
+            query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params += [str(status) for status in statuses]
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY athlete_id", params).fetchall()
+        return [UpdateJob(**dict(row)) for row in rows]
+
+    def _set_status(
+        self,
+        run_id: str,
+        athlete_id: int,
+        status: JobStatus,
+        error: Optional[str] = None,
+        count_attempt: bool = False,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE update_job
+                SET status = ?, last_error = COALESCE(?, last_error),
+                    attempts = attempts + ?, updated_at = ?
+                WHERE run_id = ? AND athlete_id = ?
+                """,
+                (
+                    str(status),
+                    error,
+                    int(count_attempt),
+                    self._now(),
+                    run_id,
+                    athlete_id,
+                ),
+            )
+
+    def mark_running(self, run_id: str, athlete_id: int) -> None:
+        self._set_status(run_id, athlete_id, JobStatus.RUNNING, count_attempt=True)
+
+    def mark_succeeded(self, run_id: str, athlete_id: int) -> None:
+        self._set_status(run_id, athlete_id, JobStatus.SUCCEEDED)
+
+    def mark_failed(self, run_id: str, athlete_id: int, error: str) -> None:
+        self._set_status(run_id, athlete_id, JobStatus.FAILED, error=error)
+
+    def retry_failed(self, run_id: str, max_attempts: int = 3) -> List[int]:
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                """
+                SELECT athlete_id FROM update_job
+                WHERE run_id = ? AND status = ? AND attempts < ?
+                ORDER BY athlete_id
+                """,
+                (run_id, str(JobStatus.FAILED), max_attempts),
+            ).fetchall()
+            athlete_ids = [row["athlete_id"] for row in rows]
+            self._conn.executemany(
+                "UPDATE update_job SET status = ?, updated_at = ? WHERE run_id = ? AND athlete_id = ?",
+                [
+                    (str(JobStatus.PENDING), self._now(), run_id, athlete_id)
+                    for athlete_id in athlete_ids
+                ],
+            )
+        return athlete_ids
+
+
+class SupabaseJobQueue(JobQueue):
+    """
+    JobQueue persisted to the update_job table, so runs survive redeploys and
+    any replica can resume or retry a run another one started
+    """
+
+    page_size = 500
+
+    def __init__(self, client: Client):
+        self._client = client
+
+    def _table(self):
+        return self._client.table(supabase_helpers.get_update_job_table_name())
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    @concurrency.limited(Stage.DB)
+    def enqueue(self, run_id: str, athlete_ids: List[int], exe_type: ExeType) -> None:
+        if not athlete_ids:
+            return
+        now = self._now()
+        rows = [
+            {
+                "run_id": run_id,
+                "athlete_id": athlete_id,
+                "exe_type": str(exe_type),
+                "status": str(JobStatus.PENDING),
+                "attempts": 0,
+                "updated_at": now,
+            }
+            for athlete_id in athlete_ids
+        ]
+        self._table().upsert(
+            rows,
+            on_conflict="run_id,athlete_id",
+            ignore_duplicates=True,
+            returning="minimal",
+        ).execute()
+
+    @concurrency.limited(Stage.DB)
+    def list_jobs(
+        self, run_id: str, statuses: Optional[List[JobStatus]] = None
+    ) -> List[UpdateJob]:
+        # paged on athlete_id, a single select is cut off at PostgREST's max-rows
+        jobs = []
+        while True:
+            query = self._table().select("*").eq("run_id", run_id)
+            if statuses is not None:
+                query = query.in_("status", [str(status) for status in statuses])
+            if jobs:
+                query = query.gt("athlete_id", jobs[-1].athlete_id)
+            rows = query.order("athlete_id").limit(self.page_size).execute().data
+            jobs += [UpdateJob(**row) for row in rows]
+            if len(rows) < self.page_size:
+                return jobs
+
+    @concurrency.limited(Stage.DB)
+    def mark_running(self, run_id: str, athlete_id: int) -> None:
+        # a job is only ever run by one worker at a time, so reading the
+        # attempts before writing them back cannot lose an increment
+        rows = (
+            self._table()
+            .select("attempts")
+            .eq("run_id", run_id)
+            .eq("athlete_id", athlete_id)
+            .execute()
+            .data
+        )
+        if not rows:
+            return
+        self._update(
+            run_id,
+            athlete_id,
+            status=str(JobStatus.RUNNING),
+            attempts=rows[0]["attempts"] + 1,
+        )
+
+    @concurrency.limited(Stage.DB)
+    def mark_succeeded(self, run_id: str, athlete_id: int) -> None:
+        self._update(run_id, athlete_id, status=str(JobStatus.SUCCEEDED))
+
+    @concurrency.limited(Stage.DB)
+    def mark_failed(self, run_id: str, athlete_id: int, error: str) -> None:
+        self._update(run_id, athlete_id, status=str(JobStatus.FAILED), last_error=error)
+
+    def _update(self, run_id: str, athlete_id: int, **values) -> None:
+        self._table().update(
+            {**values, "updated_at": self._now()}, returning="minimal"
+        ).eq("run_id", run_id).eq("athlete_id", athlete_id).execute()
+
+    def retry_failed(self, run_id: str, max_attempts: int = 3) -> List[int]:
+        jobs = self.list_jobs(run_id, statuses=[JobStatus.FAILED])
+        athlete_ids = [job.athlete_id for job in jobs if job.attempts < max_attempts]
+        if athlete_ids:
+            with concurrency.limit(Stage.DB):
+                self._table().update(
+                    {"status": str(JobStatus.PENDING), "updated_at": self._now()},
+                    returning="minimal",
+                ).eq("run_id", run_id).eq("status", str(JobStatus.FAILED)).lt(
+                    "attempts", max_attempts
+                ).execute()
+        return athlete_ids
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Process-wide job queue. Runs are kept in the update_job table, shared by
+    every replica and kept across deploys. Setting JOB_QUEUE_DB_PATH keeps
+    them in a local SQLite file instead, for development and benchmarks.
+
+    :return: JobQueue
+    """
+    global _job_queue
+    if _job_queue is None:
+        path = os.environ.get("JOB_QUEUE_DB_PATH")
+        if path is not None:
+            _job_queue = SQLiteJobQueue(path)
+        else:
+            # imported here as the client needs Supabase credentials
+            from src import supabase_client
+
+            _job_queue = SupabaseJobQueue(supabase_client.client)
+    return _job_queue
+
+
+def get_run_id(
+    exe_type: ExeType, dt: datetime.datetime, shard_spec: Optional[ShardSpec] = None
+) -> str:
+    """
+    Identify a nightly run by its type, date and shard, so a rerun on the same
+    day resumes the same set of jobs
+
+    :param exe_type: ExeType object
+    :param dt: datetime of the run
+    :param shard_spec: ShardSpec object, None for an unsharded run
+    :return: run identifier
+    """
+    run_id = f"{exe_type}:{dt.date().isoformat()}"
+    if shard_spec is not None:
+        run_id += f":{shard_spec}"
+    return run_id
@@ -1,14 +1,18 @@
+import asyncio
 import json
 import time
 from typing import Dict, List, Optional, Type
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from openai.types.chat.chat_completion_message import ChatCompletionMessage
 from pydantic import BaseModel, ValidationError
+from src import concurrency
+from src.types.update_pipeline import Stage
 
 load_dotenv()
 client = OpenAI()
+async_client = AsyncOpenAI()
 
 
 def _get_completion(
@@ -16,12 +20,40 @@ def _get_completion(
     model: str = "gpt-4o",
     response_format: Optional[Dict] = None,
 ):
-    response = client.chat.completions.create(
-        model=model, messages=messages, response_format=response_format
-    )
+    with concurrency.limit(Stage.LLM):
+        response = client.chat.completions.create(
+            model=model, messages=messages, response_format=response_format
+        )
+    return response.choices[0].message.content
+
+
+async def _get_completion_async(
+    messages: List[ChatCompletionMessage],
+    model: str = "gpt-4o",
+    response_format: Optional[Dict] = None,
+):
+    async with concurrency.limit_async(Stage.LLM):
+        response = await async_client.chat.completions.create(
+            model=model, messages=messages, response_format=response_format
+        )
     return response.choices[0].message.content
 
 
+def _get_json_messages(
+    message: str, response_model: Type[BaseModel]
+) -> List[ChatCompletionMessage]:
+    response_model_content = (
+        f"Your json response must follow the following: {response_model.schema()=}"
+    )
+    return [
+        {
+            "role": "system",
+            "content": f"You are a helpful assistant designed to output JSON. {response_model_content}",
+        },
+        {"role": "user", "content": message},
+    ]
+
+
 def get_completion(
     message: str,
     model: str = "gpt-4o",
@@ -54,17 +86,7 @@ def get_completion_json(
     :param retry_delay: The delay between retries in seconds.
     :return: parsed Pydantic model
     """
-    response_model_content = (
-        f"Your json response must follow the following: {response_model.schema()=}"
-    )
-
-    messages = [
-        {
-            "role": "system",
-            "content": f"You are a helpful assistant designed to output JSON. {response_model_content}",
-        },
-        {"role": "user", "content": message},
-    ]
+    messages = _get_json_messages(message, response_model)
 
     for attempt in range(max_retries):
         try:
@@ -85,3 +107,58 @@ def get_completion_json(
             raise Exception(f"Failed to get a valid response: {response_str=}, {e=}")
 
     raise Exception(f"Failed to get a valid response after {max_retries} attempts")
+
+
+async def get_completion_async(
+    message: str,
+    model: str = "gpt-4o",
+):
+    """
+    Async LLM completion with raw string response
+
+    :param message: The message to send to the LLM.
+    :param model: The model to use for the completion.
+    :return: The raw string response from the LLM.
+    """
+    messages = [{"role": "user", "content": message}]
+    return await _get_completion_async(messages=messages, model=model)
+
+
+async def get_completion_json_async(
+    message: str,
+    response_model: Type[BaseModel],
+    model: str = "gpt-4o",
+    max_retries: int = 3,
+    retry_delay: float = 1.0,
+) -> BaseModel:
+    """
+    Async variant of get_completion_json, awaiting the LLM instead of blocking
+
+    :param message: The message to send to the LLM.
+    :param response_model: The Pydantic model to parse the response into.
+    :param model: The model to use for the completion.
+    :param max_retries: The maximum number of retries to attempt.
+    :param retry_delay: The delay between retries in seconds.
+    :return: parsed Pydantic model
+    """
+    messages = _get_json_messages(message, response_model)
+
+    for attempt in range(max_retries):
+        try:
+            response_str = await _get_completion_async(
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+            )
+            response = json.loads(response_str)
+            return response_model(**response)
+        except (json.JSONDecodeError, ValidationError) as e:
+            if attempt == max_retries - 1:
+                raise Exception(
+                    f"Failed to parse JSON after {max_retries} attempts: {e}"
+                )
+            await asyncio.sleep(retry_delay)
+        except Exception as e:
+            raise Exception(f"Failed to get a valid response: {response_str=}, {e=}")
+
+    raise Exception(f"Failed to get a valid response after {max_retries} attempts")
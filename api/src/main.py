@@ -1,5 +1,8 @@
+import asyncio
+import datetime
 import logging
 import os
+import uuid
 from typing import Callable, Optional
 
 from fastapi import (
@@ -13,15 +16,29 @@ from fastapi import (
     Request,
     Response,
 )
-from src import activities, auth_manager, email_manager, supabase_client, utils, webhook
+from fastapi.responses import PlainTextResponse
+from src import (
+    activities,
+    auth_manager,
+    email_manager,
+    metrics,
+    supabase_client,
+    utils,
+    webhook,
+)
 from src.middleware import log_and_handle_errors
 from src.types.feedback import FeedbackRow
+from src.types.job_queue import RefreshJobRow
 from src.types.training_plan import TrainingPlan
 from src.types.training_week import FullTrainingWeek
-from src.types.update_pipeline import ExeType
+from src.types.update_pipeline import ConcurrencyConfig, ShardSpec
 from src.types.user import UserRow
 from src.types.webhook import StravaEvent
-from src.update_pipeline import update_all_users, update_training_week
+from src.update_pipeline import (
+    refresh_training_weeks_async,
+    retry_failed_users_async,
+    update_all_users_async,
+)
 
 app = FastAPI()
 
@@ -41,6 +58,14 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> str:
+    """
+    Update pipeline stage timing histograms in the Prometheus text format
+    """
+    return metrics.render()
+
+
 @app.get("/training-week/", response_model=FullTrainingWeek)
 async def training_week(user: UserRow = Depends(auth_manager.validate_user)):
     """
@@ -120,9 +145,21 @@ async def get_weekly_summaries(
     :param user: The authenticated user
     :return: List of WeekSummary objects as JSON
     """
-    strava_client = auth_manager.get_strava_client(user.athlete_id)
-    weekly_summaries = activities.get_weekly_summaries(
-        strava_client=strava_client, dt=utils.datetime_now_est()
+    dt = utils.datetime_now_est()
+    start_date = dt - datetime.timedelta(weeks=8)
+
+    # only the edges of the range the store has not synced yet are fetched,
+    # usually just the activities since the last pipeline run
+    activities.sync_activity_store(
+        auth_manager.get_strava_client(user.athlete_id),
+        user.athlete_id,
+        start_date=start_date,
+        end_date=dt,
+    )
+    weekly_summaries = activities.get_stored_weekly_summaries(
+        user.athlete_id,
+        start_date=activities.get_first_monday(start_date.date()),
+        end_date=dt.date(),
     )
     return {
         "success": True,
@@ -130,6 +167,29 @@ async def get_weekly_summaries(
     }
 
 
+@app.post("/resync-activities/")
+async def resync_activities(
+    user: UserRow = Depends(auth_manager.validate_user),
+) -> dict:
+    """
+    Drop the user's stored activities and fetch them again from Strava
+
+    :param user: The authenticated user
+    :return: Success status and number of activities stored
+    """
+    strava_client = auth_manager.get_strava_client(user.athlete_id)
+    dt = utils.datetime_now_est()
+    synced_activities = activities.sync_activities(
+        strava_client,
+        user.athlete_id,
+        # covers the 52 weeks the pipeline reads plus the /refresh/ margin
+        start_date=dt - datetime.timedelta(weeks=53),
+        end_date=dt,
+        full_resync=True,
+    )
+    return {"success": True, "n_activities": len(synced_activities)}
+
+
 @app.post("/authenticate/")
 async def authenticate(
     code: Optional[str] = Form(None),
@@ -173,31 +233,89 @@ async def strava_webhook(request: Request, background_tasks: BackgroundTasks) ->
 
 @app.post("/refresh/")
 async def refresh_user_data(
+    background_tasks: BackgroundTasks,
     user: UserRow = Depends(auth_manager.validate_user),
 ) -> dict:
     """
-    Trigger new week and mid-week updates
+    Trigger new week and mid-week updates in the background
 
+    :param background_tasks: FastAPI background tasks
     :param user: The authenticated user
-    :return: Success status
+    :return: Success status and the job_id to poll /refresh/{job_id}/ with
     """
-    update_training_week(user, ExeType.NEW_WEEK, dt=utils.get_last_sunday())
-    update_training_week(user, ExeType.MID_WEEK, dt=utils.datetime_now_est())
-    return {"success": True}
+    job_id = str(uuid.uuid4())
+    await supabase_client.upsert_refresh_job_async(
+        RefreshJobRow(job_id=job_id, athlete_id=user.athlete_id)
+    )
+    background_tasks.add_task(refresh_training_weeks_async, user, job_id)
+    return {"success": True, "job_id": job_id}
+
+
+@app.get("/refresh/{job_id}/")
+async def get_refresh_status(
+    job_id: str, user: UserRow = Depends(auth_manager.validate_user)
+) -> dict:
+    """
+    Get the status & progress of a refresh job
+
+    :param job_id: The job_id returned by /refresh/
+    :param user: The authenticated user
+    :return: Job status, progress in [0, 1] and error if the job failed
+    """
+    try:
+        job = await asyncio.to_thread(
+            supabase_client.get_refresh_job, job_id, user.athlete_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {
+        "success": True,
+        "job_id": job.job_id,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+    }
 
 
 @app.post("/update-all-users/")
-async def update_all_users_trigger(request: Request) -> dict:
+async def update_all_users_trigger(
+    request: Request, shard_index: int = 0, shard_count: int = 1
+) -> dict:
     """
-    Trigger nightly updates for all users
+    Trigger nightly updates for all users, or for one shard of the user base
+    (partitioned by athlete_id hash) when shard_index & shard_count are given
     Protected by API key authentication
     """
     api_key = request.headers.get("x-api-key")
     if api_key != os.environ["API_KEY"]:
         raise HTTPException(status_code=403, detail="Invalid API key")
 
-    update_all_users()
-    return {"success": True}
+    try:
+        shard_spec = ShardSpec(shard_index=shard_index, shard_count=shard_count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await update_all_users_async(
+        concurrency_config=ConcurrencyConfig(),
+        shard_spec=shard_spec if shard_count > 1 else None,
+    )
+
+
+@app.post("/retry-failed-users/")
+async def retry_failed_users_trigger(
+    request: Request, run_id: str = Body(..., embed=True)
+) -> dict:
+    """
+    Retry the failed jobs of a previous nightly run
+    Protected by API key authentication
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key != os.environ["API_KEY"]:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+    return await retry_failed_users_async(
+        run_id=run_id, concurrency_config=ConcurrencyConfig()
+    )
 
 
 @app.get("/training-plan/", response_model=TrainingPlan)
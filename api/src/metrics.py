@@ -0,0 +1,233 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.types.update_pipeline import ExeType
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+current_exe_type: contextvars.ContextVar[Optional[ExeType]] = contextvars.ContextVar(
+    "current_exe_type", default=None
+)
+
+
+class Histogram:
+    """
+    Minimal thread-safe Prometheus-style histogram with string label values,
+    rendered in the Prometheus text exposition format
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Tuple[str, ...],
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            if labelvalues not in self._counts:
+                self._counts[labelvalues] = [0] * (len(self.buckets) + 1)
+                self._sums[labelvalues] = 0.0
+            counts = self._counts[labelvalues]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[labelvalues] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """
+        Current (count, sum) per label set, useful to diff over a window
+
+        :return: dict of label values to (count, sum)
+        """
+        with self._lock:
+            return {
+                labels: (counts[-1], self._sums[labels])
+                for labels, counts in self._counts.items()
+            }
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for labelvalues, counts in sorted(self._counts.items()):
+                labels = ",".join(
+                    f'{name}="{value}"'
+                    for name, value in zip(self.labelnames, labelvalues)
+                )
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {counts[-1]}')
+                lines.append(f"{self.name}_sum{{{labels}}} {self._sums[labelvalues]}")
+                lines.append(f"{self.name}_count{{{labels}}} {counts[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class Gauge:
+    """
+    Minimal thread-safe Prometheus-style gauge with string label values,
+    rendered in the Prometheus text exposition format
+    """
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def get(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+        ]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                labels = ",".join(
+                    f'{name}="{value}"'
+                    for name, value in zip(self.labelnames, labelvalues)
+                )
+                lines.append(f"{self.name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+stage_seconds = Histogram(
+    name="update_pipeline_stage_seconds",
+    description="Duration of each update pipeline stage in seconds",
+    labelnames=("stage", "exe_type"),
+)
+
+
+# stage timings of the run the current thread or task belongs to, on top of
+# the process-wide stage_seconds which every concurrent request adds to
+current_run_stages: contextvars.ContextVar[Optional[Histogram]] = (
+    contextvars.ContextVar("current_run_stages", default=None)
+)
+
+
+http_pool_connections = Gauge(
+    name="http_pool_connections",
+    description="Connections held by each HTTP pool, by state (active, idle)",
+    labelnames=("pool", "state"),
+)
+
+http_pool_max_connections = Gauge(
+    name="http_pool_max_connections",
+    description="Connection limit of each HTTP pool",
+    labelnames=("pool",),
+)
+
+http_pool_requests_in_flight = Gauge(
+    name="http_pool_requests_in_flight",
+    description="Requests sent through each HTTP pool whose response is not yet closed",
+    labelnames=("pool",),
+)
+
+
+@contextmanager
+def track_exe_type(exe_type: ExeType) -> Iterator[None]:
+    """
+    Tag every stage timed inside the block with exe_type
+
+    :param exe_type: ExeType object
+    """
+    token = current_exe_type.set(exe_type)
+    try:
+        yield
+    finally:
+        current_exe_type.reset(token)
+
+
+@contextmanager
+def track_run() -> Iterator[Histogram]:
+    """
+    Also record every stage timed inside the block, including in threads
+    started through concurrency.propagate and in tasks it creates, to a
+    histogram of its own, so a run's summary leaves out concurrent requests
+
+    :return: Histogram of the run's stage timings
+    """
+    run_stages = Histogram(
+        name=stage_seconds.name,
+        description=stage_seconds.description,
+        labelnames=stage_seconds.labelnames,
+    )
+    token = current_run_stages.set(run_stages)
+    try:
+        yield run_stages
+    finally:
+        current_run_stages.reset(token)
+
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    """
+    Record the duration of the block under stage, tagged by the current
+    exe_type, and to the current run's histogram when inside track_run
+
+    :param stage: name of the pipeline stage
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        exe_type = current_exe_type.get()
+        labelvalues = (stage, str(exe_type) if exe_type is not None else "none")
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, *labelvalues)
+        run_stages = current_run_stages.get()
+        if run_stages is not None:
+            run_stages.observe(elapsed, *labelvalues)
+
+
+def summarize_stages(snapshot: Dict[Tuple[str, ...], Tuple[int, float]]) -> str:
+    """
+    One-line summary of stage timings
+
+    :param snapshot: snapshot() of the Histogram returned by track_run
+    :return: str e.g. "strava_fetch[mid_week] n=3 avg=1.20s total=3.60s | ..."
+    """
+    parts = []
+    for labels, (count, total) in sorted(snapshot.items()):
+        if count == 0:
+            continue
+        stage, exe_type = labels
+        parts.append(
+            f"{stage}[{exe_type}] n={count} avg={total / count:.2f}s total={total:.2f}s"
+        )
+    return " | ".join(parts) if parts else "no stages recorded"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "".join(
+        metric.render()
+        for metric in (
+            stage_seconds,
+            http_pool_connections,
+            http_pool_max_connections,
+            http_pool_requests_in_flight,
+        )
+    )
@@ -1,16 +1,21 @@
+import asyncio
 import datetime
 import logging
 from typing import List, Tuple
 
-from src import activities, supabase_client
+from src import feature_store, metrics, supabase_client
 from src.constants import COACH_ROLE
-from src.llm import get_completion_json
-from src.training_plan import gen_training_plan_pipeline
-from src.types.activity import DailyMetrics, WeekSummary
+from src.llm import get_completion_json, get_completion_json_async
+from src.training_plan import (
+    gen_training_plan_pipeline,
+    gen_training_plan_pipeline_async,
+)
+from src.types.feature_store import AthleteFeatures
 from src.types.mileage_recommendation import (
     MileageRecommendation,
     MileageRecommendationRow,
 )
+from src.types.training_plan import TrainingPlan
 from src.types.update_pipeline import ExeType
 from src.types.user import Preferences, UserRow
 
@@ -18,9 +23,34 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def get_mileage_recommendation_message(
+    user_preferences: Preferences,
+    features: AthleteFeatures,
+) -> str:
+    """
+    Build the mileage recommendation prompt
+
+    :param user_preferences: The athlete's preferences
+    :param features: AthleteFeatures of the upcoming week
+    :return: prompt string
+    """
+    weekly_summaries_str = "\n".join([str(week) for week in features.weekly_summaries])
+
+    return f"""{COACH_ROLE}
+
+Your athlete has provided the following preferences: {user_preferences}
+
+Here is a summary of the athlete's training for the past {len(features.weekly_summaries)} weeks (in reverse chronological order):
+{weekly_summaries_str}
+
+Here is the athlete's current training load:
+{features.training_load}
+Your task is to provide training recommendations for the upcoming week."""
+
+
 def gen_mileage_recommendation(
     user_preferences: Preferences,
-    weekly_summaries: List[WeekSummary],
+    features: AthleteFeatures,
 ) -> MileageRecommendation:
     """
     Recommend a mileage target for total volume and long run
@@ -28,35 +58,62 @@ def gen_mileage_recommendation(
     This should only be called on Sunday night. If called mid-week, recs will
     break due to the current weekly summary not being complete.
 
-    :param weekly_summaries: The athlete's weekly summaries
+    :param features: AthleteFeatures of the upcoming week
     :return: A MileageRecommendation
     """
-    weekly_summaries_str = "\n".join([str(week) for week in weekly_summaries])
+    with metrics.timer("mileage_recommendation_llm"):
+        return get_completion_json(
+            message=get_mileage_recommendation_message(
+                user_preferences=user_preferences, features=features
+            ),
+            response_model=MileageRecommendation,
+        )
 
-    message = f"""{COACH_ROLE}
 
-Your athlete has provided the following preferences: {user_preferences}
+async def gen_mileage_recommendation_async(
+    user_preferences: Preferences,
+    features: AthleteFeatures,
+) -> MileageRecommendation:
+    """
+    Async variant of gen_mileage_recommendation
 
-Here is a summary of the athlete's training for the past {len(weekly_summaries)} weeks (in reverse chronological order):
-{weekly_summaries_str}
+    :param features: AthleteFeatures of the upcoming week
+    :return: A MileageRecommendation
+    """
+    with metrics.timer("mileage_recommendation_llm"):
+        return await get_completion_json_async(
+            message=get_mileage_recommendation_message(
+                user_preferences=user_preferences, features=features
+            ),
+            response_model=MileageRecommendation,
+        )
 
-Your task is to provide training recommendations for the upcoming week."""
 
-    return get_completion_json(
-        message=message,
-        response_model=MileageRecommendation,
+def get_next_week_mileage_recommendation(
+    training_plan: TrainingPlan,
+) -> MileageRecommendation:
+    """
+    Pull next week's mileage targets out of a freshly generated training plan
+
+    :param training_plan: TrainingPlan object
+    :return: MileageRecommendation
+    """
+    next_week_plan = training_plan.training_plan_weeks[0]
+    return MileageRecommendation(
+        thoughts=next_week_plan.notes,
+        total_volume=next_week_plan.total_distance,
+        long_run=next_week_plan.long_run_distance,
     )
 
 
 def gen_mileage_rec_wrapper(
-    user: UserRow, daily_activity: List[DailyMetrics], dt: datetime.datetime
+    user: UserRow, dt: datetime.datetime
 ) -> MileageRecommendation:
     """
     Abstraction for mileage rec generation, either pulled from training plan
     generation or generated directly from weekly summaries
 
     :param user: UserRow object
-    :param daily_activity: List of DailyMetrics objects
     :param dt: datetime injection, helpful for testing
     :return: MileageRecommendation used to generate training week
     """
@@ -65,47 +122,111 @@ def gen_mileage_rec_wrapper(
             "Mileage recommendation can only be generated on Sunday (night) when the week is complete"
         )
 
-    weekly_summaries = activities.get_weekly_summaries(daily_metrics=daily_activity)
+    # the pipeline synced the activity store while fetching daily activity,
+    # features of the upcoming week are read from the feature store
+    features = feature_store.get_athlete_features(
+        user.athlete_id, week_start_date=dt.date() + datetime.timedelta(days=1)
+    )
     if user.preferences.race_date and user.preferences.race_distance:
-        training_plan = gen_training_plan_pipeline(
-            user=user, weekly_summaries=weekly_summaries, dt=dt
+        training_plan = gen_training_plan_pipeline(user=user, features=features, dt=dt)
+        return get_next_week_mileage_recommendation(training_plan)
+    else:
+        return gen_mileage_recommendation(
+            user_preferences=user.preferences,
+            features=features,
         )
-        next_week_plan = training_plan.training_plan_weeks[0]
-        return MileageRecommendation(
-            thoughts=next_week_plan.notes,
-            total_volume=next_week_plan.total_distance,
-            long_run=next_week_plan.long_run_distance,
+
+
+async def gen_mileage_rec_wrapper_async(
+    user: UserRow, dt: datetime.datetime
+) -> MileageRecommendation:
+    """
+    Async variant of gen_mileage_rec_wrapper
+
+    :param user: UserRow object
+    :param dt: datetime injection, helpful for testing
+    :return: MileageRecommendation used to generate training week
+    """
+    if dt.weekday() != 6:
+        raise ValueError(
+            "Mileage recommendation can only be generated on Sunday (night) when the week is complete"
         )
+
+    # the pipeline synced the activity store while fetching daily activity,
+    # features of the upcoming week are read from the feature store, on a
+    # worker thread as its reads (and any refresh) block
+    features = await asyncio.to_thread(
+        feature_store.get_athlete_features,
+        user.athlete_id,
+        week_start_date=dt.date() + datetime.timedelta(days=1),
+    )
+    if user.preferences.race_date and user.preferences.race_distance:
+        training_plan = await gen_training_plan_pipeline_async(
+            user=user, features=features, dt=dt
+        )
+        return get_next_week_mileage_recommendation(training_plan)
     else:
-        return gen_mileage_recommendation(
+        return await gen_mileage_recommendation_async(
             user_preferences=user.preferences,
-            weekly_summaries=weekly_summaries,
+            features=features,
         )
 
 
+def get_mileage_recommendation_row(
+    user: UserRow, mileage_recommendation: MileageRecommendation, dt: datetime.datetime
+) -> MileageRecommendationRow:
+    """
+    Key a mileage recommendation to the week following dt
+
+    :param user: user entity
+    :param mileage_recommendation: mileage recommendation entity
+    :param dt: datetime injection, helpful for testing
+    :return: MileageRecommendationRow
+    """
+    tomorrow = dt + datetime.timedelta(days=1)
+    return MileageRecommendationRow(
+        week_of_year=tomorrow.isocalendar().week,
+        year=tomorrow.isocalendar().year,
+        thoughts=mileage_recommendation.thoughts,
+        total_volume=mileage_recommendation.total_volume,
+        long_run=mileage_recommendation.long_run,
+        athlete_id=user.athlete_id,
+    )
+
+
 def create_new_mileage_recommendation(
-    user: UserRow, daily_activity: List[DailyMetrics], dt: datetime.datetime
+    user: UserRow, dt: datetime.datetime
 ) -> MileageRecommendation:
     """
     Creates a new mileage recommendation for the next week
 
     :param user: user entity
-    :param daily_activity: list of daily metrics
     :param dt: datetime injection, helpful for testing
     :return: mileage recommendation entity
     """
-    mileage_recommendation = gen_mileage_rec_wrapper(
-        user=user, daily_activity=daily_activity, dt=dt
-    )
-    tomorrow = dt + datetime.timedelta(days=1)
+    mileage_recommendation = gen_mileage_rec_wrapper(user=user, dt=dt)
     supabase_client.insert_mileage_recommendation(
-        MileageRecommendationRow(
-            week_of_year=tomorrow.isocalendar().week,
-            year=tomorrow.isocalendar().year,
-            thoughts=mileage_recommendation.thoughts,
-            total_volume=mileage_recommendation.total_volume,
-            long_run=mileage_recommendation.long_run,
-            athlete_id=user.athlete_id,
+        get_mileage_recommendation_row(
+            user=user, mileage_recommendation=mileage_recommendation, dt=dt
+        )
+    )
+    return mileage_recommendation
+
+
+async def create_new_mileage_recommendation_async(
+    user: UserRow, dt: datetime.datetime
+) -> MileageRecommendation:
+    """
+    Async variant of create_new_mileage_recommendation
+
+    :param user: user entity
+    :param dt: datetime injection, helpful for testing
+    :return: mileage recommendation entity
+    """
+    mileage_recommendation = await gen_mileage_rec_wrapper_async(user=user, dt=dt)
+    await supabase_client.insert_mileage_recommendation_async(
+        get_mileage_recommendation_row(
+            user=user, mileage_recommendation=mileage_recommendation, dt=dt
         )
     )
     return mileage_recommendation
@@ -113,7 +234,6 @@ def create_new_mileage_recommendation(
 
 def get_or_gen_mileage_recommendation(
     user: UserRow,
-    daily_activity: List[DailyMetrics],
     exe_type: ExeType,
     dt: datetime,
 ) -> MileageRecommendation:
@@ -121,15 +241,12 @@ def get_or_gen_mileage_recommendation(
     Executes mileage rec strategy depending on exe type
 
     :param user: user entity
-    :param daily_activity: list of daily metrics
     :param exe_type: new week or mid week
     :param dt: datetime injection, helpful for testing
     :return: mileage recommendation entity
     """
     if exe_type == ExeType.NEW_WEEK:
-        return create_new_mileage_recommendation(
-            user=user, daily_activity=daily_activity, dt=dt
-        )
+        return create_new_mileage_recommendation(user=user, dt=dt)
     else:
         mileage_recommendation_row = supabase_client.get_mileage_recommendation(
             athlete_id=user.athlete_id, dt=dt
@@ -139,3 +256,31 @@ def get_or_gen_mileage_recommendation(
             total_volume=mileage_recommendation_row.total_volume,
             long_run=mileage_recommendation_row.long_run,
         )
+
+
+async def get_or_gen_mileage_recommendation_async(
+    user: UserRow,
+    exe_type: ExeType,
+    dt: datetime,
+) -> MileageRecommendation:
+    """
+    Async variant of get_or_gen_mileage_recommendation
+
+    :param user: user entity
+    :param exe_type: new week or mid week
+    :param dt: datetime injection, helpful for testing
+    :return: mileage recommendation entity
+    """
+    if exe_type == ExeType.NEW_WEEK:
+        return await create_new_mileage_recommendation_async(user=user, dt=dt)
+    else:
+        mileage_recommendation_row = (
+            await supabase_client.get_mileage_recommendation_async(
+                athlete_id=user.athlete_id, dt=dt
+            )
+        )
+        return MileageRecommendation(
+            thoughts=mileage_recommendation_row.thoughts,
+            total_volume=mileage_recommendation_row.total_volume,
+            long_run=mileage_recommendation_row.long_run,
+        )
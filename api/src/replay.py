@@ -0,0 +1,346 @@
+import asyncio
+import datetime
+import functools
+import inspect
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src import concurrency, utils
+from src.types.replay import LatencyConfig, ReplayMode
+from src.types.update_pipeline import Stage
+
+logger = logging.getLogger(__name__)
+
+# supabase_client functions that never leave the process, or only through
+# other supabase_client functions
+SUPABASE_LOCAL_FUNCTIONS = {
+    "init",
+    "get_async_client",
+    "iter_user_pages",
+    "iter_users",
+    "list_users",
+    "get_training_week_row",
+    "get_training_plan_rows",
+    "get_updated_today_cutoff",
+}
+
+Target = Tuple[ModuleType, str, Optional[Stage]]
+
+
+def get_targets() -> List[Target]:
+    """
+    Every (module, function name, stage) the update pipeline reaches the
+    network through, besides Strava which is handled by ReplaySession itself.
+    Imported lazily since these modules need credentials in the environment.
+
+    :return: list of targets to record or replay
+    """
+    from src import apn, email_manager, llm, supabase_client
+
+    targets = [
+        (llm, "_get_completion", Stage.LLM),
+        (llm, "_get_completion_async", Stage.LLM),
+        (apn, "send_push_notif_wrapper", None),
+        (email_manager, "send_alert_email", None),
+    ]
+    for name, func in inspect.getmembers(supabase_client, inspect.isfunction):
+        if (
+            func.__module__ == supabase_client.__name__
+            and not name.startswith("_")
+            and name not in SUPABASE_LOCAL_FUNCTIONS
+        ):
+            targets.append((supabase_client, name, Stage.DB))
+    return targets
+
+
+ACTIVITIES_URL = "/athlete/activities"
+
+
+class RecordingProtocol:
+    """Proxy to a Strava client's protocol recording raw activity pages"""
+
+    def __init__(self, protocol: Any, athlete_id: int, session: "ReplaySession"):
+        self._protocol = protocol
+        self._athlete_id = athlete_id
+        self._session = session
+
+    def get(self, url: str, **kwargs) -> Any:
+        response = self._protocol.get(url, **kwargs)
+        if url == ACTIVITIES_URL:
+            self._session.record(
+                "strava.activities", utils.get_fingerprint(self._athlete_id), response
+            )
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._protocol, name)
+
+
+class RecordingStravaClient:
+    """Proxy to a real Strava client that records every fetched activity"""
+
+    def __init__(self, client: Any, athlete_id: int, session: "ReplaySession"):
+        self._client = client
+        self.protocol = RecordingProtocol(client.protocol, athlete_id, session)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class ReplayProtocol:
+    """Offline stand-in for a Strava protocol paging recorded raw activities"""
+
+    def __init__(self, activities: List[dict], latency: float = 0.0):
+        # Strava lists activities newest first
+        self._activities = sorted(
+            activities, key=lambda activity: activity["start_date"], reverse=True
+        )
+        self._latency = latency
+
+    def get(
+        self,
+        url: str,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+        page: int = 1,
+        per_page: int = 30,
+    ) -> List[dict]:
+        if url != ACTIVITIES_URL:
+            raise ValueError(f"{url} is not replayed, only {ACTIVITIES_URL}")
+        time.sleep(self._latency)
+        activities = [
+            activity
+            for activity in self._activities
+            if (after is None or _get_epoch(activity) > after)
+            and (before is None or _get_epoch(activity) < before)
+        ]
+        return activities[(page - 1) * per_page : page * per_page]
+
+
+def _get_epoch(raw_activity: dict) -> float:
+    return datetime.datetime.fromisoformat(
+        raw_activity["start_date"].replace("Z", "+00:00")
+    ).timestamp()
+
+
+class ReplayStravaClient:
+    """Offline stand-in for a Strava client serving recorded activities"""
+
+    def __init__(self, activities: List[dict], latency: float = 0.0):
+        self.protocol = ReplayProtocol(activities, latency=latency)
+
+
+class ReplaySession:
+    """
+    Recorded responses of external calls, keyed by the call name and its bound
+    arguments. Repeated calls with the same key replay in recorded order.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: ReplayMode,
+        latency: Optional[LatencyConfig] = None,
+        strict: bool = True,
+    ):
+        """
+        :param path: fixture file to write (record) or read (replay)
+        :param mode: ReplayMode object
+        :param latency: latency injected into replayed calls
+        :param strict: raise on a replayed call that was never recorded, rather
+            than falling back to any response recorded for the same function
+        """
+        self.path = path
+        self.mode = mode
+        self.latency = latency or LatencyConfig()
+        self.strict = strict
+        self.metadata: Dict[str, Any] = {}
+        self._calls: List[Tuple[str, str, Any]] = []
+        self._by_key: Dict[Tuple[str, str], List[Any]] = defaultdict(list)
+        self._by_name: Dict[str, List[Any]] = defaultdict(list)
+        self._cursors: Dict[Any, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if mode == ReplayMode.REPLAY:
+            self.load()
+
+    def load(self) -> None:
+        with open(self.path, "rb") as f:
+            fixture = pickle.load(f)
+        self.metadata = fixture["metadata"]
+        for name, key, result in fixture["calls"]:
+            self._index(name, key, result)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "wb") as f:
+            pickle.dump({"metadata": self.metadata, "calls": self._calls}, f)
+        logger.info(f"Recorded {len(self._calls)} calls to {self.path}")
+
+    def _index(self, name: str, key: str, result: Any) -> None:
+        self._calls.append((name, key, result))
+        self._by_key[(name, key)].append(result)
+        self._by_name[name].append(result)
+
+    def record(self, name: str, key: str, result: Any) -> None:
+        with self._lock:
+            self._index(name, key, result)
+
+    def _next(self, index_key: Any, results: List[Any]) -> Any:
+        cursor = self._cursors[index_key]
+        self._cursors[index_key] = cursor + 1
+        return results[min(cursor, len(results) - 1)]
+
+    def lookup(self, name: str, key: str) -> Any:
+        with self._lock:
+            if (name, key) in self._by_key:
+                return self._next((name, key), self._by_key[(name, key)])
+            if not self.strict and self._by_name.get(name):
+                return self._next(name, self._by_name[name])
+        raise ValueError(f"No recorded response for {name} in {self.path}")
+
+    def get_latency(self, stage: Optional[Stage]) -> float:
+        return getattr(self.latency, stage) if stage else 0.0
+
+    def wrap(self, name: str, func: Callable, stage: Optional[Stage]) -> Callable:
+        """
+        Record or replay a function, preserving whether it is a coroutine
+
+        :param name: name the calls are recorded under
+        :param func: the function to wrap
+        :param stage: stage whose latency is injected on replay
+        :return: wrapped function
+        """
+        signature = inspect.signature(func)
+        latency = self.get_latency(stage)
+
+        def get_key(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return utils.get_fingerprint(bound.arguments)
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = get_key(args, kwargs)
+                if self.mode == ReplayMode.RECORD:
+                    result = await func(*args, **kwargs)
+                    self.record(name, key, result)
+                    return result
+                if stage is None:
+                    await asyncio.sleep(latency)
+                else:
+                    async with concurrency.limit_async(stage):
+                        await asyncio.sleep(latency)
+                return self.lookup(name, key)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = get_key(args, kwargs)
+            if self.mode == ReplayMode.RECORD:
+                result = func(*args, **kwargs)
+                self.record(name, key, result)
+                return result
+            # the real call held a stage slot, the simulated one does too
+            if stage is None:
+                time.sleep(latency)
+            else:
+                with concurrency.limit(stage):
+                    time.sleep(latency)
+            return self.lookup(name, key)
+
+        return wrapper
+
+    def wrap_strava_client(self, get_strava_client: Callable) -> Callable:
+        """
+        Record the activities fetched through a Strava client, or hand out
+        clients serving them back offline
+
+        :param get_strava_client: auth_manager.get_strava_client
+        :return: wrapped function
+        """
+
+        @functools.wraps(get_strava_client)
+        def wrapper(athlete_id: int):
+            if self.mode == ReplayMode.RECORD:
+                return RecordingStravaClient(
+                    get_strava_client(athlete_id), athlete_id, self
+                )
+
+            with self._lock:
+                recorded = self._by_key.get(
+                    ("strava.activities", utils.get_fingerprint(athlete_id)), []
+                )
+            activities_by_id = {
+                activity["id"]: activity for page in recorded for activity in page
+            }
+            return ReplayStravaClient(
+                list(activities_by_id.values()), latency=self.latency.strava
+            )
+
+        return wrapper
+
+
+@contextmanager
+def session(
+    path: str,
+    mode: ReplayMode,
+    latency: Optional[LatencyConfig] = None,
+    strict: bool = True,
+    targets: Optional[List[Target]] = None,
+) -> Iterator[ReplaySession]:
+    """
+    Record every external call made by the update pipeline to a fixture, or
+    replay a fixture with injected latency and no network access. Recorded
+    sessions are saved on exit.
+
+    :param path: fixture file to write (record) or read (replay)
+    :param mode: ReplayMode object
+    :param latency: latency injected into replayed calls
+    :param strict: raise on a replayed call that was never recorded
+    :param targets: functions to patch, defaults to get_targets()
+    :return: the active ReplaySession
+    """
+    replay_session = ReplaySession(path, mode, latency=latency, strict=strict)
+    patches = []
+    if targets is None:
+        from src import auth_manager
+
+        patches.append(
+            (
+                auth_manager,
+                "get_strava_client",
+                replay_session.wrap_strava_client(auth_manager.get_strava_client),
+            )
+        )
+        targets = get_targets()
+
+    for module, name, stage in targets:
+        func = getattr(module, name)
+        patches.append(
+            (
+                module,
+                name,
+                replay_session.wrap(f"{module.__name__}.{name}", func, stage),
+            )
+        )
+
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, wrapped in patches:
+        setattr(module, name, wrapped)
+    try:
+        yield replay_session
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+        if mode == ReplayMode.RECORD:
+            replay_session.save()
@@ -0,0 +1,87 @@
+import hashlib
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from src.types.update_pipeline import ShardSpec
+from src.types.user import UserRow
+
+
+def get_shard_index(athlete_id: int, shard_count: int) -> int:
+    """
+    Stable shard assignment for an athlete. Python's hash() is salted per
+    process, so md5 is used to get the same answer on every replica.
+
+    :param athlete_id: strava internal identifier
+    :param shard_count: total number of shards
+    :return: index of the shard owning this athlete
+    """
+    digest = hashlib.md5(str(athlete_id).encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def in_shard(athlete_id: int, shard_spec: ShardSpec) -> bool:
+    """
+    Check whether an athlete belongs to a shard
+
+    :param athlete_id: strava internal identifier
+    :param shard_spec: ShardSpec object
+    :return: True if the athlete is owned by this shard
+    """
+    return get_shard_index(athlete_id, shard_spec.shard_count) == shard_spec.shard_index
+
+
+def filter_shard(users: Iterable[UserRow], shard_spec: ShardSpec) -> List[UserRow]:
+    """
+    Keep only the users owned by a shard
+
+    :param users: UserRow objects
+    :param shard_spec: ShardSpec object
+    :return: list of UserRow objects in the shard
+    """
+    return [user for user in users if in_shard(user.athlete_id, shard_spec)]
+
+
+def check_shard_coverage(
+    athlete_ids: Iterable[int], shard_count: int
+) -> Dict[int, List[int]]:
+    """
+    Assign every athlete with each shard's filter independently and verify
+    that each athlete lands in exactly one shard
+
+    :param athlete_ids: athlete_ids of the full user base
+    :param shard_count: total number of shards
+    :return: dict of shard index to the athlete_ids it owns
+    :raises ValueError: if any athlete is owned by zero or several shards
+    """
+    athlete_ids = list(athlete_ids)
+    shards = defaultdict(list)
+    for shard_index in range(shard_count):
+        shard_spec = ShardSpec(shard_index=shard_index, shard_count=shard_count)
+        for athlete_id in athlete_ids:
+            if in_shard(athlete_id, shard_spec):
+                shards[shard_index].append(athlete_id)
+
+    assignments = defaultdict(int)
+    for owned in shards.values():
+        for athlete_id in owned:
+            assignments[athlete_id] += 1
+    uncovered = [a for a in athlete_ids if assignments[a] == 0]
+    duplicated = [a for a in athlete_ids if assignments[a] > 1]
+    if uncovered or duplicated:
+        raise ValueError(
+            f"Shards do not cover users exactly once: {uncovered=}, {duplicated=}"
+        )
+    return {shard_index: shards[shard_index] for shard_index in range(shard_count)}
+
+
+if __name__ == "__main__":
+    # usage: python -m src.sharding <shard_count>
+    from src import supabase_client
+
+    shard_count = int(sys.argv[1])
+    users = supabase_client.list_users(columns="athlete_id")
+    shards = check_shard_coverage([user.athlete_id for user in users], shard_count)
+    for shard_index, athlete_ids in shards.items():
+        print(f"shard {shard_index}: {len(athlete_ids)} users")
+    print(f"All {len(users)} users covered exactly once by {shard_count} shards")
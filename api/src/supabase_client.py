@@ -1,13 +1,17 @@
 import datetime
 import logging
 import os
-from typing import List, Optional
+from typing import Iterator, List, Optional, Union
 from uuid import uuid4
 
 import orjson
+import postgrest
 from dotenv import load_dotenv
-from src import auth_manager, supabase_helpers
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from src import auth_manager, concurrency, http_pool, supabase_helpers
+from src.ttl_cache import TTLCache
 from src.types.feedback import FeedbackRow
+from src.types.job_queue import RefreshJobRow
 from src.types.mileage_recommendation import (
     MileageRecommendationRow,
 )
@@ -18,8 +22,9 @@ from src.types.training_week import (
     TrainingSession,
     TrainingWeek,
 )
+from src.types.update_pipeline import ExeType, Stage
 from src.types.user import Preferences, UserAuthRow, UserRow
-from supabase import Client, create_client
+from supabase import AsyncClient, Client
 
 load_dotenv()
 
@@ -27,36 +32,137 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+# keep-alive connection pools for sync & async queries, shared by every
+# postgrest client so concurrent queries reuse connections rather than
+# paying a TCP & TLS handshake each; configured by SUPABASE_HTTP_* env vars
+http_pool_config = http_pool.get_config("SUPABASE_HTTP_")
+http_transport = http_pool.PooledTransport("supabase", http_pool_config)
+async_http_transport = http_pool.AsyncPooledTransport(
+    "supabase_async", http_pool_config
+)
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True):
+        return postgrest.utils.SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=http_pool.get_timeout(http_pool_config),
+            follow_redirects=True,
+            transport=http_transport,
+        )
+
+
+class _AsyncPooledPostgrestClient(AsyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True):
+        return postgrest.utils.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=http_pool.get_timeout(http_pool_config),
+            follow_redirects=True,
+            transport=async_http_transport,
+        )
+
+
+class _PooledClient(Client):
+    """Supabase client whose postgrest queries go through http_transport"""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True):
+        return _PooledPostgrestClient(rest_url, headers=headers, schema=schema)
+
+
+class _AsyncPooledClient(AsyncClient):
+    """Supabase async client whose postgrest queries go through async_http_transport"""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True):
+        return _AsyncPooledPostgrestClient(rest_url, headers=headers, schema=schema)
+
+
 def init() -> Client:
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
-    return create_client(url, key)
+    return _PooledClient.create(url, key)
 
 
 client = init()
+async_client: Optional[AsyncClient] = None
+
+# read-through caches of user rows & device tokens by athlete_id, invalidated
+# by the writes below; other processes' writes are picked up once entries
+# expire. Strava tokens are never cached: another replica refreshing them
+# revokes the refresh_token a stale entry would hold
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", 10000))
+user_cache = TTLCache(ttl=USER_CACHE_TTL_SECONDS, maxsize=USER_CACHE_MAXSIZE)
+device_token_cache = TTLCache(ttl=USER_CACHE_TTL_SECONDS, maxsize=USER_CACHE_MAXSIZE)
+
+# users are listed in pages of this many rows, below PostgREST's max-rows
+USER_PAGE_SIZE = 500
+
+# user columns the update pipeline reads, the rest keep their UserRow defaults
+PIPELINE_USER_COLUMNS = "athlete_id, user_id, preferences"
+
+
+async def get_async_client() -> AsyncClient:
+    """
+    Lazily create the async client, which must happen inside a running event
+    loop rather than at import time
+
+    :return: AsyncClient
+    """
+    global async_client
+    if async_client is None:
+        async_client = await _AsyncPooledClient.create(
+            os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+        )
+    return async_client
 
 
 def get_device_token(athlete_id: int) -> Optional[str]:
     """
-    Get the device token for a user in the database.
+    Get the device token for a user in the database, served from
+    device_token_cache while fresh
 
     :param athlete_id: The athlete's ID
     :return: The device token for the user, or None if the user does not exist
     """
     try:
-        user_auth = get_user_auth(athlete_id)
-        return user_auth.device_token
+        device_token = device_token_cache.get_or_load(
+            int(athlete_id), lambda: _select_device_token(athlete_id)
+        )
     except ValueError:
         return None
+    return device_token or None
+
+
+@concurrency.limited(Stage.DB)
+def _select_device_token(athlete_id: int) -> str:
+    """Select the device token of athlete_id, "" when unset so it is cached"""
+    table = client.table("user_auth")
+    response = table.select("device_token").eq("athlete_id", athlete_id).execute()
+
+    if not response.data:
+        raise ValueError(f"Cound not find user_auth row with {athlete_id=}")
+
+    return response.data[0]["device_token"] or ""
 
 
 def get_user(athlete_id: int) -> UserRow:
     """
-    Get a user by athlete_id
+    Get a user by athlete_id, served from user_cache while fresh
 
     :param athlete_id: int
     :return: UserRow
     """
+    user = user_cache.get_or_load(int(athlete_id), lambda: _select_user(athlete_id))
+    return user.copy(deep=True)
+
+
+@concurrency.limited(Stage.DB)
+def _select_user(athlete_id: int) -> UserRow:
+    """Select the user row of athlete_id"""
     table = client.table("user")
     response = table.select("*").eq("athlete_id", athlete_id).execute()
 
@@ -66,18 +172,74 @@ def get_user(athlete_id: int) -> UserRow:
     return UserRow(**response.data[0])
 
 
-def list_users() -> list[UserRow]:
+@concurrency.limited(Stage.DB)
+def list_users_page(
+    after_athlete_id: Optional[int],
+    page_size: int = USER_PAGE_SIZE,
+    columns: str = "*",
+) -> list[UserRow]:
     """
-    List all users in the user_auth table
+    One page of the user table in athlete_id order, keyset-paginated so
+    every page is an index range scan however deep into the table it is
 
-    :return: list of UserAuthRow
+    :param after_athlete_id: last athlete_id of the previous page, None for the first page
+    :param page_size: maximum number of users in the page
+    :param columns: columns to select, must include athlete_id
+    :return: list of UserRow, shorter than page_size on the last page
     """
-    table = client.table("user")
-    response = table.select("*").execute()
-
+    query = client.table("user").select(columns)
+    if after_athlete_id is not None:
+        query = query.gt("athlete_id", after_athlete_id)
+    response = query.order("athlete_id").limit(page_size).execute()
     return [UserRow(**row) for row in response.data]
 
 
+def iter_user_pages(
+    page_size: int = USER_PAGE_SIZE, columns: str = PIPELINE_USER_COLUMNS
+) -> Iterator[list[UserRow]]:
+    """
+    Stream the user table page by page, a page is only fetched once the
+    previous one has been handed to the caller
+
+    :param page_size: maximum number of users per page
+    :param columns: columns to select, must include athlete_id
+    :return: iterator of lists of UserRow
+    """
+    after_athlete_id = None
+    while True:
+        page = list_users_page(after_athlete_id, page_size=page_size, columns=columns)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after_athlete_id = page[-1].athlete_id
+
+
+def iter_users(
+    page_size: int = USER_PAGE_SIZE, columns: str = PIPELINE_USER_COLUMNS
+) -> Iterator[UserRow]:
+    """
+    Stream every user, see iter_user_pages
+
+    :param page_size: maximum number of users per page
+    :param columns: columns to select, must include athlete_id
+    :return: iterator of UserRow
+    """
+    for page in iter_user_pages(page_size=page_size, columns=columns):
+        yield from page
+
+
+def list_users(columns: str = "*") -> list[UserRow]:
+    """
+    List all users in the user table
+
+    :param columns: columns to select, must include athlete_id
+    :return: list of UserRow
+    """
+    return list(iter_users(columns=columns))
+
+
+@concurrency.limited(Stage.DB)
 def list_user_auths() -> list[UserAuthRow]:
     """
     List all user_auths in the user_auth table
@@ -89,6 +251,7 @@ def list_user_auths() -> list[UserAuthRow]:
     return [UserAuthRow(**row) for row in response.data]
 
 
+@concurrency.limited(Stage.DB)
 def list_mileage_recommendations() -> list[MileageRecommendationRow]:
     """
     List all mileage_recommendations in the mileage_recommendation table
@@ -100,12 +263,14 @@ def list_mileage_recommendations() -> list[MileageRecommendationRow]:
     return [MileageRecommendationRow(**row) for row in response.data]
 
 
+@concurrency.limited(Stage.DB)
 def get_user_auth(athlete_id: int) -> UserAuthRow:
     """
-    Get user_auth row by athlete_id
+    Get user_auth row by athlete_id, always read from the database as it
+    carries the Strava tokens
 
     :param athlete_id: int
-    :return: APIResponse
+    :return: UserAuthRow
     """
     table = client.table("user_auth")
     response = table.select("*").eq("athlete_id", athlete_id).execute()
@@ -116,6 +281,7 @@ def get_user_auth(athlete_id: int) -> UserAuthRow:
     return UserAuthRow(**response.data[0])
 
 
+@concurrency.limited(Stage.DB)
 def get_training_week(athlete_id: int) -> FullTrainingWeek:
     """
     Get the most recent training_week row by athlete_id.
@@ -162,6 +328,67 @@ def get_training_week(athlete_id: int) -> FullTrainingWeek:
         )
 
 
+# The *_query helpers below build a request once for both the sync client
+# and the async one, which only differ in whether execute() is awaited
+
+
+def _past_training_week_query(db: Union[Client, AsyncClient], athlete_id: int):
+    table = db.table(supabase_helpers.get_training_week_table_name())
+    return (
+        table.select("past_training_week")
+        .eq("athlete_id", athlete_id)
+        .order("created_at", desc=True)
+        .limit(1)
+    )
+
+
+def _to_past_training_week(data: List[dict]) -> List[EnrichedActivity]:
+    if not data:
+        return []
+    past_json_data = orjson.loads(data[0]["past_training_week"])
+    return [EnrichedActivity(**obj) for obj in past_json_data]
+
+
+@concurrency.limited(Stage.DB)
+def get_past_training_week(athlete_id: int) -> List[EnrichedActivity]:
+    """
+    Get the annotated past activity of the most recent training_week row,
+    selecting only the past_training_week column
+
+    :param athlete_id: int
+    :return: list of EnrichedActivity, empty if the athlete has no training week
+    """
+    response = _past_training_week_query(client, athlete_id).execute()
+    return _to_past_training_week(response.data)
+
+
+@concurrency.limited(Stage.DB)
+async def get_past_training_week_async(athlete_id: int) -> List[EnrichedActivity]:
+    """
+    Async variant of get_past_training_week
+
+    :param athlete_id: int
+    :return: list of EnrichedActivity, empty if the athlete has no training week
+    """
+    query = _past_training_week_query(await get_async_client(), athlete_id)
+    return _to_past_training_week((await query.execute()).data)
+
+
+def _invalidate(cache: TTLCache, athlete_id: Optional[int]) -> None:
+    """
+    Drop the cached row of athlete_id after a write, or every cached row when
+    the written row has no athlete_id
+
+    :param cache: user_cache or device_token_cache
+    :param athlete_id: athlete whose row was written
+    """
+    if athlete_id is None:
+        cache.clear()
+    else:
+        cache.invalidate(int(athlete_id))
+
+
+@concurrency.limited(Stage.DB)
 def upsert_user_auth(user_auth_row: UserAuthRow) -> None:
     """
     Convert UserAuthRow to a dictionary, ensure json serializable expires_at,
@@ -177,8 +404,10 @@ def upsert_user_auth(user_auth_row: UserAuthRow) -> None:
     table.upsert(
         row_data, on_conflict="athlete_id,user_id", returning="minimal"
     ).execute()
+    _invalidate(device_token_cache, user_auth_row.athlete_id)
 
 
+@concurrency.limited(Stage.DB)
 def update_user_device_token(athlete_id: str, device_token: str) -> None:
     """
     Update the device token for a user in the database.
@@ -189,8 +418,10 @@ def update_user_device_token(athlete_id: str, device_token: str) -> None:
     client.table("user_auth").update({"device_token": device_token}).eq(
         "athlete_id", athlete_id
     ).execute()
+    _invalidate(device_token_cache, athlete_id)
 
 
+@concurrency.limited(Stage.DB)
 def update_preferences(athlete_id: int, preferences: dict):
     """
     Update user's preferences
@@ -205,8 +436,10 @@ def update_preferences(athlete_id: int, preferences: dict):
 
     table = client.table("user")
     table.update({"preferences": preferences}).eq("athlete_id", athlete_id).execute()
+    _invalidate(user_cache, athlete_id)
 
 
+@concurrency.limited(Stage.DB)
 def upsert_user(user_row: UserRow):
     """
     Upsert a row into the user table
@@ -219,8 +452,10 @@ def upsert_user(user_row: UserRow):
 
     table = client.table("user")
     table.upsert(row_data, on_conflict="athlete_id,user_id").execute()
+    _invalidate(user_cache, user_row.athlete_id)
 
 
+@concurrency.limited(Stage.DB)
 def does_user_exist(athlete_id: Optional[int], user_id: Optional[str]) -> bool:
     """
     Check if a user exists in the user table
@@ -237,29 +472,149 @@ def does_user_exist(athlete_id: Optional[int], user_id: Optional[str]) -> bool:
     return bool(response.data)
 
 
-def upsert_training_week(
+def get_training_week_row(
     athlete_id: int,
     future_training_week: TrainingWeek,
     past_training_week: List[EnrichedActivity],
-):
+    input_fingerprint: Optional[str] = None,
+    exe_type: Optional[ExeType] = None,
+) -> dict:
     """
-    Upsert a row into the training_week table
+    Serialize a training week into a training_week table row
 
     :param athlete_id: The athlete's ID
     :param future_training_week: Training week data for future sessions
     :param past_training_week: List of daily metrics from past training
+    :param input_fingerprint: Fingerprint of the pipeline inputs
+    :param exe_type: ExeType the training week was generated by
+    :return: row data as a dictionary
     """
     future_sessions = [session.dict() for session in future_training_week.sessions]
     past_sessions = [obj.dict() for obj in past_training_week]
-    row_data = {
+    return {
         "athlete_id": athlete_id,
         "future_training_week": orjson.dumps(future_sessions).decode("utf-8"),
         "past_training_week": orjson.dumps(past_sessions).decode("utf-8"),
+        "input_fingerprint": input_fingerprint,
+        "exe_type": str(exe_type) if exe_type is not None else None,
     }
+
+
+@concurrency.limited(Stage.DB)
+def upsert_training_week(
+    athlete_id: int,
+    future_training_week: TrainingWeek,
+    past_training_week: List[EnrichedActivity],
+    input_fingerprint: Optional[str] = None,
+    exe_type: Optional[ExeType] = None,
+):
+    """
+    Upsert a row into the training_week table
+
+    :param athlete_id: The athlete's ID
+    :param future_training_week: Training week data for future sessions
+    :param past_training_week: List of daily metrics from past training
+    :param input_fingerprint: Fingerprint of the pipeline inputs
+    :param exe_type: ExeType the training week was generated by
+    """
+    row_data = get_training_week_row(
+        athlete_id=athlete_id,
+        future_training_week=future_training_week,
+        past_training_week=past_training_week,
+        input_fingerprint=input_fingerprint,
+        exe_type=exe_type,
+    )
     table = client.table(supabase_helpers.get_training_week_table_name())
     table.upsert(row_data).execute()
 
 
+@concurrency.limited(Stage.DB)
+async def upsert_training_week_async(
+    athlete_id: int,
+    future_training_week: TrainingWeek,
+    past_training_week: List[EnrichedActivity],
+    input_fingerprint: Optional[str] = None,
+    exe_type: Optional[ExeType] = None,
+):
+    """
+    Async variant of upsert_training_week
+
+    :param athlete_id: The athlete's ID
+    :param future_training_week: Training week data for future sessions
+    :param past_training_week: List of daily metrics from past training
+    :param input_fingerprint: Fingerprint of the pipeline inputs
+    :param exe_type: ExeType the training week was generated by
+    """
+    row_data = get_training_week_row(
+        athlete_id=athlete_id,
+        future_training_week=future_training_week,
+        past_training_week=past_training_week,
+        input_fingerprint=input_fingerprint,
+        exe_type=exe_type,
+    )
+    aclient = await get_async_client()
+    table = aclient.table(supabase_helpers.get_training_week_table_name())
+    await table.upsert(row_data).execute()
+
+
+def _latest_input_fingerprint_query(
+    db: Union[Client, AsyncClient], athlete_id: int, exe_type: Optional[ExeType]
+):
+    table = db.table(supabase_helpers.get_training_week_table_name())
+    query = table.select("input_fingerprint").eq("athlete_id", athlete_id)
+    if exe_type is not None:
+        query = query.eq("exe_type", str(exe_type))
+    return query.order("created_at", desc=True).limit(1)
+
+
+@concurrency.limited(Stage.DB)
+def get_latest_input_fingerprint(
+    athlete_id: int, exe_type: Optional[ExeType] = None
+) -> Optional[str]:
+    """
+    Get the input fingerprint stored with the most recent training_week row.
+    Fingerprints cover the exe_type, so matching it means the latest row was
+    generated by the same exe_type from the same inputs.
+
+    :param athlete_id: The athlete's ID
+    :param exe_type: only consider rows generated by exe_type, None for the latest row
+    :return: fingerprint, None if there is no row or it predates fingerprinting
+    """
+    response = _latest_input_fingerprint_query(client, athlete_id, exe_type).execute()
+    return response.data[0]["input_fingerprint"] if response.data else None
+
+
+@concurrency.limited(Stage.DB)
+async def get_latest_input_fingerprint_async(
+    athlete_id: int, exe_type: Optional[ExeType] = None
+) -> Optional[str]:
+    """
+    Async variant of get_latest_input_fingerprint
+
+    :param athlete_id: The athlete's ID
+    :param exe_type: only consider rows generated by exe_type, None for the latest row
+    :return: fingerprint, None if there is no row or it predates fingerprinting
+    """
+    query = _latest_input_fingerprint_query(
+        await get_async_client(), athlete_id, exe_type
+    )
+    response = await query.execute()
+    return response.data[0]["input_fingerprint"] if response.data else None
+
+
+def get_updated_today_cutoff() -> datetime.datetime:
+    """
+    "Today" is defined as within the past 23 hours and 30 minutes (to account
+    for any delays in yesterday's evening update).
+
+    :return: UTC datetime, updates created after this count as today
+    """
+    return datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        hours=23, minutes=30
+    )
+
+
+@concurrency.limited(Stage.DB)
 def has_user_updated_today(athlete_id: int) -> bool:
     """
     Check if the user has received an update today. Where "today" is defined as
@@ -271,7 +626,7 @@ def has_user_updated_today(athlete_id: int) -> bool:
     """
     table = client.table(supabase_helpers.get_training_week_table_name())
     response = (
-        table.select("*")
+        table.select("created_at")
         .eq("athlete_id", athlete_id)
         .order("created_at", desc=True)
         .limit(1)
@@ -282,12 +637,38 @@ def has_user_updated_today(athlete_id: int) -> bool:
         return False
 
     # "Has this user posted an activity in the last 23 hours and 30 minutes?"
-    time_diff = datetime.datetime.now(
-        datetime.timezone.utc
-    ) - datetime.datetime.fromisoformat(response.data[0]["created_at"])
-    return time_diff < datetime.timedelta(hours=23, minutes=30)
+    created_at = datetime.datetime.fromisoformat(response.data[0]["created_at"])
+    return created_at > get_updated_today_cutoff()
+
 
+@concurrency.limited(Stage.DB)
+def list_athletes_updated_today(page_size: int = USER_PAGE_SIZE) -> set[int]:
+    """
+    Bulk variant of has_user_updated_today: the athlete_id of every user with
+    a training_week row created "today", selecting only the athlete_id column.
+    Rows are read in pages keyed on athlete_id, so PostgREST's max-rows cap
+    never truncates the result; each page starts after the last athlete_id of
+    the previous one, skipping that athlete's remaining rows of the day.
 
+    :param page_size: maximum number of rows per page
+    :return: set of athlete_ids that have received an update today
+    """
+    table = client.table(supabase_helpers.get_training_week_table_name())
+    cutoff = get_updated_today_cutoff().isoformat()
+    athlete_ids = set()
+    after_athlete_id = None
+    while True:
+        query = table.select("athlete_id").gt("created_at", cutoff)
+        if after_athlete_id is not None:
+            query = query.gt("athlete_id", after_athlete_id)
+        rows = query.order("athlete_id").limit(page_size).execute().data
+        athlete_ids.update(row["athlete_id"] for row in rows)
+        if len(rows) < page_size:
+            return athlete_ids
+        after_athlete_id = rows[-1]["athlete_id"]
+
+
+@concurrency.limited(Stage.DB)
 def insert_mileage_recommendation(mileage_recommendation_row: MileageRecommendationRow):
     """
     Insert a row into the mileage_recommendations table
@@ -298,90 +679,155 @@ def insert_mileage_recommendation(mileage_recommendation_row: MileageRecommendat
     table.insert(mileage_recommendation_row.dict()).execute()
 
 
-def get_mileage_recommendation(
-    athlete_id: int, dt: datetime.datetime
-) -> MileageRecommendationRow:
+@concurrency.limited(Stage.DB)
+async def insert_mileage_recommendation_async(
+    mileage_recommendation_row: MileageRecommendationRow,
+):
     """
-    Get the most recent mileage recommendation for the given year and week of year
+    Async variant of insert_mileage_recommendation
 
-    :param athlete_id: The ID of the athlete
-    :param year: The year of the recommendation
-    :param week_of_year: The week of the year of the recommendation
-    :return: A MileageRecommendation object
+    :param mileage_recommendation_row: A MileageRecommendationRow object
     """
-    table = client.table(supabase_helpers.get_mileage_recommendation_table_name())
+    aclient = await get_async_client()
+    table = aclient.table(supabase_helpers.get_mileage_recommendation_table_name())
+    await table.insert(mileage_recommendation_row.dict()).execute()
+
+
+def _mileage_recommendation_query(
+    db: Union[Client, AsyncClient], athlete_id: int, dt: datetime.datetime
+):
+    table = db.table(supabase_helpers.get_mileage_recommendation_table_name())
     tomorrow = dt + datetime.timedelta(days=1)
-    response = (
+    return (
         table.select("*")
         .eq("athlete_id", athlete_id)
         .eq("year", tomorrow.isocalendar().year)
         .eq("week_of_year", tomorrow.isocalendar().week)
         .order("created_at", desc=True)
         .limit(1)
-        .execute()
     )
 
-    if not response.data:
+
+def _to_mileage_recommendation(
+    data: List[dict], athlete_id: int, dt: datetime.datetime
+) -> MileageRecommendationRow:
+    if not data:
         raise ValueError(
             f"Could not find mileage recommendation for {athlete_id=}, year={dt.isocalendar().year}, week={dt.isocalendar().week}"
         )
-    return MileageRecommendationRow(**response.data[0])
+    return MileageRecommendationRow(**data[0])
 
 
-def insert_training_plan(athlete_id: int, training_plan: TrainingPlan):
+@concurrency.limited(Stage.DB)
+def get_mileage_recommendation(
+    athlete_id: int, dt: datetime.datetime
+) -> MileageRecommendationRow:
+    """
+    Get the most recent mileage recommendation for the given year and week of year
+
+    :param athlete_id: The ID of the athlete
+    :param dt: datetime injection, helpful for testing
+    :return: A MileageRecommendation object
     """
-    Insert a training plan into the training_plan table
+    response = _mileage_recommendation_query(client, athlete_id, dt).execute()
+    return _to_mileage_recommendation(response.data, athlete_id, dt)
+
+
+@concurrency.limited(Stage.DB)
+async def get_mileage_recommendation_async(
+    athlete_id: int, dt: datetime.datetime
+) -> MileageRecommendationRow:
+    """
+    Async variant of get_mileage_recommendation
+
+    :param athlete_id: The ID of the athlete
+    :param dt: datetime injection, helpful for testing
+    :return: A MileageRecommendation object
+    """
+    query = _mileage_recommendation_query(await get_async_client(), athlete_id, dt)
+    response = await query.execute()
+    return _to_mileage_recommendation(response.data, athlete_id, dt)
+
+
+def get_training_plan_rows(athlete_id: int, training_plan: TrainingPlan) -> List[dict]:
+    """
+    Validate and convert a training plan into training_plan table rows sharing
+    a freshly generated plan_id
 
     :param athlete_id: The ID of the athlete
     :param training_plan: A TrainingPlan object
+    :return: list of row data dictionaries
     """
     plan_id = str(uuid4())
-    table = client.table(supabase_helpers.get_training_plan_table_name())
+    rows = []
     for week in training_plan.training_plan_weeks:
         row = {"athlete_id": athlete_id, "plan_id": plan_id, **week.dict()}
         try:
             TrainingPlanWeekRow(**row)
         except Exception as e:
             raise ValueError(f"Invalid training plan week: {row=}, {e=}")
-        table.insert(row).execute()
+        rows.append(row)
+    return rows
+
+
+@concurrency.limited(Stage.DB)
+def insert_training_plan(athlete_id: int, training_plan: TrainingPlan):
+    """
+    Insert a training plan into the training_plan table. All weeks go in a
+    single bulk insert, one round trip and one statement, so a plan is never
+    left half-written under its plan_id.
+
+    :param athlete_id: The ID of the athlete
+    :param training_plan: A TrainingPlan object
+    """
+    rows = get_training_plan_rows(athlete_id, training_plan)
+    if not rows:
+        return
+    table = client.table(supabase_helpers.get_training_plan_table_name())
+    table.insert(rows, returning="minimal").execute()
+
+
+@concurrency.limited(Stage.DB)
+async def insert_training_plan_async(athlete_id: int, training_plan: TrainingPlan):
+    """
+    Async variant of insert_training_plan
+
+    :param athlete_id: The ID of the athlete
+    :param training_plan: A TrainingPlan object
+    """
+    rows = get_training_plan_rows(athlete_id, training_plan)
+    if not rows:
+        return
+    aclient = await get_async_client()
+    table = aclient.table(supabase_helpers.get_training_plan_table_name())
+    await table.insert(rows, returning="minimal").execute()
 
 
+@concurrency.limited(Stage.DB)
 def get_training_plan(athlete_id: int) -> TrainingPlan:
     """
     Get the most recent training plan for a specific athlete.
-    Since new training plan rows are added weekly, we need to get the latest set
-    based on created_at timestamp.
+    Since new training plan rows are added weekly, the latest_training_plan
+    view (migrations/003) keeps only the weeks of the plan created last, so
+    they are fetched in a single round trip.
 
     :param athlete_id: The ID of the athlete
     :return: A TrainingPlan object containing the most recent set of training weeks
     """
-    table = client.table(supabase_helpers.get_training_plan_table_name())
-
-    # First get the most recent created_at timestamp for this athlete
-    latest_timestamp = (
-        table.select("plan_id")
-        .eq("athlete_id", athlete_id)
-        .order("created_at", desc=True)
-        .limit(1)
-        .execute()
+    view = client.table(supabase_helpers.get_latest_training_plan_view_name())
+    response = (
+        view.select("*").eq("athlete_id", athlete_id).order("week_number").execute()
     )
 
-    if not latest_timestamp.data:
+    if not response.data:
         logger.error(f"Could not find training plan for athlete_id {athlete_id}")
         return TrainingPlan()
 
-    response = (
-        table.select("*")
-        .eq("athlete_id", athlete_id)
-        .eq("plan_id", latest_timestamp.data[0]["plan_id"])
-        .order("week_number")
-        .execute()
-    )
-
     training_weeks = [TrainingPlanWeekRow(**row) for row in response.data]
     return TrainingPlan(training_plan_weeks=training_weeks)
 
 
+@concurrency.limited(Stage.DB)
 def update_user_email(
     email: str, jwt_token: Optional[str] = None, user_id: Optional[str] = None
 ):
@@ -397,12 +843,16 @@ def update_user_email(
     if jwt_token:
         athlete_id = auth_manager.decode_jwt(jwt_token, verify_exp=True)
         table.update({"email": email}).eq("athlete_id", athlete_id).execute()
+        _invalidate(user_cache, athlete_id)
     elif user_id:
         table.update({"email": email}).eq("user_id", user_id).execute()
+        # the cache is keyed by athlete_id, which is unknown here
+        user_cache.clear()
     else:
         raise ValueError("Either jwt_token or user_id must be provided")
 
 
+@concurrency.limited(Stage.DB)
 def insert_feedback(feedback: FeedbackRow) -> None:
     """
     Insert a feedback row into the feedback table
@@ -412,3 +862,45 @@ def insert_feedback(feedback: FeedbackRow) -> None:
     """
     table = client.table(supabase_helpers.get_feedback_table_name())
     table.insert(feedback.dict()).execute()
+
+
+@concurrency.limited(Stage.DB)
+def upsert_refresh_job(refresh_job: RefreshJobRow) -> None:
+    """
+    Upsert a row into the refresh_job table
+
+    :param refresh_job: A RefreshJobRow object
+    """
+    table = client.table(supabase_helpers.get_refresh_job_table_name())
+    table.upsert(refresh_job.dict(), on_conflict="job_id").execute()
+
+
+@concurrency.limited(Stage.DB)
+async def upsert_refresh_job_async(refresh_job: RefreshJobRow) -> None:
+    """
+    Async variant of upsert_refresh_job
+
+    :param refresh_job: A RefreshJobRow object
+    """
+    aclient = await get_async_client()
+    table = aclient.table(supabase_helpers.get_refresh_job_table_name())
+    await table.upsert(refresh_job.dict(), on_conflict="job_id").execute()
+
+
+@concurrency.limited(Stage.DB)
+def get_refresh_job(job_id: str, athlete_id: int) -> RefreshJobRow:
+    """
+    Get a refresh job belonging to an athlete
+
+    :param job_id: The ID of the refresh job
+    :param athlete_id: The ID of the athlete
+    :return: A RefreshJobRow object
+    """
+    table = client.table(supabase_helpers.get_refresh_job_table_name())
+    response = (
+        table.select("*").eq("job_id", job_id).eq("athlete_id", athlete_id).execute()
+    )
+
+    if not response.data:
+        raise ValueError(f"Could not find refresh job with {job_id=}")
+    return RefreshJobRow(**response.data[0])
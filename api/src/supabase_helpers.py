@@ -34,6 +34,17 @@ def get_training_plan_table_name() -> str:
     return "training_plan"
 
 
+def get_latest_training_plan_view_name() -> str:
+    """
+    Inject test_latest_training_plan view name during testing
+
+    :return: The name of the latest_training_plan view
+    """
+    if os.environ.get("TEST_FLAG", "false") == "true":
+        return "test_latest_training_plan"
+    return "latest_training_plan"
+
+
 def get_feedback_table_name() -> str:
     """
     Inject test_feedback table name during testing
@@ -43,3 +54,25 @@ def get_feedback_table_name() -> str:
     if os.environ.get("TEST_FLAG", "false") == "true":
         return "test_feedback"
     return "feedback"
+
+
+def get_refresh_job_table_name() -> str:
+    """
+    Inject test_refresh_job table name during testing
+
+    :return: The name of the refresh_job table
+    """
+    if os.environ.get("TEST_FLAG", "false") == "true":
+        return "test_refresh_job"
+    return "refresh_job"
+
+
+def get_update_job_table_name() -> str:
+    """
+    Inject test_update_job table name during testing
+
+    :return: The name of the update_job table
+    """
+    if os.environ.get("TEST_FLAG", "false") == "true":
+        return "test_update_job"
+    return "update_job"
@@ -0,0 +1,203 @@
+import datetime
+from typing import Dict, Sequence
+
+import numpy as np
+from src.daily_activity import DailyActivity
+
+# rolling windows in days: the acute load is the last week's, the chronic load
+# the weekly average over the last 4 weeks
+ACUTE_WINDOW = 7
+CHRONIC_WINDOW = 28
+
+# acute:chronic workload ratios above this are associated with injury spikes
+MAX_ACUTE_CHRONIC_RATIO = 1.5
+
+# weeks this monotonous (mean over standard deviation of daily load) leave
+# too little recovery between hard days
+MAX_MONOTONY = 2.0
+
+
+class TrainingLoad:
+    """
+    Rolling-window training load of many athletes: one athletes x days matrix
+    per metric, rows in the order the athletes were stacked and columns
+    indexed by day from first_date. Days without enough history to fill a
+    window are NaN, as are ratios with a zero denominator.
+
+    - acute_load: load of the last 7 days
+    - chronic_load: average weekly load of the last 28 days
+    - acute_chronic_ratio: acute over chronic load
+    - ramp_rate: relative change of the acute load over the previous 7 days
+    - monotony: mean over standard deviation of the last 7 days' daily load
+    - strain: acute load times monotony
+    """
+
+    __slots__ = (
+        "first_date",
+        "acute_load",
+        "chronic_load",
+        "acute_chronic_ratio",
+        "ramp_rate",
+        "monotony",
+        "strain",
+    )
+
+    def __init__(
+        self,
+        first_date: datetime.date,
+        acute_load: np.ndarray,
+        chronic_load: np.ndarray,
+        acute_chronic_ratio: np.ndarray,
+        ramp_rate: np.ndarray,
+        monotony: np.ndarray,
+        strain: np.ndarray,
+    ):
+        self.first_date = first_date
+        self.acute_load = acute_load
+        self.chronic_load = chronic_load
+        self.acute_chronic_ratio = acute_chronic_ratio
+        self.ramp_rate = ramp_rate
+        self.monotony = monotony
+        self.strain = strain
+
+    @property
+    def shape(self) -> tuple:
+        """(number of athletes, number of days)"""
+        return self.acute_load.shape
+
+    def get_injury_risk(
+        self,
+        max_acute_chronic_ratio: float = MAX_ACUTE_CHRONIC_RATIO,
+        max_monotony: float = MAX_MONOTONY,
+    ) -> np.ndarray:
+        """
+        Flag the athlete days whose load spiked over their chronic load or
+        became too monotonous
+
+        :param max_acute_chronic_ratio: highest safe acute:chronic ratio
+        :param max_monotony: highest safe monotony
+        :return: boolean athletes x days matrix
+        """
+        with np.errstate(invalid="ignore"):
+            return (self.acute_chronic_ratio > max_acute_chronic_ratio) | (
+                self.monotony > max_monotony
+            )
+
+    def get_latest(self, index: int) -> Dict[str, float]:
+        """
+        Metrics of an athlete on the last day
+
+        :param index: row of the athlete
+        :return: metric name -> value, NaN without enough history
+        """
+        return {
+            name: float(getattr(self, name)[index, -1])
+            for name in self.__slots__
+            if name != "first_date"
+        }
+
+
+def stack_daily_distance(
+    daily_activities: Sequence[DailyActivity],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> np.ndarray:
+    """
+    Align the daily distance of many athletes on a shared calendar, days an
+    athlete has no data for count as rest days
+
+    :param daily_activities: DailyActivity of each athlete
+    :param start_date: first day of the calendar
+    :param end_date: last day of the calendar
+    :return: athletes x days matrix of miles
+    """
+    n_days = (end_date - start_date).days + 1
+    daily_load = np.zeros((len(daily_activities), n_days))
+    for row, daily_activity in zip(daily_load, daily_activities):
+        window = daily_activity.between(start_date, end_date)
+        start = (window.first_date - start_date).days
+        row[start : start + len(window)] = window.distance_in_miles
+    return daily_load
+
+
+def _rolling_sum(daily_load: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum of each window of days ending on each day, NaN for the first
+    window - 1 days. Shifted columns are added up rather than differencing a
+    cumulative sum, so windows of rest days sum to exactly zero.
+    """
+    n_days = daily_load.shape[1]
+    rolling_sum = np.full(daily_load.shape, np.nan)
+    if n_days < window:
+        return rolling_sum
+    total = daily_load[:, window - 1 :].copy()
+    for offset in range(1, window):
+        total += daily_load[:, window - 1 - offset : n_days - offset]
+    rolling_sum[:, window - 1 :] = total
+    return rolling_sum
+
+
+def _rolling_std(daily_load: np.ndarray, window: int) -> np.ndarray:
+    """
+    Population standard deviation of each window of days ending on each day,
+    NaN for the first window - 1 days. Deviations are taken from the window's
+    last day (shifted data), so windows of identical days are exactly zero.
+    """
+    n_days = daily_load.shape[1]
+    rolling_std = np.full(daily_load.shape, np.nan)
+    if n_days < window:
+        return rolling_std
+    reference = daily_load[:, window - 1 :]
+    shifted_sum = np.zeros(reference.shape)
+    shifted_sum_of_squares = np.zeros(reference.shape)
+    for offset in range(1, window):
+        shifted = daily_load[:, window - 1 - offset : n_days - offset] - reference
+        shifted_sum += shifted
+        shifted_sum_of_squares += shifted**2
+    variance = (shifted_sum_of_squares - shifted_sum**2 / window) / window
+    rolling_std[:, window - 1 :] = np.sqrt(np.maximum(variance, 0))
+    return rolling_std
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Elementwise ratio, NaN where the denominator is zero or NaN"""
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.full(numerator.shape, np.nan),
+        where=denominator > 0,
+    )
+
+
+def compute_training_load(
+    daily_load: np.ndarray, first_date: datetime.date
+) -> TrainingLoad:
+    """
+    Rolling-window training load of every athlete in a single pass over the
+    stacked daily load
+
+    :param daily_load: athletes x days matrix, e.g. miles per day
+    :param first_date: date of the first column
+    :return: TrainingLoad object
+    """
+    daily_load = np.asarray(daily_load, dtype=np.float64)
+    acute_load = _rolling_sum(daily_load, ACUTE_WINDOW)
+    chronic_load = _rolling_sum(daily_load, CHRONIC_WINDOW) * (
+        ACUTE_WINDOW / CHRONIC_WINDOW
+    )
+
+    previous_acute_load = np.full(acute_load.shape, np.nan)
+    previous_acute_load[:, ACUTE_WINDOW:] = acute_load[:, :-ACUTE_WINDOW]
+
+    acute_mean = acute_load / ACUTE_WINDOW
+    monotony = _divide(acute_mean, _rolling_std(daily_load, ACUTE_WINDOW))
+
+    return TrainingLoad(
+        first_date=first_date,
+        acute_load=acute_load,
+        chronic_load=chronic_load,
+        acute_chronic_ratio=_divide(acute_load, chronic_load),
+        ramp_rate=_divide(acute_load - previous_acute_load, previous_acute_load),
+        monotony=monotony,
+        strain=acute_load * monotony,
+    )
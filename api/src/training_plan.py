@@ -1,43 +1,14 @@
 import datetime
 from typing import List
 
-import numpy as np
-from src import supabase_client
+from src import metrics, supabase_client
 from src.constants import COACH_ROLE
-from src.llm import get_completion_json
-from src.types.activity import WeekSummary
+from src.llm import get_completion_json, get_completion_json_async
+from src.types.feature_store import AthleteFeatures
 from src.types.training_plan import TrainingPlan, WeekRange
 from src.types.user import UserRow
 
 
-def get_mileage_stats(weekly_mileages):
-    """
-    Returns an LLM-friendly string containing information about the athlete's
-    mileage stats over the past X weeks.
-
-    :param weekly_mileages: A list of weekly mileages.
-    :return: str of LLM-friendly statistics
-    """
-    total_miles = round(sum(weekly_mileages), 1)
-    miles_per_week = round(total_miles / len(weekly_mileages), 1)
-    median_weekly_mileage = round(np.median(weekly_mileages), 1)
-    seventy_five_percentile_weekly_mileage = round(
-        np.percentile(weekly_mileages, 75), 1
-    )
-    ninety_percentile_weekly_mileage = round(np.percentile(weekly_mileages, 90), 1)
-
-    return_str = ""
-    return_str += f"Total miles: {total_miles}\n"
-    return_str += f"Avg Miles per week: {miles_per_week}\n"
-    return_str += f"Median weekly mileage: {median_weekly_mileage}\n"
-    return_str += (
-        f"75%ile of weekly mileage: {seventy_five_percentile_weekly_mileage}\n"
-    )
-    return_str += f"90%ile of weekly mileage: {ninety_percentile_weekly_mileage}\n"
-    return_str += f"Max weekly mileage: {max(weekly_mileages)}\n"
-    return return_str
-
-
 def get_week_ranges_to_race(
     dt: datetime.datetime, race_date: datetime.date
 ) -> List[WeekRange]:
@@ -71,22 +42,19 @@ def get_week_ranges_to_race(
     return week_ranges
 
 
-def gen_training_plan(
-    user: UserRow, weekly_summaries: List[WeekSummary], dt: datetime.datetime
-) -> TrainingPlan:
+def get_training_plan_message(
+    user: UserRow, features: AthleteFeatures, dt: datetime.datetime
+) -> str:
     """
-    Generate a training plan for the user given training history
+    Build the training plan prompt for the user given training history
 
     :param user: UserRow object
-    :param weekly_summaries: List of WeekSummary objects
+    :param features: AthleteFeatures of the upcoming week
     :param dt: datetime injection, helpful for testing
-    :return: TrainingPlan object
+    :return: prompt string
     """
-
-    sorted_weekly_summaries = sorted(weekly_summaries, key=lambda x: x.week_start_date)
-    weekly_mileages = [summary.total_distance for summary in sorted_weekly_summaries]
-    last_52_weeks_mileage_stats = get_mileage_stats(weekly_mileages)
-    last_16_weeks_mileage_stats = get_mileage_stats(weekly_mileages[-16:])
+    last_52_weeks_mileage_stats = features.last_52_weeks_mileage_stats
+    last_16_weeks_mileage_stats = features.last_16_weeks_mileage_stats
 
     # create week_ranges string for prompt
     week_ranges = "\n".join(
@@ -96,7 +64,7 @@ def gen_training_plan(
         )
     )
 
-    message = f"""# Best practices for distance running training plans
+    return f"""# Best practices for distance running training plans
 1. Simple is better than complex - No need to get cute with cutbacks weeks unless the training block is very long
 2. Its best to be peaking at n_weeks_until_race=6,5,4 and begin tapering at n_weeks_until_race=3. Peaking too early is bad because the athlete won't be maximally fit for the race.
 3. If the athlete is behind schedule (e.g. doesn't have many weeks left) then delay the peak as needed
@@ -151,24 +119,72 @@ Your client's mileage stats over the past 16 weeks...
 Given this information, now you must generate a training plan for your client over the following weeks:
 {week_ranges}"""
 
-    return get_completion_json(message=message, response_model=TrainingPlan)
+
+def gen_training_plan(
+    user: UserRow, features: AthleteFeatures, dt: datetime.datetime
+) -> TrainingPlan:
+    """
+    Generate a training plan for the user given training history
+
+    :param user: UserRow object
+    :param features: AthleteFeatures of the upcoming week
+    :param dt: datetime injection, helpful for testing
+    :return: TrainingPlan object
+    """
+    message = get_training_plan_message(user=user, features=features, dt=dt)
+    with metrics.timer("training_plan_llm"):
+        return get_completion_json(message=message, response_model=TrainingPlan)
+
+
+async def gen_training_plan_async(
+    user: UserRow, features: AthleteFeatures, dt: datetime.datetime
+) -> TrainingPlan:
+    """
+    Async variant of gen_training_plan
+
+    :param user: UserRow object
+    :param features: AthleteFeatures of the upcoming week
+    :param dt: datetime injection, helpful for testing
+    :return: TrainingPlan object
+    """
+    message = get_training_plan_message(user=user, features=features, dt=dt)
+    with metrics.timer("training_plan_llm"):
+        return await get_completion_json_async(
+            message=message, response_model=TrainingPlan
+        )
 
 
 def gen_training_plan_pipeline(
-    user: UserRow, weekly_summaries: List[WeekSummary], dt: datetime.datetime
+    user: UserRow, features: AthleteFeatures, dt: datetime.datetime
 ) -> TrainingPlan:
     """
     Generate a training plan for the user given training history
 
     :param user: UserRow object
-    :param weekly_summaries: List of WeekSummary objects
+    :param features: AthleteFeatures of the upcoming week
     :param dt: datetime injection, helpful for testing
     :return: TrainingPlan object
     """
-    training_plan = gen_training_plan(
-        user=user, weekly_summaries=weekly_summaries, dt=dt
-    )
+    training_plan = gen_training_plan(user=user, features=features, dt=dt)
     supabase_client.insert_training_plan(
         athlete_id=user.athlete_id, training_plan=training_plan
     )
     return training_plan
+
+
+async def gen_training_plan_pipeline_async(
+    user: UserRow, features: AthleteFeatures, dt: datetime.datetime
+) -> TrainingPlan:
+    """
+    Async variant of gen_training_plan_pipeline
+
+    :param user: UserRow object
+    :param features: AthleteFeatures of the upcoming week
+    :param dt: datetime injection, helpful for testing
+    :return: TrainingPlan object
+    """
+    training_plan = await gen_training_plan_async(user=user, features=features, dt=dt)
+    await supabase_client.insert_training_plan_async(
+        athlete_id=user.athlete_id, training_plan=training_plan
+    )
+    return training_plan
@@ -1,8 +1,16 @@
+import asyncio
 import datetime
-from typing import List
+from typing import Dict, List, Optional
 
+from src import metrics
 from src.constants import COACH_ROLE
-from src.llm import get_completion, get_completion_json
+from src.daily_activity import DailyActivity
+from src.llm import (
+    get_completion,
+    get_completion_async,
+    get_completion_json,
+    get_completion_json_async,
+)
 from src.prompts import (
     COACHES_NOTES_PROMPT,
     PSEUDO_TRAINING_WEEK_PROMPT,
@@ -45,15 +53,15 @@ def get_remaining_days_of_week(dt: datetime.datetime, exe_type: ExeType) -> List
     return days_of_week[day_index + 1 :]
 
 
-def gen_pseudo_training_week(
+def get_pseudo_training_week_message(
     last_n_days_of_activity: List[DailyMetrics],
     mileage_recommendation: MileageRecommendation,
     miles_completed_this_week: float,
     miles_remaining_this_week: float,
     rest_of_week: List[str],
     user_preferences: Preferences,
-) -> PseudoTrainingWeek:
-    message = PSEUDO_TRAINING_WEEK_PROMPT.substitute(
+) -> str:
+    return PSEUDO_TRAINING_WEEK_PROMPT.substitute(
         COACH_ROLE=COACH_ROLE,
         user_preferences=user_preferences,
         n_days=len(last_n_days_of_activity),
@@ -64,86 +72,260 @@ def gen_pseudo_training_week(
         n_remaining_days=len(rest_of_week),
         rest_of_week=rest_of_week,
     )
+
+
+def gen_pseudo_training_week(
+    last_n_days_of_activity: List[DailyMetrics],
+    mileage_recommendation: MileageRecommendation,
+    miles_completed_this_week: float,
+    miles_remaining_this_week: float,
+    rest_of_week: List[str],
+    user_preferences: Preferences,
+) -> PseudoTrainingWeek:
     if len(rest_of_week) == 0:
         return PseudoTrainingWeek(days=[])
     return get_completion_json(
-        message=message,
+        message=get_pseudo_training_week_message(
+            last_n_days_of_activity=last_n_days_of_activity,
+            mileage_recommendation=mileage_recommendation,
+            miles_completed_this_week=miles_completed_this_week,
+            miles_remaining_this_week=miles_remaining_this_week,
+            rest_of_week=rest_of_week,
+            user_preferences=user_preferences,
+        ),
         response_model=PseudoTrainingWeek,
     )
 
 
-def gen_training_week(
+async def gen_pseudo_training_week_async(
+    last_n_days_of_activity: List[DailyMetrics],
+    mileage_recommendation: MileageRecommendation,
+    miles_completed_this_week: float,
+    miles_remaining_this_week: float,
+    rest_of_week: List[str],
+    user_preferences: Preferences,
+) -> PseudoTrainingWeek:
+    if len(rest_of_week) == 0:
+        return PseudoTrainingWeek(days=[])
+    return await get_completion_json_async(
+        message=get_pseudo_training_week_message(
+            last_n_days_of_activity=last_n_days_of_activity,
+            mileage_recommendation=mileage_recommendation,
+            miles_completed_this_week=miles_completed_this_week,
+            miles_remaining_this_week=miles_remaining_this_week,
+            rest_of_week=rest_of_week,
+            user_preferences=user_preferences,
+        ),
+        response_model=PseudoTrainingWeek,
+    )
+
+
+def get_training_week_message(
     user: UserRow,
     pseudo_training_week: PseudoTrainingWeek,
     mileage_recommendation: MileageRecommendation,
-) -> TrainingWeek:
-    message = TRAINING_WEEK_PROMPT.substitute(
+) -> str:
+    return TRAINING_WEEK_PROMPT.substitute(
         COACH_ROLE=COACH_ROLE,
         preferences=user.preferences,
         n_days=len(pseudo_training_week.days),
         pseudo_training_week=pseudo_training_week,
         mileage_recommendation=mileage_recommendation,
     )
+
+
+def gen_training_week(
+    user: UserRow,
+    pseudo_training_week: PseudoTrainingWeek,
+    mileage_recommendation: MileageRecommendation,
+) -> TrainingWeek:
     if len(pseudo_training_week.days) == 0:
         return TrainingWeek(sessions=[])
     return get_completion_json(
-        message=message,
+        message=get_training_week_message(
+            user=user,
+            pseudo_training_week=pseudo_training_week,
+            mileage_recommendation=mileage_recommendation,
+        ),
         response_model=TrainingWeek,
     )
 
 
-def gen_coaches_notes(
+async def gen_training_week_async(
+    user: UserRow,
+    pseudo_training_week: PseudoTrainingWeek,
+    mileage_recommendation: MileageRecommendation,
+) -> TrainingWeek:
+    if len(pseudo_training_week.days) == 0:
+        return TrainingWeek(sessions=[])
+    return await get_completion_json_async(
+        message=get_training_week_message(
+            user=user,
+            pseudo_training_week=pseudo_training_week,
+            mileage_recommendation=mileage_recommendation,
+        ),
+        response_model=TrainingWeek,
+    )
+
+
+def get_coaches_notes_message(
     activity_of_interest: DailyMetrics, past_7_days: List[DailyMetrics]
 ) -> str:
-    message = COACHES_NOTES_PROMPT.substitute(
+    return COACHES_NOTES_PROMPT.substitute(
         COACH_ROLE=COACH_ROLE,
         past_7_days=past_7_days,
         activity_of_interest=activity_of_interest,
         day_of_week=activity_of_interest.day_of_week,
     )
-    return get_completion(message=message)
+
+
+def gen_coaches_notes(
+    activity_of_interest: DailyMetrics, past_7_days: List[DailyMetrics]
+) -> str:
+    return get_completion(
+        message=get_coaches_notes_message(
+            activity_of_interest=activity_of_interest, past_7_days=past_7_days
+        )
+    )
+
+
+async def gen_coaches_notes_async(
+    activity_of_interest: DailyMetrics, past_7_days: List[DailyMetrics]
+) -> str:
+    return await get_completion_async(
+        message=get_coaches_notes_message(
+            activity_of_interest=activity_of_interest, past_7_days=past_7_days
+        )
+    )
+
+
+def get_past_7_days(
+    daily_activity: DailyActivity, activity: DailyMetrics
+) -> List[DailyMetrics]:
+    """
+    Returns the daily metrics of the 7 days leading up to (excluding) the
+    given activity
+
+    :param daily_activity: DailyActivity object
+    :param activity: DailyMetrics object of interest
+    :return: List of DailyMetrics objects
+    """
+    return daily_activity.between(
+        activity.date - datetime.timedelta(days=6),
+        activity.date - datetime.timedelta(days=1),
+    ).to_daily_metrics()
+
+
+def get_reusable_coaches_notes(
+    this_weeks_activity: List[DailyMetrics],
+    previous_training_week: Optional[List[EnrichedActivity]],
+) -> Dict[datetime.date, str]:
+    """
+    Coach notes from the previous run that are still valid, i.e. those for
+    days whose DailyMetrics are unchanged since they were annotated
+
+    :param this_weeks_activity: List of DailyMetrics objects for the current week
+    :param previous_training_week: past_training_week of the previous run
+    :return: dict of date to coach notes
+    """
+    if not previous_training_week:
+        return {}
+
+    previous_by_date = {
+        enriched.activity.date: enriched for enriched in previous_training_week
+    }
+    return {
+        activity.date: previous_by_date[activity.date].coaches_notes
+        for activity in this_weeks_activity
+        if activity.date in previous_by_date
+        and previous_by_date[activity.date].activity == activity
+    }
 
 
 def slice_and_gen_weekly_activity(
-    daily_activity: List[DailyMetrics], rest_of_week: List[str]
+    daily_activity: DailyActivity,
+    rest_of_week: List[str],
+    previous_training_week: Optional[List[EnrichedActivity]] = None,
 ) -> List[EnrichedActivity]:
     """
     Slices the weekly activity based on the remaining days of the week and
-    generates coach notes for each activity
+    generates coach notes for each activity, reusing notes from the previous
+    run for days that have not changed
 
-    :param daily_activity: List of DailyMetrics objects
+    :param daily_activity: DailyActivity object
     :param rest_of_week: List of remaining days of the week
+    :param previous_training_week: past_training_week of the previous run
     :return: List of EnrichedActivity objects
     """
     if len(rest_of_week) == 7:
         return []
 
     days_so_far = 7 - len(rest_of_week)
-    this_weeks_activity = daily_activity[-days_so_far:]
+    this_weeks_activity = daily_activity[-days_so_far:].to_daily_metrics()
+    reusable_notes = get_reusable_coaches_notes(
+        this_weeks_activity, previous_training_week
+    )
 
     return [
         EnrichedActivity(
             activity=activity,
-            coaches_notes=gen_coaches_notes(
+            coaches_notes=reusable_notes.get(activity.date)
+            or gen_coaches_notes(
                 activity_of_interest=activity,
-                past_7_days=[
-                    a
-                    for a in daily_activity
-                    if a.date > activity.date - datetime.timedelta(days=7)
-                    and a.date < activity.date
-                ],
+                past_7_days=get_past_7_days(daily_activity, activity),
             ),
         )
         for activity in this_weeks_activity
     ]
 
 
+async def slice_and_gen_weekly_activity_async(
+    daily_activity: DailyActivity,
+    rest_of_week: List[str],
+    previous_training_week: Optional[List[EnrichedActivity]] = None,
+) -> List[EnrichedActivity]:
+    """
+    Async variant of slice_and_gen_weekly_activity, coach notes for new or
+    changed days are generated concurrently
+
+    :param daily_activity: DailyActivity object
+    :param rest_of_week: List of remaining days of the week
+    :param previous_training_week: past_training_week of the previous run
+    :return: List of EnrichedActivity objects
+    """
+    if len(rest_of_week) == 7:
+        return []
+
+    days_so_far = 7 - len(rest_of_week)
+    this_weeks_activity = daily_activity[-days_so_far:].to_daily_metrics()
+    reusable_notes = get_reusable_coaches_notes(
+        this_weeks_activity, previous_training_week
+    )
+
+    async def get_coaches_notes(activity: DailyMetrics) -> str:
+        if activity.date in reusable_notes:
+            return reusable_notes[activity.date]
+        return await gen_coaches_notes_async(
+            activity_of_interest=activity,
+            past_7_days=get_past_7_days(daily_activity, activity),
+        )
+
+    coaches_notes = await asyncio.gather(
+        *[get_coaches_notes(activity) for activity in this_weeks_activity]
+    )
+    return [
+        EnrichedActivity(activity=activity, coaches_notes=notes)
+        for activity, notes in zip(this_weeks_activity, coaches_notes)
+    ]
+
+
 def gen_full_training_week(
     user: UserRow,
-    daily_activity: List[DailyMetrics],
+    daily_activity: DailyActivity,
     mileage_rec: MileageRecommendation,
     exe_type: ExeType,
     dt: datetime.datetime,
+    previous_training_week: Optional[List[EnrichedActivity]] = None,
 ) -> FullTrainingWeek:
     """
     Generates full training week given mileage recommendation
@@ -153,27 +335,84 @@ def gen_full_training_week(
     :param mileage_rec: recommendation for this weeks training
     :param exe_type: new week or mid week
     :param dt: datetime injection, helpful for testing
+    :param previous_training_week: past_training_week of the previous run, its
+        coach notes are kept for unchanged days
     :return: full training week
     """
     rest_of_week = get_remaining_days_of_week(dt, exe_type)
-    this_weeks_activity = slice_and_gen_weekly_activity(daily_activity, rest_of_week)
+    with metrics.timer("coaches_notes"):
+        this_weeks_activity = slice_and_gen_weekly_activity(
+            daily_activity, rest_of_week, previous_training_week
+        )
     miles_completed_this_week = sum(
         [obj.activity.distance_in_miles for obj in this_weeks_activity]
     )
     miles_remaining_this_week = mileage_rec.total_volume - miles_completed_this_week
-    pseudo_training_week = gen_pseudo_training_week(
-        last_n_days_of_activity=daily_activity[-14:],
-        mileage_recommendation=mileage_rec,
-        miles_completed_this_week=miles_completed_this_week,
-        miles_remaining_this_week=miles_remaining_this_week,
-        rest_of_week=rest_of_week,
-        user_preferences=user.preferences,
+    with metrics.timer("pseudo_training_week_llm"):
+        pseudo_training_week = gen_pseudo_training_week(
+            last_n_days_of_activity=daily_activity[-14:].to_daily_metrics(),
+            mileage_recommendation=mileage_rec,
+            miles_completed_this_week=miles_completed_this_week,
+            miles_remaining_this_week=miles_remaining_this_week,
+            rest_of_week=rest_of_week,
+            user_preferences=user.preferences,
+        )
+    with metrics.timer("training_week_llm"):
+        training_week = gen_training_week(
+            user=user,
+            pseudo_training_week=pseudo_training_week,
+            mileage_recommendation=mileage_rec,
+        )
+    return FullTrainingWeek(
+        past_training_week=this_weeks_activity,
+        future_training_week=training_week,
     )
-    training_week = gen_training_week(
-        user=user,
-        pseudo_training_week=pseudo_training_week,
-        mileage_recommendation=mileage_rec,
+
+
+async def gen_full_training_week_async(
+    user: UserRow,
+    daily_activity: DailyActivity,
+    mileage_rec: MileageRecommendation,
+    exe_type: ExeType,
+    dt: datetime.datetime,
+    previous_training_week: Optional[List[EnrichedActivity]] = None,
+) -> FullTrainingWeek:
+    """
+    Async variant of gen_full_training_week
+
+    :param user: user entity
+    :param daily_activity: list of daily actvity metrics past n weeks
+    :param mileage_rec: recommendation for this weeks training
+    :param exe_type: new week or mid week
+    :param dt: datetime injection, helpful for testing
+    :param previous_training_week: past_training_week of the previous run, its
+        coach notes are kept for unchanged days
+    :return: full training week
+    """
+    rest_of_week = get_remaining_days_of_week(dt, exe_type)
+    with metrics.timer("coaches_notes"):
+        this_weeks_activity = await slice_and_gen_weekly_activity_async(
+            daily_activity, rest_of_week, previous_training_week
+        )
+    miles_completed_this_week = sum(
+        [obj.activity.distance_in_miles for obj in this_weeks_activity]
     )
+    miles_remaining_this_week = mileage_rec.total_volume - miles_completed_this_week
+    with metrics.timer("pseudo_training_week_llm"):
+        pseudo_training_week = await gen_pseudo_training_week_async(
+            last_n_days_of_activity=daily_activity[-14:].to_daily_metrics(),
+            mileage_recommendation=mileage_rec,
+            miles_completed_this_week=miles_completed_this_week,
+            miles_remaining_this_week=miles_remaining_this_week,
+            rest_of_week=rest_of_week,
+            user_preferences=user.preferences,
+        )
+    with metrics.timer("training_week_llm"):
+        training_week = await gen_training_week_async(
+            user=user,
+            pseudo_training_week=pseudo_training_week,
+            mileage_recommendation=mileage_rec,
+        )
     return FullTrainingWeek(
         past_training_week=this_weeks_activity,
         future_training_week=training_week,
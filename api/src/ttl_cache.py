@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache whose entries expire ttl seconds after they
+    are stored. Holds at most maxsize entries, evicting the least recently
+    used one first.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        maxsize: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        # bumped by every invalidation, loads racing one are not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Cached value of key, None when missing or expired
+
+        :param key: cache key
+        :return: cached value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store value under key for ttl seconds
+
+        :param key: cache key
+        :param value: value to cache
+        """
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        """set, with the lock already held"""
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop the entry of key, if any"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        Read-through access: the cached value of key, or load() which is then
+        cached. Exceptions raised by load are not cached.
+
+        :param key: cache key
+        :param load: computes the value on a miss
+        :return: value of key
+        """
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                generation = self._generation
+            value = load()
+            # checked & stored at once, an invalidation cannot slip in between
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, value)
+        return value
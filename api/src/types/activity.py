@@ -53,6 +53,18 @@ class DailyMetrics(BaseModel):
     activity_count: int
 
 
+class DailyTotals(BaseModel):
+    """Sums over an athlete's runs of a single (local) day, in Strava units"""
+
+    date: datetime.date
+    distance: float
+    total_elevation_gain: float
+    moving_time: float
+    """Seconds"""
+
+    activity_count: int
+
+
 class ActivitySummary(BaseModel):
     date: str
     """Datetime formatted as 'Monday, August 13, 2024'"""
@@ -0,0 +1,72 @@
+import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+from src.types.activity import WeekSummary
+
+
+class MileageStats(BaseModel):
+    """Weekly mileage statistics over a number of weeks"""
+
+    total_miles: float
+    miles_per_week: float
+    median_weekly_mileage: float
+    seventy_five_percentile_weekly_mileage: float
+    ninety_percentile_weekly_mileage: float
+    max_weekly_mileage: float
+
+    def __str__(self):
+        return (
+            f"Total miles: {self.total_miles}\n"
+            f"Avg Miles per week: {self.miles_per_week}\n"
+            f"Median weekly mileage: {self.median_weekly_mileage}\n"
+            f"75%ile of weekly mileage: {self.seventy_five_percentile_weekly_mileage}\n"
+            f"90%ile of weekly mileage: {self.ninety_percentile_weekly_mileage}\n"
+            f"Max weekly mileage: {self.max_weekly_mileage}\n"
+        )
+
+
+class TrainingLoadSummary(BaseModel):
+    """Training load at the end of a week, None without enough history"""
+
+    acute_load: Optional[float]
+    chronic_load: Optional[float]
+    acute_chronic_ratio: Optional[float]
+    ramp_rate: Optional[float]
+    monotony: Optional[float]
+    injury_risk: bool
+
+    def __str__(self):
+        def fmt(value: Optional[float]) -> str:
+            return "n/a" if value is None else f"{value:.2f}"
+
+        return (
+            f"Acute load (last 7 days): {fmt(self.acute_load)} miles\n"
+            f"Chronic load (weekly avg over last 28 days): {fmt(self.chronic_load)} miles\n"
+            f"Acute:chronic workload ratio: {fmt(self.acute_chronic_ratio)}\n"
+            f"Ramp rate (week over week): {fmt(self.ramp_rate)}\n"
+            f"Monotony: {fmt(self.monotony)}\n"
+            f"Elevated injury risk: {'yes' if self.injury_risk else 'no'}\n"
+        )
+
+
+class AthleteFeatures(BaseModel):
+    """
+    Features derived from an athlete's history up to the start of a week,
+    keyed by (athlete_id, week_start_date)
+    """
+
+    athlete_id: int
+    week_start_date: datetime.date
+    """Monday of the week the features are for, history ends the day before"""
+
+    revision: int
+    """Activity store revision the features were computed from"""
+
+    generation: Optional[str] = None
+    """Activity store generation the revision belongs to"""
+
+    weekly_summaries: List[WeekSummary]
+    last_52_weeks_mileage_stats: MileageStats
+    last_16_weeks_mileage_stats: MileageStats
+    training_load: TrainingLoadSummary
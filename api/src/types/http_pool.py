@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class HttpPoolConfig(BaseModel):
+    """Connection pool limits and timeouts of a pooled HTTP transport, in seconds"""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = True
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
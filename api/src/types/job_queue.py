@@ -0,0 +1,49 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+from src.types.update_pipeline import ExeType
+from strenum import StrEnum
+
+
+class JobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class UpdateJob(BaseModel):
+    """A single athlete's training week update within a nightly run"""
+
+    run_id: str
+    athlete_id: int
+    exe_type: ExeType
+    status: JobStatus = JobStatus.PENDING
+    attempts: int = 0
+    last_error: Optional[str] = None
+    updated_at: datetime.datetime
+
+
+class RefreshJobRow(BaseModel):
+    """Database row representation of refresh_job table, one per /refresh/ call"""
+
+    job_id: str
+    athlete_id: int
+    status: JobStatus = JobStatus.PENDING
+    steps_completed: int = 0
+    total_steps: int = 3
+    error: Optional[str] = None
+    updated_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+    )
+
+    @property
+    def progress(self) -> float:
+        return self.steps_completed / self.total_steps
+
+    def dict(self, *args, **kwargs):
+        data = super().dict(*args, **kwargs)
+        if isinstance(data["updated_at"], datetime.datetime):
+            data["updated_at"] = data["updated_at"].isoformat()
+        return data
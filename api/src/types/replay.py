@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from strenum import StrEnum
+
+
+class ReplayMode(StrEnum):
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+class LatencyConfig(BaseModel):
+    """Seconds of latency injected into every replayed call, per stage"""
+
+    strava: float = 0.0
+    llm: float = 0.0
+    db: float = 0.0
@@ -1,3 +1,4 @@
+from pydantic import BaseModel, root_validator
 from strenum import StrEnum
 
 
@@ -6,3 +7,37 @@ class ExeType(StrEnum):
     MID_WEEK = "mid_week"
 
 
+class Stage(StrEnum):
+    STRAVA = "strava"
+    LLM = "llm"
+    DB = "db"
+
+
+class ConcurrencyConfig(BaseModel):
+    """Worker pool size and per-stage concurrency limits for update_all_users_async"""
+
+    max_workers: int = 16
+    strava: int = 4
+    llm: int = 8
+    db: int = 8
+
+
+class ShardSpec(BaseModel):
+    """Slice of the user base, partitioned by athlete_id hash, for one replica"""
+
+    shard_index: int = 0
+    shard_count: int = 1
+
+    @root_validator
+    def validate_shard(cls, values):
+        shard_index, shard_count = values.get("shard_index"), values.get("shard_count")
+        if shard_count is None or shard_count < 1:
+            raise ValueError(f"shard_count must be positive, got {shard_count=}")
+        if shard_index is None or not 0 <= shard_index < shard_count:
+            raise ValueError(
+                f"shard_index must be in [0, {shard_count}), got {shard_index=}"
+            )
+        return values
+
+    def __str__(self):
+        return f"shard-{self.shard_index}-of-{self.shard_count}"
@@ -1,27 +1,159 @@
+import asyncio
 import datetime
 import logging
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from src import (
     activities,
     apn,
     auth_manager,
+    concurrency,
     email_manager,
+    job_queue,
+    metrics,
     mileage_recommendation,
+    sharding,
     supabase_client,
     training_week,
     utils,
 )
+from src.daily_activity import DailyActivity
+from src.types.job_queue import JobStatus, RefreshJobRow
+from src.types.mileage_recommendation import MileageRecommendation
 from src.types.training_week import FullTrainingWeek
-from src.types.update_pipeline import ExeType
+from src.types.update_pipeline import ConcurrencyConfig, ExeType, ShardSpec, Stage
 from src.types.user import UserRow
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# mid-week runs read their mileage rec back from the db and only look at the
+# last 14 days & the current week; 3 weeks leave at least 14 full days once
+# get_daily_activity chops the partial week at the start of the window
+MID_WEEK_HISTORY_NUM_WEEKS = 3
+
+# both new week strategies consume the full year: training plans are built on
+# 52 week mileage stats, mileage recs list every week summary in the prompt
+NEW_WEEK_HISTORY_NUM_WEEKS = 52
+
+
+def get_history_num_weeks(exe_type: ExeType) -> int:
+    """
+    Number of weeks of activity history a training week update consumes
+
+    :param exe_type: ExeType object
+    :return: number of weeks to fetch
+    """
+    if exe_type == ExeType.NEW_WEEK:
+        return NEW_WEEK_HISTORY_NUM_WEEKS
+    return MID_WEEK_HISTORY_NUM_WEEKS
+
+
+def fetch_daily_activity(
+    user: UserRow, dt: datetime.datetime, num_weeks: int = 52
+) -> DailyActivity:
+    """
+    Authenticate with Strava and fetch the athlete's daily activity
+
+    :param user: UserRow object
+    :param dt: datetime injection, helpful for testing
+    :param num_weeks: number of weeks of history to fetch
+    :return: DailyActivity object
+    """
+    with metrics.timer("strava_auth"):
+        strava_client = auth_manager.get_strava_client(user.athlete_id)
+    with concurrency.limit(Stage.STRAVA):
+        return activities.get_daily_activity(
+            strava_client, dt=dt, num_weeks=num_weeks, athlete_id=user.athlete_id
+        )
+
+
+async def fetch_daily_activity_async(
+    user: UserRow, dt: datetime.datetime, num_weeks: int = 52
+) -> DailyActivity:
+    """
+    Async variant of fetch_daily_activity
+
+    :param user: UserRow object
+    :param dt: datetime injection, helpful for testing
+    :param num_weeks: number of weeks of history to fetch
+    :return: DailyActivity object
+    """
+    with metrics.timer("strava_auth"):
+        strava_client = await asyncio.to_thread(
+            auth_manager.get_strava_client, user.athlete_id
+        )
+    async with concurrency.limit_async(Stage.STRAVA):
+        return await activities.get_daily_activity_async(
+            strava_client, dt=dt, num_weeks=num_weeks, athlete_id=user.athlete_id
+        )
+
+
+def get_input_fingerprint(
+    user: UserRow,
+    exe_type: ExeType,
+    dt: datetime.datetime,
+    daily_activity: DailyActivity,
+    mileage_rec: Optional[MileageRecommendation] = None,
+) -> str:
+    """
+    Fingerprint everything a training week is generated from, so a run whose
+    inputs match the last stored run can be skipped
+
+    :param user: UserRow object
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :param daily_activity: DailyActivity object
+    :param mileage_rec: mileage recommendation when it is an input (mid-week)
+    :return: hex digest
+    """
+    return utils.get_fingerprint(
+        exe_type, dt.date(), user.preferences, daily_activity, mileage_rec
+    )
+
+
+def is_unchanged(
+    user: UserRow, fingerprint: str, latest_fingerprint: Optional[str]
+) -> bool:
+    """
+    Check whether a run's inputs match those of the last stored run
+
+    :param user: UserRow object
+    :param fingerprint: get_input_fingerprint of the run
+    :param latest_fingerprint: fingerprint stored with the last run
+    :return: True if the run can be skipped
+    """
+    if fingerprint != latest_fingerprint:
+        return False
+    logger.info(f"Inputs unchanged for user {user.athlete_id}, skipping")
+    return True
+
+
+def get_error_message(user: UserRow, action: str, e: Exception) -> str:
+    """
+    Log a failed pipeline step of a user
+
+    :param user: UserRow object
+    :param action: what failed, e.g. "updating training week"
+    :param e: the exception raised
+    :return: error message including the traceback
+    """
+    error_message = (
+        f"Error {action} for user {user.athlete_id}: {e}\n{traceback.format_exc()}"
+    )
+    logger.error(error_message)
+    return error_message
+
 
 def _update_training_week(
-    user: UserRow, exe_type: ExeType, dt: datetime.datetime
+    user: UserRow,
+    exe_type: ExeType,
+    dt: datetime.datetime,
+    daily_activity: Optional[DailyActivity] = None,
+    mileage_rec: Optional[MileageRecommendation] = None,
 ) -> FullTrainingWeek:
     """
     Single function to handle all training week updates
@@ -29,41 +161,200 @@ def _update_training_week(
     :param user: UserRow object
     :param exe_type: ExeType object
     :param dt: datetime injection, helpful for testing
+    :param daily_activity: already fetched daily activity, fetched if None
+    :param mileage_rec: already retrieved mileage recommendation, generated if None
     :return: FullTrainingWeek object
     """
-    strava_client = auth_manager.get_strava_client(user.athlete_id)
-    daily_activity = activities.get_daily_activity(strava_client, dt=dt, num_weeks=52)
+    with metrics.track_exe_type(exe_type):
+        if daily_activity is None:
+            daily_activity = fetch_daily_activity(
+                user, dt, num_weeks=get_history_num_weeks(exe_type)
+            )
 
-    mileage_rec = mileage_recommendation.get_or_gen_mileage_recommendation(
-        user=user, daily_activity=daily_activity, exe_type=exe_type, dt=dt
-    )
+        if mileage_rec is None:
+            with metrics.timer("mileage_recommendation"):
+                mileage_rec = mileage_recommendation.get_or_gen_mileage_recommendation(
+                    user=user, exe_type=exe_type, dt=dt
+                )
 
-    return training_week.gen_full_training_week(
-        user=user,
-        daily_activity=daily_activity,
-        mileage_rec=mileage_rec,
-        exe_type=exe_type,
-        dt=dt,
-    )
+        # mid-week runs keep the coach notes of days annotated by the last run
+        previous_training_week = None
+        if exe_type == ExeType.MID_WEEK:
+            previous_training_week = supabase_client.get_past_training_week(
+                user.athlete_id
+            )
+
+        return training_week.gen_full_training_week(
+            user=user,
+            daily_activity=daily_activity,
+            mileage_rec=mileage_rec,
+            exe_type=exe_type,
+            dt=dt,
+            previous_training_week=previous_training_week,
+        )
+
+
+async def _update_training_week_async(
+    user: UserRow,
+    exe_type: ExeType,
+    dt: datetime.datetime,
+    daily_activity: Optional[DailyActivity] = None,
+    mileage_rec: Optional[MileageRecommendation] = None,
+) -> FullTrainingWeek:
+    """
+    Async variant of _update_training_week, awaiting each I/O step so a single
+    worker can overlap many athletes and requests
+
+    :param user: UserRow object
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :param daily_activity: already fetched daily activity, fetched if None
+    :param mileage_rec: already retrieved mileage recommendation, generated if None
+    :return: FullTrainingWeek object
+    """
+    with metrics.track_exe_type(exe_type):
+        if daily_activity is None:
+            daily_activity = await fetch_daily_activity_async(
+                user, dt, num_weeks=get_history_num_weeks(exe_type)
+            )
+
+        if mileage_rec is None:
+            with metrics.timer("mileage_recommendation"):
+                mileage_rec = await mileage_recommendation.get_or_gen_mileage_recommendation_async(
+                    user=user, exe_type=exe_type, dt=dt
+                )
+
+        previous_training_week = None
+        if exe_type == ExeType.MID_WEEK:
+            previous_training_week = await supabase_client.get_past_training_week_async(
+                user.athlete_id
+            )
+
+        return await training_week.gen_full_training_week_async(
+            user=user,
+            daily_activity=daily_activity,
+            mileage_rec=mileage_rec,
+            exe_type=exe_type,
+            dt=dt,
+            previous_training_week=previous_training_week,
+        )
 
 
 def update_training_week(
     user: UserRow, exe_type: ExeType, dt: datetime.datetime
 ) -> dict:
     """
-    Full pipeline with update training week & push notification side effects
+    Full pipeline with update training week & push notification side effects.
+    Skips all LLM work and the upsert when the inputs match the last run.
 
     :param user: UserRow object
     :param exe_type: ExeType object
     :param dt: datetime injection, helpful for testing
     :return: dict
     """
-    training_week = _update_training_week(user=user, exe_type=exe_type, dt=dt)
-    supabase_client.upsert_training_week(
-        athlete_id=user.athlete_id,
-        future_training_week=training_week.future_training_week,
-        past_training_week=training_week.past_training_week,
-    )
+    with metrics.track_exe_type(exe_type), metrics.timer("total"):
+        daily_activity = fetch_daily_activity(
+            user, dt, num_weeks=get_history_num_weeks(exe_type)
+        )
+
+        # mid-week recs are read back from the db, making them a cheap input to
+        # fingerprint; new week recs are generated (an output, not an input)
+        mileage_rec = None
+        if exe_type == ExeType.MID_WEEK:
+            with metrics.timer("mileage_recommendation"):
+                mileage_rec = mileage_recommendation.get_or_gen_mileage_recommendation(
+                    user=user, exe_type=exe_type, dt=dt
+                )
+
+        fingerprint = get_input_fingerprint(
+            user, exe_type, dt, daily_activity, mileage_rec
+        )
+        if is_unchanged(
+            user,
+            fingerprint,
+            supabase_client.get_latest_input_fingerprint(user.athlete_id),
+        ):
+            return {"success": True, "skipped": True}
+
+        training_week = _update_training_week(
+            user=user,
+            exe_type=exe_type,
+            dt=dt,
+            daily_activity=daily_activity,
+            mileage_rec=mileage_rec,
+        )
+        with metrics.timer("upsert"):
+            supabase_client.upsert_training_week(
+                athlete_id=user.athlete_id,
+                future_training_week=training_week.future_training_week,
+                past_training_week=training_week.past_training_week,
+                input_fingerprint=fingerprint,
+                exe_type=exe_type,
+            )
+    return {"success": True}
+
+
+async def update_training_week_async(
+    user: UserRow,
+    exe_type: ExeType,
+    dt: datetime.datetime,
+    daily_activity: Optional[DailyActivity] = None,
+    skip_unchanged: bool = True,
+    compare_same_exe_type: bool = False,
+) -> dict:
+    """
+    Async variant of update_training_week
+
+    :param user: UserRow object
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :param daily_activity: already fetched daily activity, fetched if None
+    :param skip_unchanged: skip the run when its inputs match the last run
+    :param compare_same_exe_type: compare against the last run of exe_type
+        rather than the latest run, only safe when a run of the other
+        exe_type is stored on top right after
+    :return: dict
+    """
+    with metrics.track_exe_type(exe_type), metrics.timer("total"):
+        if daily_activity is None:
+            daily_activity = await fetch_daily_activity_async(
+                user, dt, num_weeks=get_history_num_weeks(exe_type)
+            )
+
+        mileage_rec = None
+        if exe_type == ExeType.MID_WEEK:
+            with metrics.timer("mileage_recommendation"):
+                mileage_rec = await mileage_recommendation.get_or_gen_mileage_recommendation_async(
+                    user=user, exe_type=exe_type, dt=dt
+                )
+
+        fingerprint = get_input_fingerprint(
+            user, exe_type, dt, daily_activity, mileage_rec
+        )
+        if skip_unchanged and is_unchanged(
+            user,
+            fingerprint,
+            await supabase_client.get_latest_input_fingerprint_async(
+                user.athlete_id, exe_type if compare_same_exe_type else None
+            ),
+        ):
+            return {"success": True, "skipped": True}
+
+        training_week = await _update_training_week_async(
+            user=user,
+            exe_type=exe_type,
+            dt=dt,
+            daily_activity=daily_activity,
+            mileage_rec=mileage_rec,
+        )
+        with metrics.timer("upsert"):
+            await supabase_client.upsert_training_week_async(
+                athlete_id=user.athlete_id,
+                future_training_week=training_week.future_training_week,
+                past_training_week=training_week.past_training_week,
+                input_fingerprint=fingerprint,
+                exe_type=exe_type,
+            )
     return {"success": True}
 
 
@@ -80,11 +371,11 @@ def update_training_week_wrapper(
     """
     try:
         response = update_training_week(user, exe_type, dt)
-        apn.send_push_notif_wrapper(user)
+        if not response.get("skipped"):
+            apn.send_push_notif_wrapper(user)
         return response
     except Exception as e:
-        error_message = f"Error updating training week for user {user.athlete_id}: {e}\n{traceback.format_exc()}"
-        logger.error(error_message)
+        error_message = get_error_message(user, "updating training week", e)
         email_manager.send_alert_email(
             subject="Crush Your Race Update Pipeline Error 😵‍💫",
             text_content=error_message,
@@ -92,23 +383,398 @@ def update_training_week_wrapper(
         return {"success": False, "error": error_message}
 
 
-def update_all_users() -> dict:
+async def update_training_week_wrapper_async(
+    user: UserRow, exe_type: ExeType, dt: datetime.datetime
+) -> dict:
+    """
+    Async variant of update_training_week_wrapper
+
+    :param user: UserRow object
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :return: dict
+    """
+    try:
+        response = await update_training_week_async(user, exe_type, dt)
+        if not response.get("skipped"):
+            await asyncio.to_thread(apn.send_push_notif_wrapper, user)
+        return response
+    except Exception as e:
+        error_message = get_error_message(user, "updating training week", e)
+        await asyncio.to_thread(
+            email_manager.send_alert_email,
+            subject="Crush Your Race Update Pipeline Error 😵‍💫",
+            text_content=error_message,
+        )
+        return {"success": False, "error": error_message}
+
+
+async def refresh_training_weeks_async(user: UserRow, job_id: str) -> None:
+    """
+    Regenerate the new week & mid-week training weeks of a single user as a
+    background job, recording progress in the refresh_job table. Strava is
+    queried once and both runs are served from the same activity history.
+
+    :param user: UserRow object
+    :param job_id: identifier of the refresh job
+    """
+    job = RefreshJobRow(
+        job_id=job_id, athlete_id=user.athlete_id, status=JobStatus.RUNNING
+    )
+
+    async def record_progress(**updates) -> None:
+        nonlocal job
+        job = job.copy(
+            update={
+                **updates,
+                "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            }
+        )
+        await supabase_client.upsert_refresh_job_async(job)
+
+    try:
+        await record_progress()
+        now = utils.datetime_now_est()
+        last_sunday = utils.get_last_sunday()
+
+        # one extra week covers the mid-week window on top of last Sunday's
+        daily_activity = await fetch_daily_activity_async(
+            user,
+            now,
+            num_weeks=get_history_num_weeks(ExeType.NEW_WEEK) + 1,
+        )
+        await record_progress(steps_completed=1)
+
+        # the mid-week row below is stored on top of the new week one, so the
+        # new week is compared against the last new week row, not the latest
+        new_week_response = await update_training_week_async(
+            user,
+            ExeType.NEW_WEEK,
+            dt=last_sunday,
+            daily_activity=activities.slice_daily_activity(
+                daily_activity,
+                dt=last_sunday,
+                num_weeks=get_history_num_weeks(ExeType.NEW_WEEK),
+            ),
+            compare_same_exe_type=True,
+        )
+        await record_progress(steps_completed=2)
+
+        # a new week row just stored is now the latest, so the mid-week one
+        # has to be stored again on top of it even if its inputs are unchanged
+        await update_training_week_async(
+            user,
+            ExeType.MID_WEEK,
+            dt=now,
+            daily_activity=activities.slice_daily_activity(
+                daily_activity,
+                dt=now,
+                num_weeks=get_history_num_weeks(ExeType.MID_WEEK),
+            ),
+            skip_unchanged=new_week_response.get("skipped", False),
+        )
+        await record_progress(steps_completed=3, status=JobStatus.SUCCEEDED)
+    except Exception as e:
+        error_message = get_error_message(user, "refreshing training weeks", e)
+        await record_progress(status=JobStatus.FAILED, error=str(e))
+        await asyncio.to_thread(
+            email_manager.send_alert_email,
+            subject="Crush Your Race Refresh Error 😵‍💫",
+            text_content=error_message,
+        )
+
+
+def run_update_job(
+    run_id: str, user: UserRow, exe_type: ExeType, dt: datetime.datetime
+) -> dict:
+    """
+    Update a single user as a job of a persistent run, recording its status,
+    attempts and last error in the job queue
+
+    :param run_id: identifier of the run
+    :param user: UserRow object
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :return: dict
+    """
+    job_queue.get_job_queue().mark_running(run_id, user.athlete_id)
+    response = update_training_week_wrapper(user, exe_type, dt)
+    record_job_result(run_id, user, response)
+    return response
+
+
+async def run_update_job_async(
+    run_id: str, user: UserRow, exe_type: ExeType, dt: datetime.datetime
+) -> dict:
+    """
+    Async variant of run_update_job
+
+    :param run_id: identifier of the run
+    :param user: UserRow object
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :return: dict
+    """
+    queue = job_queue.get_job_queue()
+    await asyncio.to_thread(queue.mark_running, run_id, user.athlete_id)
+    response = await update_training_week_wrapper_async(user, exe_type, dt)
+    await asyncio.to_thread(record_job_result, run_id, user, response)
+    return response
+
+
+def record_job_result(run_id: str, user: UserRow, response: dict) -> None:
+    """
+    Mark a user's job of a run as succeeded or failed from its response
+
+    :param run_id: identifier of the run
+    :param user: UserRow object
+    :param response: update_training_week_wrapper response
+    """
+    queue = job_queue.get_job_queue()
+    if response["success"]:
+        queue.mark_succeeded(run_id, user.athlete_id)
+    else:
+        queue.mark_failed(run_id, user.athlete_id, error=response["error"])
+
+
+def update_users(
+    users: Iterable[UserRow],
+    exe_type: ExeType,
+    dt: datetime.datetime,
+    concurrency_config: Optional[ConcurrencyConfig] = None,
+    run_id: Optional[str] = None,
+) -> List[dict]:
+    """
+    Run the update pipeline for each user, either one after another or fanned
+    out over a worker pool with bounded Strava, LLM and database stages. Errors
+    stay isolated per user via update_training_week_wrapper. Users may be
+    streamed, the pool starts on the first ones while the rest are produced.
+
+    :param users: UserRow objects
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :param concurrency_config: worker pool and stage limits, None runs sequentially
+    :param run_id: job queue run to record progress against, None skips tracking
+    :return: list of per-user responses
+    """
+
+    def update_user(user: UserRow) -> dict:
+        if run_id is None:
+            return update_training_week_wrapper(user, exe_type, dt)
+        return run_update_job(run_id, user, exe_type, dt)
+
+    if concurrency_config is None:
+        return [update_user(user) for user in users]
+
+    with concurrency.limits(concurrency_config), ThreadPoolExecutor(
+        max_workers=concurrency_config.max_workers
+    ) as pool:
+        return list(pool.map(concurrency.propagate(update_user), users))
+
+
+def summarize_run(
+    responses: List[dict],
+    exe_type: ExeType,
+    start_time: float,
+    run_id: str,
+    run_stages: metrics.Histogram,
+) -> dict:
+    """
+    Log and return throughput and per-stage timings for a batch of user updates
+
+    :param responses: list of per-user responses
+    :param exe_type: ExeType object
+    :param start_time: time.perf_counter() at the start of the run
+    :param run_id: identifier of the run
+    :param run_stages: stage timings of the run, from metrics.track_run
+    :return: dict
+    """
+    logger.info(
+        f"Run {run_id} stage timings: "
+        f"{metrics.summarize_stages(run_stages.snapshot())}"
+    )
+    elapsed_seconds = time.perf_counter() - start_time
+    n_failed = sum(1 for response in responses if not response["success"])
+    users_per_minute = len(responses) / (elapsed_seconds / 60) if responses else 0.0
+    logger.info(
+        f"Run {run_id}: updated {len(responses)} users ({exe_type}, {n_failed} failed) "
+        f"in {elapsed_seconds:.1f}s: {users_per_minute:.2f} users/min"
+    )
+    return {
+        "success": True,
+        "run_id": run_id,
+        "n_users": len(responses),
+        "n_failed": n_failed,
+        "elapsed_seconds": round(elapsed_seconds, 2),
+        "users_per_minute": round(users_per_minute, 2),
+    }
+
+
+async def update_users_async(
+    users: Iterable[UserRow],
+    exe_type: ExeType,
+    dt: datetime.datetime,
+    concurrency_config: Optional[ConcurrencyConfig] = None,
+    run_id: Optional[str] = None,
+) -> List[dict]:
+    """
+    Async variant of update_users on the current event loop: max_workers
+    workers pull users one at a time and their Strava, LLM and database
+    stages are bounded by the config's asyncio semaphores. Users may be
+    streamed by a blocking iterator (e.g. iter_run_users), it is advanced on
+    a worker thread and never more than max_workers users ahead.
+
+    :param users: UserRow objects
+    :param exe_type: ExeType object
+    :param dt: datetime injection, helpful for testing
+    :param concurrency_config: worker and stage limits, defaults to ConcurrencyConfig()
+    :param run_id: job queue run to record progress against, None skips tracking
+    :return: list of per-user responses, in completion order
+    """
+    if concurrency_config is None:
+        concurrency_config = ConcurrencyConfig()
+    users = iter(users)
+    # generators cannot be advanced from two threads at once
+    users_lock = asyncio.Lock()
+    responses = []
+
+    async def next_user() -> Optional[UserRow]:
+        async with users_lock:
+            return await asyncio.to_thread(next, users, None)
+
+    async def worker() -> None:
+        while (user := await next_user()) is not None:
+            if run_id is None:
+                response = await update_training_week_wrapper_async(user, exe_type, dt)
+            else:
+                response = await run_update_job_async(run_id, user, exe_type, dt)
+            responses.append(response)
+
+    with concurrency.limits(concurrency_config):
+        await asyncio.gather(*[worker() for _ in range(concurrency_config.max_workers)])
+    return responses
+
+
+def iter_run_users(
+    run_id: str,
+    exe_type: ExeType,
+    skip_athlete_ids: set[int],
+    shard_spec: Optional[ShardSpec] = None,
+) -> Iterator[UserRow]:
+    """
+    Stream the users a run still has to update, page by page: each page is
+    enqueued in the job queue and its users handed out before the next page
+    is fetched, so updates start while later pages are still loading
+
+    :param run_id: identifier of the run
+    :param exe_type: ExeType object
+    :param skip_athlete_ids: athletes left out of the run
+    :param shard_spec: only stream the users in this shard, None streams everyone
+    :return: iterator of UserRow objects
+    """
+    queue = job_queue.get_job_queue()
+    for page in supabase_client.iter_user_pages():
+        users = [user for user in page if user.athlete_id not in skip_athlete_ids]
+        if shard_spec is not None:
+            users = sharding.filter_shard(users, shard_spec)
+        if not users:
+            continue
+
+        # resume any earlier attempt at the run, skipping finished athletes
+        queue.enqueue(run_id, [user.athlete_id for user in users], exe_type)
+        resumable = queue.get_resumable_athlete_ids(run_id)
+        yield from (user for user in users if user.athlete_id in resumable)
+
+
+async def update_all_users_async(
+    concurrency_config: Optional[ConcurrencyConfig] = None,
+    shard_spec: Optional[ShardSpec] = None,
+) -> dict:
     """
     Evenings excluding Sunday: Send update to users who have not yet triggered an update today
     Sunday evening: Send new training week to all active users
 
+    Runs on the event loop through update_users_async, the blocking job queue
+    and user table reads go to worker threads.
+
+    :param concurrency_config: worker and stage limits, defaults to ConcurrencyConfig()
+    :param shard_spec: only update the users in this shard, None updates everyone
     :return: dict
     """
+    start_time = time.perf_counter()
     if utils.datetime_now_est().weekday() != 6:
-        for user in supabase_client.list_users():
-            if not supabase_client.has_user_updated_today(user.athlete_id):
-                update_training_week_wrapper(
-                    user, ExeType.MID_WEEK, dt=utils.datetime_now_est()
-                )
+        exe_type = ExeType.MID_WEEK
+        dt = utils.datetime_now_est()
+        skip_athlete_ids = await asyncio.to_thread(
+            supabase_client.list_athletes_updated_today
+        )
     else:
         # all users get a new training week on Sunday night
-        for user in supabase_client.list_users():
-            update_training_week_wrapper(
-                user, ExeType.NEW_WEEK, dt=utils.get_last_sunday()
-            )
-    return {"success": True}
+        exe_type = ExeType.NEW_WEEK
+        dt = utils.get_last_sunday()
+        skip_athlete_ids = set()
+
+    run_id = job_queue.get_run_id(exe_type, dt, shard_spec=shard_spec)
+    with metrics.track_run() as run_stages:
+        responses = await update_users_async(
+            users=iter_run_users(run_id, exe_type, skip_athlete_ids, shard_spec),
+            exe_type=exe_type,
+            dt=dt,
+            concurrency_config=concurrency_config,
+            run_id=run_id,
+        )
+    return summarize_run(responses, exe_type, start_time, run_id, run_stages)
+
+
+def get_failed_jobs(run_id: str, max_attempts: int) -> Tuple[ExeType, set[int]]:
+    """
+    Reset the failed jobs of a run that have attempts left to pending
+
+    :param run_id: identifier of the run
+    :param max_attempts: jobs that already used this many attempts are left failed
+    :return: exe_type of the run and the athlete_ids to retry
+    """
+    queue = job_queue.get_job_queue()
+    athlete_ids = set(queue.retry_failed(run_id, max_attempts=max_attempts))
+    jobs = queue.list_jobs(run_id)
+    if not jobs:
+        raise ValueError(f"Could not find job queue run {run_id=}")
+
+    # every job in a run shares the run's exe_type and date
+    return jobs[0].exe_type, athlete_ids
+
+
+async def retry_failed_users_async(
+    run_id: str,
+    max_attempts: int = 3,
+    concurrency_config: Optional[ConcurrencyConfig] = None,
+) -> dict:
+    """
+    Rerun only the failed jobs of a previous run, against the current week
+
+    :param run_id: identifier of the run
+    :param max_attempts: jobs that already used this many attempts are left failed
+    :param concurrency_config: worker and stage limits, defaults to ConcurrencyConfig()
+    :return: dict
+    """
+    start_time = time.perf_counter()
+    exe_type, athlete_ids = await asyncio.to_thread(
+        get_failed_jobs, run_id, max_attempts
+    )
+    if exe_type == ExeType.NEW_WEEK:
+        dt = utils.get_last_sunday()
+    else:
+        dt = utils.datetime_now_est()
+
+    users = (
+        user for user in supabase_client.iter_users() if user.athlete_id in athlete_ids
+    )
+    with metrics.track_run() as run_stages:
+        responses = await update_users_async(
+            users=users,
+            exe_type=exe_type,
+            dt=dt,
+            concurrency_config=concurrency_config,
+            run_id=run_id,
+        )
+    return summarize_run(responses, exe_type, start_time, run_id, run_stages)
@@ -1,6 +1,9 @@
 import datetime
+import hashlib
+from typing import Any
 from zoneinfo import ZoneInfo
 
+import orjson
 from pydantic import BaseModel
 
 
@@ -30,3 +33,21 @@ def get_last_sunday() -> datetime.datetime:
     today = datetime_now_est().today()
     days_since_sunday = (today.weekday() + 1) % 7
     return today - datetime.timedelta(days=days_since_sunday)
+
+
+def get_fingerprint(*objects: Any) -> str:
+    """
+    Stable sha256 hex digest over pydantic models, objects exposing a dict()
+    representation (e.g. DailyActivity) and json-serializable objects
+
+    :param objects: values to fingerprint, order matters
+    :return: hex digest
+    """
+    payload = orjson.dumps(
+        objects,
+        default=lambda obj: obj.dict() if hasattr(obj, "dict") else str(obj),
+        option=orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY,
+    )
+    return hashlib.sha256(payload).hexdigest()
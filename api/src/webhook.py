@@ -1,31 +1,84 @@
-from src import auth_manager, supabase_client, utils
+from src import activities, activity_store, auth_manager, supabase_client, utils
 from src.types.update_pipeline import ExeType
+from src.types.user import UserRow
 from src.types.webhook import StravaEvent
 from src.update_pipeline import update_training_week_wrapper
 
+# update event fields our metrics depend on, title & privacy changes are ignored
+SPORT_TYPE_UPDATES = {"type", "sport_type"}
+
+
+def update_training_week(user: UserRow) -> dict:
+    """
+    Regenerate the user's training week after their stored activities changed
+
+    :param user: UserRow object
+    :return: Success status and error message if any
+    """
+    return update_training_week_wrapper(
+        user=user,
+        exe_type=ExeType.MID_WEEK,
+        dt=utils.datetime_now_est(),
+    )
+
 
 def handle_activity_create(event: StravaEvent) -> dict:
     """
-    Handle the creation of a Strava activity
+    Handle the creation of a Strava activity: ingest the single run into the
+    athlete's activity store, updating its day's totals in place
 
     :param event: Strava webhook event
     """
     user = supabase_client.get_user(event.owner_id)
     strava_client = auth_manager.get_strava_client(user.athlete_id)
-    activity = strava_client.get_activity(event.object_id)
-
-    if activity.sport_type == "Run":
-        return update_training_week_wrapper(
-            user=user,
-            exe_type=ExeType.MID_WEEK,
-            dt=utils.datetime_now_est(),
-        )
+    run = activities.fetch_run(strava_client, event.object_id)
+
+    if run is not None:
+        activity_store.get_activity_store().upsert_activities(user.athlete_id, [run])
+        return update_training_week(user)
     return {
         "success": False,
-        "error": f"Unsupported activity type: {activity.sport_type}",
+        "error": f"Unsupported activity type for activity {event.object_id}",
     }
 
 
+def handle_activity_update(event: StravaEvent) -> dict:
+    """
+    Handle the update of a Strava activity. Only a sport type change affects
+    the store: the activity is ingested when it became a run and dropped when
+    it no longer is one. The training week is regenerated either way, the
+    store may have missed the activity (update_training_week_wrapper skips
+    the run when its inputs did not change).
+
+    :param event: Strava webhook event
+    """
+    if not SPORT_TYPE_UPDATES & event.updates.keys():
+        return {"success": True, "skipped": True}
+
+    user = supabase_client.get_user(event.owner_id)
+    strava_client = auth_manager.get_strava_client(user.athlete_id)
+    run = activities.fetch_run(strava_client, event.object_id)
+
+    store = activity_store.get_activity_store()
+    if run is not None:
+        store.upsert_activities(user.athlete_id, [run])
+    else:
+        store.delete_activity(user.athlete_id, event.object_id)
+    return update_training_week(user)
+
+
+def handle_activity_delete(event: StravaEvent) -> dict:
+    """
+    Handle the deletion of a Strava activity, dropping it from the store. The
+    training week is regenerated even when the store did not have it, as a
+    week generated before the activity was missed may still count it.
+
+    :param event: Strava webhook event
+    """
+    activity_store.get_activity_store().delete_activity(event.owner_id, event.object_id)
+    return update_training_week(supabase_client.get_user(event.owner_id))
+
+
 def maybe_process_strava_event(event: StravaEvent) -> dict:
     """
     Process the Strava webhook event. Perform any updates based on the event data.
@@ -35,8 +88,18 @@ def maybe_process_strava_event(event: StravaEvent) -> dict:
     :param event: Strava webhook event
     :return: Success status and error message if any
     """
+    if event.object_type != "activity":
+        return {
+            "success": False,
+            "error": f"Unsupported object type: {event.object_type}",
+        }
+
     if event.aspect_type == "create":
         return handle_activity_create(event)
+    elif event.aspect_type == "update":
+        return handle_activity_update(event)
+    elif event.aspect_type == "delete":
+        return handle_activity_delete(event)
     else:
         return {
             "success": False,
@@ -0,0 +1,66 @@
+import asyncio
+import datetime
+import random
+import threading
+import time
+
+from src.types.activity import Activity
+
+
+def get_random_activities(n_weeks: int, seed: int) -> list[Activity]:
+    """Runs on random days, some doubled up, with a few zero-distance entries"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2023, 1, 4, 6, 30)
+    activities = []
+    for day in range(n_weeks * 7):
+        for _ in range(rng.choice([0, 0, 1, 1, 1, 2])):
+            start_date = start + datetime.timedelta(days=day, hours=rng.random() * 12)
+            activities.append(
+                Activity(
+                    id=rng.randrange(10**9),
+                    distance=rng.choice([0.0, rng.uniform(800, 42195)]),
+                    total_elevation_gain=rng.uniform(0, 500),
+                    moving_time=datetime.timedelta(seconds=rng.uniform(300, 14400)),
+                    start_date=start_date,
+                    start_date_local=start_date,
+                )
+            )
+    return activities
+
+
+def user_rows(athlete_ids):
+    return [
+        {"athlete_id": athlete_id, "user_id": "user", "preferences": None}
+        for athlete_id in athlete_ids
+    ]
+
+
+class Tracker:
+    """Peak number of callers inside a block at the same time"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __call__(self, *args) -> None:
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(0.02)
+        with self.lock:
+            self.current -= 1
+
+
+class AsyncTracker:
+    """Peak number of coroutines inside a block at the same time"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    async def __call__(self, *args) -> None:
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        await asyncio.sleep(0.01)
+        self.current -= 1
@@ -0,0 +1,202 @@
+import datetime
+from typing import Dict, List, Optional, Union
+
+
+class StubResponse:
+    def __init__(self, data: List[dict]):
+        self.data = data
+
+
+_last_created_at = datetime.datetime.min
+
+
+def get_created_at() -> str:
+    """Strictly increasing default for created_at, like now() across requests"""
+    global _last_created_at
+    _last_created_at = max(
+        datetime.datetime.now(), _last_created_at + datetime.timedelta(microseconds=1)
+    )
+    return _last_created_at.isoformat()
+
+
+async def _resolved(response: StubResponse) -> StubResponse:
+    return response
+
+
+class StubQuery:
+    """
+    The subset of postgrest's request builder supabase_client uses, run over
+    in-memory rows. Like PostgREST, a select returns at most max_rows rows
+    whatever the limit.
+    """
+
+    def __init__(
+        self,
+        table: "StubTable",
+        columns: str = "*",
+        values: Optional[dict] = None,
+        delete: bool = False,
+        returning: str = "representation",
+    ):
+        self.table = table
+        self.columns = [column.strip() for column in columns.split(",")]
+        self.values = values
+        self.delete = delete
+        self.returning = returning
+        self.filters = []
+        self.order_by: List[tuple] = []
+        self.row_offset = 0
+        self.row_limit: Optional[int] = None
+
+    def eq(self, column: str, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def gt(self, column: str, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def lt(self, column: str, value):
+        self.filters.append(lambda row: row[column] < value)
+        return self
+
+    def gte(self, column: str, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def lte(self, column: str, value):
+        self.filters.append(lambda row: row[column] <= value)
+        return self
+
+    def in_(self, column: str, values: list):
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int):
+        self.row_offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def execute(self) -> StubResponse:
+        return self.table.respond(self._execute())
+
+    def _execute(self) -> StubResponse:
+        rows = [row for row in self.table.rows if all(f(row) for f in self.filters)]
+        if self.delete:
+            deleted = {id(row) for row in rows}
+            self.table.rows[:] = [
+                row for row in self.table.rows if id(row) not in deleted
+            ]
+        elif self.values is not None:
+            for row in rows:
+                row.update(self.values)
+        if self.delete or self.values is not None:
+            if self.returning == "minimal":
+                return StubResponse([])
+            return StubResponse([dict(row) for row in rows])
+        # stable sorts, last key first
+        for column, desc in reversed(self.order_by):
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        row_limit = min(self.row_limit or self.table.max_rows, self.table.max_rows)
+        rows = rows[self.row_offset : self.row_offset + row_limit]
+        if self.columns != ["*"]:
+            rows = [{column: row[column] for column in self.columns} for row in rows]
+        return StubResponse([dict(row) for row in rows])
+
+
+class StubWrite:
+    """Insert or upsert, applied once executed"""
+
+    def __init__(self, table: "StubTable", rows: List[dict], apply):
+        self.table = table
+        self.rows = rows
+        self.apply = apply
+
+    def execute(self) -> StubResponse:
+        for row in self.rows:
+            self.apply({"created_at": get_created_at(), **row})
+        return self.table.respond(StubResponse([]))
+
+
+class StubTable:
+    def __init__(self, rows: List[dict], max_rows: int, asynchronous: bool = False):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.asynchronous = asynchronous
+        self.requests = 0
+
+    def respond(self, response: StubResponse):
+        """Count the request, the async client's execute is awaited"""
+        self.requests += 1
+        return _resolved(response) if self.asynchronous else response
+
+    def select(self, columns: str = "*", **kwargs) -> StubQuery:
+        return StubQuery(self, columns)
+
+    def update(
+        self, values: dict, returning: str = "representation", **kwargs
+    ) -> StubQuery:
+        return StubQuery(self, values=values, returning=returning)
+
+    def delete(self, returning: str = "representation", **kwargs) -> StubQuery:
+        return StubQuery(self, delete=True, returning=returning)
+
+    def insert(self, rows: Union[dict, List[dict]], **kwargs) -> StubWrite:
+        rows = rows if isinstance(rows, list) else [rows]
+        return StubWrite(self, rows, self.rows.append)
+
+    def upsert(
+        self,
+        rows: Union[dict, List[dict]],
+        on_conflict: str = "",
+        ignore_duplicates: bool = False,
+        **kwargs,
+    ) -> StubWrite:
+        rows = rows if isinstance(rows, list) else [rows]
+        keys = [key.strip() for key in on_conflict.split(",")]
+
+        def apply(row: dict) -> None:
+            for existing in self.rows if on_conflict else []:
+                if all(existing[key] == row[key] for key in keys):
+                    if not ignore_duplicates:
+                        existing.update(row)
+                    return
+            self.rows.append(row)
+
+        return StubWrite(self, rows, apply)
+
+
+class StubClient:
+    """
+    Stand-in for a supabase Client over in-memory tables, or for an AsyncClient
+    when asynchronous
+    """
+
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[dict]]] = None,
+        max_rows: int = 1000,
+        asynchronous: bool = False,
+    ):
+        self.rows = tables if tables is not None else {}
+        self.max_rows = max_rows
+        self.asynchronous = asynchronous
+        self.tables: Dict[str, StubTable] = {}
+
+    def table(self, name: str) -> StubTable:
+        if name not in self.tables:
+            rows = self.rows.setdefault(name, [])
+            self.tables[name] = StubTable(rows, self.max_rows, self.asynchronous)
+        return self.tables[name]
+
+    def as_async(self) -> "StubClient":
+        """AsyncClient stand-in over the same rows"""
+        return StubClient(self.rows, self.max_rows, asynchronous=True)
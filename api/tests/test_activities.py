@@ -0,0 +1,21 @@
+import datetime
+
+from src.activities import (
+    add_missing_dates,
+    aggregate_daily_metrics,
+    aggregate_daily_metrics_vectorized,
+)
+from tests.helpers import get_random_activities
+
+
+def test_vectorized_aggregation_matches_exactly():
+    for seed in range(5):
+        activities = get_random_activities(n_weeks=104, seed=seed)
+        start_date = datetime.datetime(2023, 1, 1)
+        end_date = datetime.datetime(2025, 1, 1)
+        with_rest_days = add_missing_dates(activities, start_date, end_date)
+
+        for inputs in (activities, with_rest_days):
+            expected = aggregate_daily_metrics(inputs)
+            actual = aggregate_daily_metrics_vectorized(inputs)
+            assert [m.dict() for m in actual] == [m.dict() for m in expected]
@@ -0,0 +1,324 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from src import activities, activity_store, auth_manager, utils, webhook
+from src.activity_store import SQLiteActivityStore, SupabaseActivityStore
+from src.main import app
+from src.types.activity import WeekSummary
+from src.types.user import UserRow
+from src.types.webhook import StravaEvent
+from tests.helpers import get_random_activities
+from tests.supabase_stub import StubClient
+
+UTC = datetime.timezone.utc
+NOW = datetime.datetime(2024, 11, 15, 12, tzinfo=UTC)
+DAY = datetime.timedelta(days=1)
+
+
+class FakeStravaClient:
+    """
+    Serves a run every other day, with a ride every fourth day, as raw
+    Strava pages and records the windows requested
+    """
+
+    def __init__(self):
+        self.protocol = self
+        self.requests = []
+        self.n_pages = 0
+
+    def get(self, url, after, before, page, per_page):
+        if page == 1:
+            self.requests.append(
+                (
+                    datetime.datetime.fromtimestamp(after, UTC),
+                    datetime.datetime.fromtimestamp(before, UTC),
+                )
+            )
+        self.n_pages += 1
+
+        raw_activities = []
+        day = NOW
+        while day >= NOW - datetime.timedelta(weeks=60):
+            if after < day.timestamp() < before:
+                raw_activities.append(
+                    {
+                        "id": int(day.timestamp()),
+                        "sport_type": "Ride" if day.day % 4 == 0 else "Run",
+                        "distance": 5000.0,
+                        "total_elevation_gain": 12.5,
+                        "moving_time": 1500,
+                        "start_date": day.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "start_date_local": day.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    }
+                )
+            day -= datetime.timedelta(days=2)
+        return raw_activities[(page - 1) * per_page : page * per_page]
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        store = SQLiteActivityStore(str(tmp_path / "activities.db"))
+    else:
+        # small pages so reads span several of them
+        store = SupabaseActivityStore(StubClient(max_rows=50))
+        monkeypatch.setattr(store, "page_size", 40)
+    monkeypatch.setattr(activity_store, "_activity_store", store)
+    return store
+
+
+def test_incremental_sync_fetches_only_new_ranges(store):
+    client = FakeStravaClient()
+    start = NOW - datetime.timedelta(weeks=8)
+    first = activities.sync_activities(client, 1, start_date=start, end_date=NOW)
+    assert client.requests == [(start, NOW)]
+
+    # within the synced range: served from the store alone
+    client.requests.clear()
+    earlier = NOW - datetime.timedelta(days=3)
+    assert activities.sync_activities(
+        client, 1, start_date=start, end_date=earlier
+    ) == [a for a in first if a.start_date <= earlier]
+    assert client.requests == []
+
+    # later end & earlier start: only the uncovered edges are fetched
+    later = NOW + datetime.timedelta(days=1)
+    backfill_start = start - datetime.timedelta(weeks=1)
+    synced = activities.sync_activities(
+        client, 1, start_date=backfill_start, end_date=later
+    )
+    assert [before for _, before in client.requests] == [start, later]
+    assert client.requests[1][0] == NOW - activities.SYNC_OVERLAP
+    assert len(synced) == len({a.id for a in synced}) > len(first)
+
+
+def test_full_resync_replaces_stored_activities(store):
+    client = FakeStravaClient()
+    start = NOW - datetime.timedelta(weeks=2)
+    activities.sync_activities(client, 1, start_date=start, end_date=NOW)
+    stale = activities.Activity(id=1, start_date=NOW, start_date_local=NOW)
+    store.upsert_activities(1, [stale])
+
+    synced = activities.sync_activities(
+        client, 1, start_date=start, end_date=NOW, full_resync=True
+    )
+    assert stale not in synced
+    assert len(client.requests) == 2
+    assert store.get_synced_range(2) is None
+
+
+def test_periodic_reconcile_refetches_the_synced_range(store):
+    """
+    Edits whose webhook event was missed are picked up once the athlete is
+    due a reconcile, which refetches the whole range synced so far
+    """
+    client = FakeStravaClient()
+    start = NOW - datetime.timedelta(weeks=8)
+    activities.sync_activities(client, 1, start_date=start, end_date=NOW)
+    # deleted on Strava, the webhook event was missed
+    missed = activities.Activity(id=1, start_date=start + DAY, start_date_local=start)
+    store.upsert_activities(1, [missed])
+
+    client.requests.clear()
+    assert missed in activities.sync_activities(
+        client, 1, start_date=start, end_date=NOW
+    )
+    assert client.requests == []
+
+    store.set_synced_range(
+        1,
+        *store.get_synced_range(1),
+        reconciled_at=(
+            NOW - activities.RECONCILE_INTERVAL - datetime.timedelta(hours=1)
+        ).timestamp(),
+    )
+    client.requests.clear()
+    recent = NOW - datetime.timedelta(weeks=1)
+    synced = activities.sync_activities(client, 1, start_date=recent, end_date=NOW)
+    assert client.requests == [(start, NOW)]
+    assert missed not in store.list_activities(1, after=start, before=NOW)
+    assert synced == store.list_activities(1, after=recent, before=NOW)
+
+
+def test_iter_runs_pages_lazily_and_drops_other_sports():
+    client = FakeStravaClient()
+    runs = activities.iter_runs(
+        client, after=NOW - datetime.timedelta(weeks=4), before=NOW, page_size=5
+    )
+    first_run = next(runs)
+    assert client.n_pages == 1
+    assert first_run.moving_time == datetime.timedelta(seconds=1500)
+    assert first_run.start_date_local.tzinfo is None
+
+    all_runs = [first_run, *runs]
+    assert client.n_pages == 3
+    assert len(all_runs) == len({a.id for a in all_runs}) == 10
+
+
+def test_daily_totals_follow_every_write(store):
+    day = datetime.datetime(2024, 11, 12, 7)
+    morning = activities.Activity(
+        id=1,
+        distance=5000.0,
+        moving_time=datetime.timedelta(minutes=25),
+        start_date=day.replace(tzinfo=UTC),
+        start_date_local=day,
+    )
+    evening = morning.copy(
+        update={
+            "id": 2,
+            "start_date": morning.start_date + datetime.timedelta(hours=10),
+            "start_date_local": day + datetime.timedelta(hours=10),
+        }
+    )
+    store.upsert_activities(1, [morning, evening])
+    (totals,) = store.list_daily_totals(1, day.date(), day.date())
+    assert (totals.distance, totals.activity_count) == (10000.0, 2)
+
+    # moving a run to another day refreshes both days
+    next_day = day + datetime.timedelta(days=1)
+    moved = evening.copy(
+        update={
+            "start_date": next_day.replace(tzinfo=UTC),
+            "start_date_local": next_day,
+        }
+    )
+    store.upsert_activities(1, [moved])
+    assert [
+        (totals.date, totals.activity_count)
+        for totals in store.list_daily_totals(1, day.date(), next_day.date())
+    ] == [(day.date(), 1), (next_day.date(), 1)]
+
+    assert store.delete_activity(1, 1)
+    assert not store.delete_activity(1, 1)
+    assert [
+        totals.date for totals in store.list_daily_totals(1, day.date(), day.date())
+    ] == []
+
+
+def test_store_daily_totals_match_aggregating_activities(store):
+    client = FakeStravaClient()
+    start = NOW - datetime.timedelta(weeks=8)
+    daily_activity = activities.get_daily_activity(
+        client, dt=NOW, num_weeks=8, athlete_id=1
+    )
+    expected = activities.aggregate_daily_activity(
+        store.list_activities(1, after=start, before=NOW),
+        start_date=start,
+        end_date=NOW,
+    )
+    assert daily_activity == expected
+
+
+def test_stored_weekly_summaries_match_daily_activity(store):
+    client = FakeStravaClient()
+    daily_activity = activities.get_daily_activity(
+        client, dt=NOW, num_weeks=8, athlete_id=1
+    )
+    stored_summaries = activities.get_stored_weekly_summaries(
+        1, start_date=daily_activity.first_date, end_date=daily_activity.last_date
+    )
+    assert stored_summaries == daily_activity.get_weekly_summaries()
+
+    # a single write updates its week bucket in place
+    (first_run, *_) = store.list_activities(1, after=NOW - 10 * DAY, before=NOW)
+    store.delete_activity(1, first_run.id)
+    daily_activity = activities.get_daily_activity(
+        client, dt=NOW, num_weeks=8, athlete_id=1
+    )
+    assert (
+        activities.get_stored_weekly_summaries(
+            1, start_date=daily_activity.first_date, end_date=daily_activity.last_date
+        )
+        == daily_activity.get_weekly_summaries()
+    )
+
+
+def test_store_aggregates_match_exactly_on_random_activities(store):
+    end_date = datetime.datetime(2024, 12, 29, 23)
+    start_date = end_date - datetime.timedelta(weeks=104)
+    for seed in range(3):
+        store.clear(1)
+        store.upsert_activities(1, get_random_activities(n_weeks=104, seed=seed))
+        store.set_synced_range(
+            1,
+            activity_store.to_timestamp(start_date),
+            activity_store.to_timestamp(end_date),
+        )
+
+        daily_activity = activities.get_daily_activity(
+            None, dt=end_date, num_weeks=104, athlete_id=1
+        )
+        expected = activities.aggregate_daily_activity(
+            store.list_activities(1, after=start_date, before=end_date),
+            start_date=start_date,
+            end_date=end_date,
+        )
+        assert daily_activity == expected
+        assert (
+            activities.get_stored_weekly_summaries(
+                1, start_date=expected.first_date, end_date=expected.last_date
+            )
+            == expected.get_weekly_summaries()
+        )
+
+
+def test_weekly_summaries_include_activities_since_the_last_sync(store, monkeypatch):
+    client = FakeStravaClient()
+    last_week = NOW - datetime.timedelta(weeks=1)
+    activities.sync_activities(
+        client,
+        1,
+        start_date=last_week - datetime.timedelta(weeks=8),
+        end_date=last_week,
+    )
+    monkeypatch.setattr(auth_manager, "get_strava_client", lambda athlete_id: client)
+    monkeypatch.setattr(utils, "datetime_now_est", lambda: NOW)
+    app.dependency_overrides[auth_manager.validate_user] = lambda: UserRow(athlete_id=1)
+    try:
+        response = TestClient(app).get("/weekly-summaries/")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert client.requests[-1] == (last_week - activities.SYNC_OVERLAP, NOW)
+    [latest] = [
+        WeekSummary.parse_raw(summary)
+        for summary in response.json()["weekly_summaries"]
+    ][-1:]
+    # the current week, only stored once the endpoint synced past last week
+    assert latest.week_start_date == NOW.date() - NOW.weekday() * DAY
+    assert latest.total_distance > 0
+
+
+@pytest.mark.parametrize(
+    "aspect_type, updates",
+    [("delete", {}), ("update", {"type": "Ride"})],
+)
+def test_webhook_updates_the_week_of_activities_missing_from_the_store(
+    store, monkeypatch, aspect_type, updates
+):
+    """
+    An activity the store never had can still be counted by the athlete's
+    training week, so its removal always regenerates it
+    """
+    user = UserRow(athlete_id=1)
+    updated = []
+    monkeypatch.setattr(webhook.supabase_client, "get_user", lambda athlete_id: user)
+    monkeypatch.setattr(auth_manager, "get_strava_client", lambda athlete_id: None)
+    monkeypatch.setattr(activities, "fetch_run", lambda client, activity_id: None)
+    monkeypatch.setattr(
+        webhook, "update_training_week", lambda user: updated.append(user) or {}
+    )
+
+    event = StravaEvent(
+        subscription_id=1,
+        aspect_type=aspect_type,
+        object_type="activity",
+        object_id=1,
+        owner_id=1,
+        event_time=0,
+        updates=updates,
+    )
+    webhook.maybe_process_strava_event(event)
+    assert updated == [user]
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src import concurrency
+from src.types.update_pipeline import ConcurrencyConfig, Stage
+from tests.helpers import AsyncTracker, Tracker
+
+
+def test_stage_limit_caps_worker_threads():
+    """Workers started through propagate share the run's stage semaphores"""
+    tracker = Tracker()
+
+    @concurrency.limited(Stage.LLM)
+    def call_llm(_):
+        tracker()
+
+    with concurrency.limits(ConcurrencyConfig(llm=2)):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(concurrency.propagate(call_llm), range(16)))
+
+    assert tracker.peak <= 2
+
+
+def test_unbounded_outside_limits():
+    """Without limits in the context, stages are not capped"""
+    tracker = Tracker()
+
+    @concurrency.limited(Stage.DB)
+    def query(_):
+        tracker()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(query, range(4)))
+
+    # more than one caller at a time, how many depends on thread scheduling
+    assert tracker.peak > 1
+
+
+def test_overlapping_runs_keep_their_own_limits():
+    """A run ending mid-way through another leaves the other's limits in place"""
+    tracker = Tracker()
+    first_run_started = threading.Event()
+
+    @concurrency.limited(Stage.DB)
+    def query(_):
+        tracker()
+
+    def long_run():
+        with concurrency.limits(ConcurrencyConfig(db=1)):
+            first_run_started.set()
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(concurrency.propagate(query), range(12)))
+
+    def short_run():
+        first_run_started.wait()
+        with concurrency.limits(ConcurrencyConfig(db=8)):
+            pass
+
+    threads = [threading.Thread(target=long_run), threading.Thread(target=short_run)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tracker.peak <= 1
+
+
+def test_stage_limit_caps_coroutines():
+    """Coroutine functions wait on the run's asyncio semaphores"""
+    tracker = AsyncTracker()
+
+    @concurrency.limited(Stage.DB)
+    async def query(_):
+        await tracker()
+
+    async def run():
+        with concurrency.limits(ConcurrencyConfig(db=3)):
+            await asyncio.gather(*[query(i) for i in range(12)])
+
+    asyncio.run(run())
+    assert tracker.peak <= 3
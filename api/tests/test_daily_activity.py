@@ -0,0 +1,82 @@
+import datetime
+
+from src.activities import (
+    add_missing_dates,
+    aggregate_daily_activity,
+    aggregate_daily_metrics,
+    get_weekly_summaries,
+    slice_daily_activity,
+)
+from src.daily_activity import DailyActivity
+from tests.helpers import get_random_activities
+
+ACTIVITIES = get_random_activities(n_weeks=60, seed=7)
+
+
+def get_daily_activity(dt: datetime.datetime, num_weeks: int):
+    """Both representations of what get_daily_activity aggregates"""
+    start_date = dt - datetime.timedelta(weeks=num_weeks)
+    with_rest_days = add_missing_dates(
+        [a for a in ACTIVITIES if start_date <= a.start_date_local <= dt],
+        start_date=start_date,
+        end_date=dt,
+    )
+    return (
+        aggregate_daily_activity(with_rest_days),
+        aggregate_daily_metrics(with_rest_days),
+    )
+
+
+def test_materializes_the_same_daily_metrics():
+    daily_activity, daily_metrics = get_daily_activity(
+        datetime.datetime(2024, 2, 14, 20), num_weeks=52
+    )
+    assert daily_activity.to_daily_metrics() == daily_metrics
+    assert daily_activity[-14:].to_daily_metrics() == daily_metrics[-14:]
+    assert daily_activity[-1] == daily_metrics[-1]
+    assert DailyActivity.from_daily_metrics(daily_metrics) == daily_activity
+
+
+def test_views_match_list_computations():
+    daily_activity, daily_metrics = get_daily_activity(
+        datetime.datetime(2024, 2, 14, 20), num_weeks=52
+    )
+    assert get_weekly_summaries(daily_metrics=daily_activity) == get_weekly_summaries(
+        daily_metrics=daily_metrics
+    )
+    assert get_weekly_summaries(
+        daily_metrics=daily_activity[-17:]
+    ) == get_weekly_summaries(daily_metrics=daily_metrics[-17:])
+
+    activity = daily_metrics[-3]
+    assert daily_activity.between(
+        activity.date - datetime.timedelta(days=6),
+        activity.date - datetime.timedelta(days=1),
+    ).to_daily_metrics() == [
+        a
+        for a in daily_metrics
+        if activity.date - datetime.timedelta(days=7) < a.date < activity.date
+    ]
+
+
+def test_slice_matches_a_separate_fetch():
+    now = datetime.datetime(2024, 2, 14, 20)
+    last_sunday = datetime.datetime(2024, 2, 11, 20)
+    daily_activity, _ = get_daily_activity(now, num_weeks=53)
+    for dt in (now, last_sunday):
+        expected, _ = get_daily_activity(dt, num_weeks=52)
+        assert slice_daily_activity(daily_activity, dt=dt, num_weeks=52) == expected
+
+
+def test_calendar_indexing_matches_placeholder_gap_filling():
+    start_date = datetime.datetime(2023, 3, 1, 20)
+    for end_date in (datetime.datetime(2024, 2, 14, 20), start_date):
+        in_range = [
+            a for a in ACTIVITIES if start_date <= a.start_date_local <= end_date
+        ]
+        for activities in (in_range, []):
+            assert aggregate_daily_activity(
+                activities, start_date=start_date, end_date=end_date
+            ) == aggregate_daily_activity(
+                add_missing_dates(activities, start_date, end_date)
+            )
@@ -0,0 +1,124 @@
+import datetime
+
+import pytest
+from src import activities, activity_store, feature_store
+from src.activity_store import SQLiteActivityStore, SupabaseActivityStore
+from src.feature_store import SQLiteFeatureStore, SupabaseFeatureStore
+from tests.helpers import get_random_activities
+from tests.supabase_stub import StubClient
+
+WEEK_START_DATE = datetime.date(2024, 12, 30)
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def stores(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        activities_db = SQLiteActivityStore(str(tmp_path / "activities.db"))
+        features_db = SQLiteFeatureStore(str(tmp_path / "features.db"))
+    else:
+        client = StubClient()
+        activities_db = SupabaseActivityStore(client)
+        features_db = SupabaseFeatureStore(client)
+    monkeypatch.setattr(activity_store, "_activity_store", activities_db)
+    monkeypatch.setattr(feature_store, "_feature_store", features_db)
+    activities_db.upsert_activities(1, get_random_activities(n_weeks=104, seed=0))
+    return activities_db, features_db
+
+
+def test_features_match_the_weekly_summaries(stores):
+    activities_db, _ = stores
+    end_date = datetime.datetime(2024, 12, 29, 20)
+    activities_db.set_synced_range(1, 0, activity_store.to_timestamp(end_date))
+    daily_activity = activities.get_daily_activity(
+        None, dt=end_date, num_weeks=52, athlete_id=1
+    )
+
+    features = feature_store.get_athlete_features(1, WEEK_START_DATE)
+    weekly_summaries = daily_activity.get_weekly_summaries()
+    assert features.weekly_summaries == weekly_summaries
+    assert features.last_16_weeks_mileage_stats.max_weekly_mileage == max(
+        summary.total_distance for summary in weekly_summaries[-16:]
+    )
+    assert features.training_load.acute_load == pytest.approx(
+        weekly_summaries[-1].total_distance
+    )
+
+
+def test_features_are_refreshed_when_activities_change(stores, monkeypatch):
+    activities_db, features_db = stores
+    features = feature_store.get_athlete_features(1, WEEK_START_DATE)
+    assert features_db.get_features(1, WEEK_START_DATE) == features
+
+    computed = []
+    compute_athlete_features = feature_store.compute_athlete_features
+    monkeypatch.setattr(
+        feature_store,
+        "compute_athlete_features",
+        lambda *args: computed.append(args) or compute_athlete_features(*args),
+    )
+    assert feature_store.get_athlete_features(1, WEEK_START_DATE) == features
+    assert computed == []
+
+    # re-syncing the same activities leaves the features as they are
+    last_run = activities_db.list_activities(
+        1,
+        after=datetime.datetime(2024, 12, 16),
+        before=datetime.datetime(2024, 12, 29),
+    )[-1]
+    activities_db.upsert_activities(1, [last_run])
+    feature_store.get_athlete_features(1, WEEK_START_DATE)
+    assert computed == []
+
+    activities_db.delete_activity(1, last_run.id)
+    refreshed = feature_store.get_athlete_features(1, WEEK_START_DATE)
+    assert len(computed) == 1
+    assert (
+        refreshed.weekly_summaries[-1].total_distance
+        < features.weekly_summaries[-1].total_distance
+    )
+
+
+@pytest.mark.parametrize("stores", ["sqlite"], indirect=True)
+def test_features_are_refreshed_when_the_activity_store_is_recreated(
+    stores, tmp_path, monkeypatch
+):
+    """A rebuilt store restarts its revisions, features of the old one are not served"""
+    activities_db, _ = stores
+    features = feature_store.get_athlete_features(1, WEEK_START_DATE)
+
+    # e.g. a schema change dropped the store, the resync lands on the same revision
+    rebuilt = SQLiteActivityStore(str(tmp_path / "rebuilt.db"))
+    rebuilt.upsert_activities(1, get_random_activities(n_weeks=52, seed=1))
+    monkeypatch.setattr(activity_store, "_activity_store", rebuilt)
+    assert rebuilt.get_revision(1) == activities_db.get_revision(1)
+    assert rebuilt.get_generation() != activities_db.get_generation()
+
+    refreshed = feature_store.get_athlete_features(1, WEEK_START_DATE)
+    assert refreshed.generation == rebuilt.get_generation()
+    assert refreshed.weekly_summaries != features.weekly_summaries
+
+
+def test_generation_survives_reopening(tmp_path):
+    path = str(tmp_path / "activities.db")
+    assert (
+        SQLiteActivityStore(path).get_generation()
+        == SQLiteActivityStore(path).get_generation()
+    )
+
+
+def test_generation_is_shared_by_every_replica():
+    client = StubClient()
+    generation = SupabaseActivityStore(client).get_generation()
+    assert SupabaseActivityStore(client).get_generation() == generation
+    assert SupabaseActivityStore(StubClient()).get_generation() != generation
+
+
+def test_mileage_stats_format():
+    assert str(feature_store.get_mileage_stats([10.0, 20.5, 30.25, 0.0])) == (
+        "Total miles: 60.8\n"
+        "Avg Miles per week: 15.2\n"
+        "Median weekly mileage: 15.2\n"
+        "75%ile of weekly mileage: 22.9\n"
+        "90%ile of weekly mileage: 27.3\n"
+        "Max weekly mileage: 30.25\n"
+    )
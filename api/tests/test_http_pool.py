@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from src import http_pool, metrics
+from src.types.http_pool import HttpPoolConfig
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # drain the request body so the kept-alive connection stays in sync
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_get_config_reads_env(monkeypatch):
+    """Fields are overridden by prefixed environment variables"""
+    monkeypatch.setenv("TEST_HTTP_MAX_CONNECTIONS", "4")
+    monkeypatch.setenv("TEST_HTTP_HTTP2", "false")
+    config = http_pool.get_config("TEST_HTTP_")
+    assert config.max_connections == 4
+    assert config.http2 is False
+    assert config.read_timeout == HttpPoolConfig().read_timeout
+
+
+def test_connections_are_kept_alive(base_url):
+    """Sequential requests, even from different clients, reuse one connection"""
+    transport = http_pool.PooledTransport("test", HttpPoolConfig())
+    for _ in range(3):
+        client = httpx.Client(base_url=base_url, transport=transport)
+        assert client.get("/").json() == []
+
+    assert transport.get_stats() == {
+        "active_connections": 0,
+        "idle_connections": 1,
+        "requests_in_flight": 0,
+    }
+    assert metrics.http_pool_connections.get("test", "idle") == 1
+    assert 'http_pool_max_connections{pool="test"} 20' in metrics.render()
+
+
+def test_in_flight_until_response_closed(base_url):
+    """A streamed response holds its request in flight until it is closed"""
+    transport = http_pool.PooledTransport("test_stream", HttpPoolConfig())
+    client = httpx.Client(base_url=base_url, transport=transport)
+    with client.stream("GET", "/"):
+        assert transport.get_stats()["requests_in_flight"] == 1
+        assert transport.get_stats()["active_connections"] == 1
+    assert transport.get_stats()["requests_in_flight"] == 0
+
+
+def test_async_transport(base_url):
+    """The async transport pools and tracks requests the same way"""
+    transport = http_pool.AsyncPooledTransport("test_async", HttpPoolConfig())
+
+    async def run():
+        client = httpx.AsyncClient(base_url=base_url, transport=transport)
+        responses = await asyncio.gather(*[client.get("/") for _ in range(3)])
+        assert all(response.status_code == 200 for response in responses)
+        assert transport.get_stats()["requests_in_flight"] == 0
+        await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_closing_a_client_keeps_the_shared_pool(base_url):
+    """Clients closing or leaving a with block leave the pool open for the others"""
+    transport = http_pool.PooledTransport("test_close", HttpPoolConfig())
+    with httpx.Client(base_url=base_url, transport=transport) as client:
+        client.get("/")
+    client = httpx.Client(base_url=base_url, transport=transport)
+    client.get("/")
+    client.close()
+
+    assert transport.get_stats()["idle_connections"] == 1
+    assert httpx.Client(base_url=base_url, transport=transport).get("/").json() == []
+
+
+def test_closing_an_async_client_keeps_the_shared_pool(base_url):
+    """The async transport survives aclose & async with the same way"""
+    transport = http_pool.AsyncPooledTransport("test_async_close", HttpPoolConfig())
+
+    async def run():
+        async with httpx.AsyncClient(base_url=base_url, transport=transport) as client:
+            await client.get("/")
+        client = httpx.AsyncClient(base_url=base_url, transport=transport)
+        await client.get("/")
+        await client.aclose()
+        client = httpx.AsyncClient(base_url=base_url, transport=transport)
+        return await client.get("/")
+
+    assert asyncio.run(run()).json() == []
+    assert transport.get_stats()["idle_connections"] == 1
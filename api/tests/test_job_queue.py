@@ -0,0 +1,66 @@
+import datetime
+
+import pytest
+from src.job_queue import SQLiteJobQueue, SupabaseJobQueue, get_run_id
+from src.types.job_queue import JobStatus
+from src.types.update_pipeline import ExeType
+from tests.supabase_stub import StubClient
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def make_queue(request, tmp_path, monkeypatch):
+    """Build queues over the same store, a second one stands in for a restart"""
+    if request.param == "sqlite":
+        path = str(tmp_path / "jobs.db")
+        return lambda: SQLiteJobQueue(path)
+    # pages smaller than the run, so listing it takes several requests
+    client = StubClient(max_rows=2)
+    monkeypatch.setattr(SupabaseJobQueue, "page_size", 2)
+    return lambda: SupabaseJobQueue(client)
+
+
+def test_enqueue_is_idempotent(make_queue):
+    """Re-enqueueing a run leaves existing job state untouched"""
+    queue = make_queue()
+    queue.enqueue("run", [1, 2, 3], ExeType.NEW_WEEK)
+    queue.mark_running("run", 1)
+    queue.mark_succeeded("run", 1)
+    queue.enqueue("run", [1, 2, 3, 4], ExeType.NEW_WEEK)
+
+    counts = queue.get_status_counts("run")
+    assert counts[JobStatus.SUCCEEDED] == 1
+    assert counts[JobStatus.PENDING] == 3
+
+
+def test_resume_after_crash(make_queue):
+    """A fresh queue on the same store resumes pending and interrupted jobs"""
+    queue = make_queue()
+    queue.enqueue("run", [1, 2, 3], ExeType.MID_WEEK)
+    queue.mark_running("run", 1)
+    queue.mark_succeeded("run", 1)
+    queue.mark_running("run", 2)
+
+    resumed = make_queue()
+    assert resumed.get_resumable_athlete_ids("run") == {2, 3}
+
+
+def test_retry_failed(make_queue):
+    """Only failed jobs with attempts remaining are reset to pending"""
+    queue = make_queue()
+    queue.enqueue("run", [1, 2], ExeType.NEW_WEEK)
+    for _ in range(3):
+        queue.mark_running("run", 1)
+        queue.mark_failed("run", 1, error="strava timeout")
+    queue.mark_running("run", 2)
+    queue.mark_failed("run", 2, error="llm error")
+
+    assert queue.retry_failed("run", max_attempts=3) == [2]
+    [job] = queue.list_jobs("run", statuses=[JobStatus.FAILED])
+    assert job.athlete_id == 1
+    assert job.attempts == 3
+    assert job.last_error == "strava timeout"
+
+
+def test_get_run_id():
+    dt = datetime.datetime(2024, 11, 17, 20, 30)
+    assert get_run_id(ExeType.NEW_WEEK, dt) == "new_week:2024-11-17"
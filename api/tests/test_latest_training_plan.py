@@ -0,0 +1,134 @@
+import pathlib
+import re
+import sqlite3
+
+import pytest
+from src import supabase_client
+from src.types.training_plan import TrainingPlan
+from tests.supabase_stub import StubClient
+
+MIGRATION = (
+    pathlib.Path(__file__).parent.parent / "migrations" / "003_latest_training_plan.sql"
+)
+VIEW = re.compile(
+    r"create or replace view (\w+)\s+with \(([^)]*)\)\s+as\s+(.*?);", re.DOTALL
+)
+
+
+def parse_views():
+    """{view name: (options, select)} of the views migration 003 creates"""
+    return {
+        name: (options, select)
+        for name, options, select in VIEW.findall(MIGRATION.read_text())
+    }
+
+
+def test_views_run_as_the_querying_role():
+    """Both views keep the tables' row level security in force"""
+    views = parse_views()
+    assert set(views) == {"latest_training_plan", "test_latest_training_plan"}
+    for options, _ in views.values():
+        assert options == "security_invoker = on"
+
+
+@pytest.fixture
+def conn():
+    """
+    SQLite stand-in for the Postgres training_plan tables with the views of
+    migration 003, whose selects stick to SQL both databases run
+    """
+    conn = sqlite3.connect(":memory:")
+    for table in ("training_plan", "test_training_plan"):
+        conn.execute(
+            f"""
+            CREATE TABLE {table} (
+                athlete_id INTEGER NOT NULL,
+                plan_id TEXT NOT NULL,
+                week_number INTEGER NOT NULL,
+                total_distance REAL NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+    # the selects as written, SQLite has neither "or replace" nor view options
+    for name, (_, select) in parse_views().items():
+        conn.execute(f"CREATE VIEW {name} AS {select}")
+    return conn
+
+
+def insert_plan(conn, athlete_id, plan_id, created_at, n_weeks):
+    conn.executemany(
+        "INSERT INTO training_plan VALUES (?, ?, ?, ?, ?)",
+        [
+            (athlete_id, plan_id, week_number, 20.0 + week_number, created_at)
+            for week_number in reversed(range(1, n_weeks + 1))
+        ],
+    )
+
+
+def select_latest_plan(conn, athlete_id):
+    # the query get_training_plan sends through PostgREST
+    return conn.execute(
+        """
+        SELECT plan_id, week_number FROM latest_training_plan
+        WHERE athlete_id = ? ORDER BY week_number
+        """,
+        (athlete_id,),
+    ).fetchall()
+
+
+def test_latest_plan_weeks_in_order(conn):
+    """Only the weeks of the plan created last are returned, by week_number"""
+    insert_plan(conn, 1, "old", "2026-09-06T00:00:00+00:00", n_weeks=20)
+    insert_plan(conn, 1, "new", "2026-09-13T00:00:00+00:00", n_weeks=19)
+    insert_plan(conn, 2, "other", "2026-09-20T00:00:00+00:00", n_weeks=3)
+
+    rows = select_latest_plan(conn, 1)
+    assert rows == [("new", week_number) for week_number in range(1, 20)]
+    assert select_latest_plan(conn, 2) == [("other", 1), ("other", 2), ("other", 3)]
+
+
+def test_no_plan(conn):
+    """Athletes without a plan get no rows"""
+    assert select_latest_plan(conn, 1) == []
+
+
+def view_row(athlete_id, plan_id, week_number):
+    return {
+        "athlete_id": athlete_id,
+        "plan_id": plan_id,
+        "week_start_date": "2026-10-19",
+        "week_number": week_number,
+        "n_weeks_until_race": 20 - week_number,
+        "week_type": "build",
+        "notes": "notes",
+        "total_distance": 20.0 + week_number,
+        "long_run_distance": 10.0,
+    }
+
+
+def test_get_training_plan_reads_the_view(monkeypatch):
+    """get_training_plan makes one request to the view, weeks in order"""
+    monkeypatch.delenv("TEST_FLAG", raising=False)
+    rows = [view_row(1, "new", week_number) for week_number in (3, 1, 2)]
+    rows.append(view_row(2, "other", 4))
+    stub = StubClient({"latest_training_plan": rows})
+    monkeypatch.setattr(supabase_client, "client", stub)
+
+    training_plan = supabase_client.get_training_plan(1)
+
+    weeks = training_plan.training_plan_weeks
+    assert [week.week_number for week in weeks] == [1, 2, 3]
+    assert [week.total_distance for week in weeks] == [21.0, 22.0, 23.0]
+    assert list(stub.tables) == ["latest_training_plan"]
+    assert stub.tables["latest_training_plan"].requests == 1
+
+
+def test_get_training_plan_without_plan(monkeypatch):
+    """Athletes without a plan get an empty TrainingPlan"""
+    monkeypatch.setenv("TEST_FLAG", "true")
+    stub = StubClient({"latest_training_plan": [view_row(1, "prod", 1)]})
+    monkeypatch.setattr(supabase_client, "client", stub)
+
+    assert supabase_client.get_training_plan(1) == TrainingPlan()
+    assert list(stub.tables) == ["test_latest_training_plan"]
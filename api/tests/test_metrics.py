@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src import concurrency, metrics
+from src.types.update_pipeline import ExeType
+
+
+def test_histogram_buckets_and_render():
+    histogram = metrics.Histogram(
+        "test_seconds", "Test durations", ("stage",), buckets=(0.1, 1.0)
+    )
+    histogram.observe(0.05, "fetch")
+    histogram.observe(0.5, "fetch")
+    histogram.observe(5.0, "fetch")
+
+    assert histogram.snapshot() == {("fetch",): (3, 5.55)}
+    rendered = histogram.render()
+    assert 'test_seconds_bucket{stage="fetch",le="0.1"} 1' in rendered
+    assert 'test_seconds_bucket{stage="fetch",le="1.0"} 2' in rendered
+    assert 'test_seconds_bucket{stage="fetch",le="+Inf"} 3' in rendered
+    assert 'test_seconds_count{stage="fetch"} 3' in rendered
+
+
+def test_timer_tags_exe_type():
+    with metrics.track_run() as run_stages:
+        with metrics.track_exe_type(ExeType.MID_WEEK), metrics.timer("upsert"):
+            pass
+        with metrics.timer("upsert"):
+            pass
+
+    assert set(run_stages.snapshot()) == {("upsert", "mid_week"), ("upsert", "none")}
+
+
+def test_concurrent_runs_summarize_only_their_own_stages():
+    """Stages timed by a concurrent run, even on pool threads, stay out of a run's summary"""
+    both_timed = threading.Barrier(2)
+
+    def run(stage: str, n_users: int) -> metrics.Histogram:
+        def update_user(_):
+            with metrics.timer(stage):
+                pass
+
+        with metrics.track_run() as run_stages:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(concurrency.propagate(update_user), range(n_users)))
+            both_timed.wait()
+        return run_stages
+
+    with ThreadPoolExecutor(max_workers=2) as runs:
+        first = runs.submit(run, "first_stage", 3)
+        second = runs.submit(run, "second_stage", 5)
+
+    assert first.result().snapshot().keys() == {("first_stage", "none")}
+    assert first.result().snapshot()[("first_stage", "none")][0] == 3
+    assert second.result().snapshot()[("second_stage", "none")][0] == 5
+    summary = metrics.summarize_stages(first.result().snapshot())
+    assert summary.startswith("first_stage[none] n=3 ")
+    assert "second_stage" not in summary
+
+
+def test_summarize_without_stages():
+    with metrics.track_run() as run_stages:
+        pass
+    assert metrics.summarize_stages(run_stages.snapshot()) == "no stages recorded"
@@ -0,0 +1,244 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from src import (
+    activities,
+    auth_manager,
+    email_manager,
+    mileage_recommendation,
+    supabase_client,
+    supabase_helpers,
+    update_pipeline,
+    utils,
+)
+from src.main import app
+from src.types.job_queue import JobStatus, RefreshJobRow
+from src.types.mileage_recommendation import MileageRecommendation
+from src.types.training_week import FullTrainingWeek, TrainingWeek
+from src.types.update_pipeline import ExeType
+from src.types.user import Preferences, RaceDistance, UserRow
+from tests.helpers import get_random_activities
+from tests.supabase_stub import StubClient
+
+NOW = datetime.datetime(2024, 2, 14, 20)
+LAST_SUNDAY = datetime.datetime(2024, 2, 11)
+START_DATE = NOW - datetime.timedelta(weeks=53)
+DAILY_ACTIVITY = activities.aggregate_daily_activity(
+    activities.add_missing_dates(
+        [
+            activity
+            for activity in get_random_activities(n_weeks=60, seed=3)
+            if START_DATE <= activity.start_date_local <= NOW
+        ],
+        start_date=START_DATE,
+        end_date=NOW,
+    )
+)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """
+    Refresh pipeline over a stubbed database, Strava history and LLM, returns
+    the stub client and the list of LLM calls made
+    """
+    client = StubClient()
+    aclient = client.as_async()
+    llm_calls = []
+
+    async def get_async_client():
+        return aclient
+
+    def fetch_daily_activity(user, dt, num_weeks=52):
+        return activities.slice_daily_activity(DAILY_ACTIVITY, dt, num_weeks)
+
+    async def fetch_daily_activity_async(user, dt, num_weeks=52):
+        return fetch_daily_activity(user, dt, num_weeks)
+
+    async def get_or_gen_mileage_recommendation_async(user, exe_type, dt):
+        return MileageRecommendation(thoughts="steady", total_volume=30, long_run=10)
+
+    def update_training_week(user, exe_type, dt, **kwargs):
+        llm_calls.append(exe_type)
+        return FullTrainingWeek(
+            past_training_week=[], future_training_week=TrainingWeek()
+        )
+
+    async def update_training_week_async(user, exe_type, dt, **kwargs):
+        return update_training_week(user, exe_type, dt, **kwargs)
+
+    monkeypatch.setattr(supabase_client, "client", client)
+    monkeypatch.setattr(supabase_client, "get_async_client", get_async_client)
+    monkeypatch.setattr(utils, "datetime_now_est", lambda: NOW)
+    monkeypatch.setattr(utils, "get_last_sunday", lambda: LAST_SUNDAY)
+    monkeypatch.setattr(update_pipeline, "fetch_daily_activity", fetch_daily_activity)
+    monkeypatch.setattr(
+        update_pipeline, "fetch_daily_activity_async", fetch_daily_activity_async
+    )
+    monkeypatch.setattr(
+        mileage_recommendation,
+        "get_or_gen_mileage_recommendation_async",
+        get_or_gen_mileage_recommendation_async,
+    )
+    monkeypatch.setattr(update_pipeline, "_update_training_week", update_training_week)
+    monkeypatch.setattr(
+        update_pipeline, "_update_training_week_async", update_training_week_async
+    )
+    return client, llm_calls
+
+
+def refresh(user: UserRow, job_id: str) -> None:
+    asyncio.run(update_pipeline.refresh_training_weeks_async(user, job_id))
+
+
+def test_identical_refresh_skips_llm(pipeline):
+    """A second refresh over unchanged inputs makes no LLM calls"""
+    client, llm_calls = pipeline
+    user = UserRow(athlete_id=1)
+
+    refresh(user, "first")
+    assert llm_calls == ["new_week", "mid_week"]
+
+    llm_calls.clear()
+    refresh(user, "second")
+    assert llm_calls == []
+    training_weeks = client.rows[supabase_helpers.get_training_week_table_name()]
+    assert [row["exe_type"] for row in training_weeks] == ["new_week", "mid_week"]
+
+
+def test_new_week_change_rewrites_mid_week(pipeline):
+    """A regenerated new week is followed by a mid-week row, even if unchanged"""
+    _, llm_calls = pipeline
+    user = UserRow(athlete_id=1)
+    refresh(user, "first")
+
+    llm_calls.clear()
+    preferences = Preferences(race_distance=RaceDistance.MARATHON)
+    refresh(user.copy(update={"preferences": preferences}), "second")
+    assert llm_calls == ["new_week", "mid_week"]
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_sunday_refresh_then_nightly_new_week(pipeline, monkeypatch, asynchronous):
+    """
+    A Sunday refresh ends on a mid-week row, so the Sunday night run does not
+    match the refresh's new week row and regenerates the week
+    """
+    _, llm_calls = pipeline
+    sunday = datetime.datetime(2024, 2, 11, 20)
+    monkeypatch.setattr(utils, "datetime_now_est", lambda: sunday)
+    monkeypatch.setattr(utils, "get_last_sunday", lambda: LAST_SUNDAY)
+    user = UserRow(athlete_id=1)
+    refresh(user, "sunday")
+    assert llm_calls == ["new_week", "mid_week"]
+
+    llm_calls.clear()
+    if asynchronous:
+        response = asyncio.run(
+            update_pipeline.update_training_week_async(
+                user, ExeType.NEW_WEEK, LAST_SUNDAY
+            )
+        )
+    else:
+        response = update_pipeline.update_training_week(
+            user, ExeType.NEW_WEEK, LAST_SUNDAY
+        )
+    assert response == {"success": True}
+    assert llm_calls == ["new_week"]
+
+
+def test_unchanged_nightly_run_is_skipped(pipeline):
+    """A nightly run matching the latest row of its exe_type is skipped"""
+    _, llm_calls = pipeline
+    user = UserRow(athlete_id=1)
+    update_pipeline.update_training_week(user, ExeType.NEW_WEEK, LAST_SUNDAY)
+
+    response = update_pipeline.update_training_week(user, ExeType.NEW_WEEK, LAST_SUNDAY)
+    assert response == {"success": True, "skipped": True}
+    assert llm_calls == ["new_week"]
+
+
+def get_refresh_job(client: StubClient, job_id: str) -> RefreshJobRow:
+    [row] = [
+        row
+        for row in client.rows[supabase_helpers.get_refresh_job_table_name()]
+        if row["job_id"] == job_id
+    ]
+    return RefreshJobRow(**row)
+
+
+def test_refresh_job_records_progress(pipeline):
+    client, _ = pipeline
+    refresh(UserRow(athlete_id=1), "job")
+
+    job = get_refresh_job(client, "job")
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.progress == 1.0
+    assert job.error is None
+
+
+def test_failed_refresh_job(pipeline, monkeypatch):
+    """A failing step marks the job failed with its error and sends an alert"""
+    client, _ = pipeline
+    alerts = []
+
+    async def fetch_daily_activity_async(user, dt, num_weeks=52):
+        raise RuntimeError("strava unavailable")
+
+    monkeypatch.setattr(
+        update_pipeline, "fetch_daily_activity_async", fetch_daily_activity_async
+    )
+    monkeypatch.setattr(
+        email_manager, "send_alert_email", lambda **kwargs: alerts.append(kwargs)
+    )
+    refresh(UserRow(athlete_id=1), "job")
+
+    job = get_refresh_job(client, "job")
+    assert job.status == JobStatus.FAILED
+    assert job.steps_completed == 0
+    assert job.error == "strava unavailable"
+    assert len(alerts) == 1
+
+
+def test_refresh_job_timestamps():
+    """updated_at is set when each row is built, not when the module is imported"""
+    first = RefreshJobRow(job_id="first", athlete_id=1)
+    second = RefreshJobRow(job_id="second", athlete_id=1)
+    assert first.updated_at <= second.updated_at
+    assert datetime.datetime.now(datetime.timezone.utc) - second.updated_at < (
+        datetime.timedelta(seconds=5)
+    )
+
+
+@pytest.fixture
+def api(pipeline):
+    """Client of the app authenticated as athlete 1"""
+    app.dependency_overrides[auth_manager.validate_user] = lambda: UserRow(athlete_id=1)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_refresh_endpoints(api):
+    """/refresh/ runs the job in the background, its status is polled by job_id"""
+    response = api.post("/refresh/")
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+
+    response = api.get(f"/refresh/{job_id}/")
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": True,
+        "job_id": job_id,
+        "status": "succeeded",
+        "progress": 1.0,
+        "error": None,
+    }
+
+
+def test_refresh_status_of_unknown_or_other_athletes_job(api):
+    supabase_client.upsert_refresh_job(RefreshJobRow(job_id="other", athlete_id=2))
+
+    assert api.get("/refresh/unknown/").status_code == 404
+    assert api.get("/refresh/other/").status_code == 404
@@ -0,0 +1,56 @@
+import asyncio
+import sys
+import time
+
+import pytest
+from src import replay
+from src.types.replay import LatencyConfig, ReplayMode
+from src.types.update_pipeline import Stage
+
+calls = []
+
+
+def get_row(athlete_id: int, limit: int = 1) -> dict:
+    calls.append(athlete_id)
+    return {"athlete_id": athlete_id, "n": len(calls)}
+
+
+async def get_completion_async(message: str) -> str:
+    calls.append(message)
+    return message.upper()
+
+
+TARGETS = [
+    (sys.modules[__name__], "get_row", Stage.DB),
+    (sys.modules[__name__], "get_completion_async", Stage.LLM),
+]
+
+
+def test_replay_returns_recorded_responses_offline(tmp_path):
+    path = str(tmp_path / "session.pkl")
+    calls.clear()
+    with replay.session(path, ReplayMode.RECORD, targets=TARGETS):
+        recorded = [get_row(1), get_row(athlete_id=1), get_row(2)]
+        recorded_completion = asyncio.run(get_completion_async("hi"))
+
+    calls.clear()
+    latency = LatencyConfig(db=0.05)
+    with replay.session(path, ReplayMode.REPLAY, latency=latency, targets=TARGETS):
+        start = time.perf_counter()
+        assert [get_row(1, limit=1), get_row(1), get_row(2)] == recorded
+        assert time.perf_counter() - start >= 0.15
+        assert asyncio.run(get_completion_async("hi")) == recorded_completion
+    assert calls == []
+
+
+def test_strict_replay_rejects_unrecorded_calls(tmp_path):
+    path = str(tmp_path / "session.pkl")
+    with replay.session(path, ReplayMode.RECORD, targets=TARGETS):
+        get_row(1)
+
+    with replay.session(path, ReplayMode.REPLAY, targets=TARGETS):
+        with pytest.raises(ValueError):
+            get_row(3)
+
+    with replay.session(path, ReplayMode.REPLAY, strict=False, targets=TARGETS):
+        assert get_row(3)["athlete_id"] == 1
@@ -0,0 +1,26 @@
+import pytest
+from src.sharding import check_shard_coverage, get_shard_index
+from src.types.update_pipeline import ShardSpec
+
+
+def test_shards_cover_every_user_exactly_once():
+    athlete_ids = list(range(10_000, 12_000))
+    shards = check_shard_coverage(athlete_ids, shard_count=8)
+    assert sorted(a for owned in shards.values() for a in owned) == athlete_ids
+    assert all(len(owned) > 0 for owned in shards.values())
+
+
+def test_shard_assignment_is_stable():
+    """Pinned md5 assignments, a change here would move athletes between shards"""
+    assert get_shard_index(98888886, 4) == 3
+    assert get_shard_index(12345678, 4) == 2
+    assert get_shard_index(53210977, 4) == 1
+    assert get_shard_index(98888886, 16) == 15
+    assert get_shard_index(53210977, 16) == 13
+
+
+def test_invalid_shard_spec():
+    with pytest.raises(ValueError):
+        ShardSpec(shard_index=4, shard_count=4)
+    with pytest.raises(ValueError):
+        ShardSpec(shard_index=0, shard_count=0)
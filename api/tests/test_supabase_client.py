@@ -0,0 +1,189 @@
+import asyncio
+import datetime
+
+import pytest
+from src import supabase_client, supabase_helpers
+from src.ttl_cache import TTLCache
+from src.types.training_plan import TrainingPlan, TrainingPlanWeek, WeekType
+from tests.helpers import user_rows
+from tests.supabase_stub import StubClient
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    def install(tables, max_rows=1000):
+        stub = StubClient(tables, max_rows=max_rows)
+        monkeypatch.setattr(supabase_client, "client", stub)
+        return stub
+
+    return install
+
+
+def test_list_athletes_updated_today_is_not_truncated(stub_client, monkeypatch):
+    """More rows than PostgREST's max-rows still yield every athlete updated today"""
+    monkeypatch.delenv("TEST_FLAG", raising=False)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    today = (now - datetime.timedelta(hours=1)).isoformat()
+    yesterday = (now - datetime.timedelta(days=2)).isoformat()
+    rows = [
+        # a new week & a mid-week row for every athlete, in no particular order
+        {"athlete_id": athlete_id, "created_at": today}
+        for athlete_id in reversed(range(1200))
+        for _ in range(2)
+    ] + [{"athlete_id": 5000, "created_at": yesterday}]
+    stub = stub_client({"training_week": rows}, max_rows=1000)
+
+    athlete_ids = supabase_client.list_athletes_updated_today(page_size=500)
+
+    assert athlete_ids == set(range(1200))
+    assert stub.tables["training_week"].requests == 5
+
+
+def test_iter_user_pages_last_page_full(stub_client):
+    """A last page of exactly page_size is followed by one empty page, not yielded"""
+    stub = stub_client({"user": user_rows(range(4))})
+
+    pages = list(supabase_client.iter_user_pages(page_size=2))
+
+    assert [[user.athlete_id for user in page] for page in pages] == [[0, 1], [2, 3]]
+    assert stub.tables["user"].requests == 3
+
+
+def test_iter_user_pages_short_last_page(stub_client):
+    """A page shorter than page_size ends the iteration without another request"""
+    stub = stub_client({"user": user_rows(range(5))})
+
+    pages = list(supabase_client.iter_user_pages(page_size=2))
+
+    assert [[user.athlete_id for user in page] for page in pages] == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+    assert stub.tables["user"].requests == 3
+
+
+def test_iter_user_pages_cursor_advances_on_athlete_id(stub_client, monkeypatch):
+    """Each page starts after the last athlete_id of the previous one"""
+    stub_client({"user": user_rows([42, 7, 19, 3, 88])})
+    cursors = []
+    list_users_page = supabase_client.list_users_page
+
+    def recording_list_users_page(after_athlete_id, **kwargs):
+        cursors.append(after_athlete_id)
+        return list_users_page(after_athlete_id, **kwargs)
+
+    monkeypatch.setattr(supabase_client, "list_users_page", recording_list_users_page)
+    users = list(supabase_client.iter_users(page_size=2))
+
+    assert [user.athlete_id for user in users] == [3, 7, 19, 42, 88]
+    assert cursors == [None, 7, 42]
+
+
+def test_list_users_page_after_athlete_id(stub_client):
+    """Only users past the cursor are returned, in athlete_id order"""
+    stub_client({"user": user_rows([42, 7, 19, 3, 88])})
+
+    page = supabase_client.list_users_page(7, page_size=2)
+
+    assert [user.athlete_id for user in page] == [19, 42]
+
+
+def user_auth_row(athlete_id, refresh_token, device_token):
+    return {
+        "athlete_id": athlete_id,
+        "access_token": "access",
+        "refresh_token": refresh_token,
+        "expires_at": "2026-10-18T00:00:00+00:00",
+        "jwt_token": "jwt",
+        "device_token": device_token,
+        "user_id": "user",
+        "identity_token": None,
+    }
+
+
+def test_user_auth_tokens_are_never_served_from_cache(stub_client, monkeypatch):
+    """Tokens another replica refreshed are read back, device tokens are cached"""
+    monkeypatch.setattr(supabase_client, "device_token_cache", TTLCache(60, 10))
+    stub = stub_client({"user_auth": [user_auth_row(1, "first", "device")]})
+
+    assert supabase_client.get_user_auth(1).refresh_token == "first"
+    assert supabase_client.get_device_token(1) == "device"
+    # written behind this process's back, as by another replica
+    stub.rows["user_auth"][0].update(refresh_token="second", device_token="other")
+
+    assert supabase_client.get_user_auth(1).refresh_token == "second"
+    assert supabase_client.get_device_token(1) == "device"
+    requests = stub.tables["user_auth"].requests
+    assert supabase_client.get_device_token(1) == "device"
+    assert stub.tables["user_auth"].requests == requests
+
+
+def test_missing_device_token_is_cached(stub_client, monkeypatch):
+    """Users without a device token are not looked up on every notification"""
+    monkeypatch.setattr(supabase_client, "device_token_cache", TTLCache(60, 10))
+    stub = stub_client({"user_auth": [user_auth_row(1, "first", None)]})
+
+    assert supabase_client.get_device_token(1) is None
+    assert supabase_client.get_device_token(1) is None
+    assert supabase_client.get_device_token(2) is None
+    assert stub.tables["user_auth"].requests == 2
+
+
+def test_postgrest_sessions_use_the_shared_transports(monkeypatch):
+    """Every postgrest query, sync or async, goes through the pooled transports"""
+    assert supabase_client.client.postgrest.session._transport is (
+        supabase_client.http_transport
+    )
+
+    monkeypatch.setattr(supabase_client, "async_client", None)
+    async_client = asyncio.run(supabase_client.get_async_client())
+    assert async_client.postgrest.session._transport is (
+        supabase_client.async_http_transport
+    )
+
+
+def training_plan(n_weeks):
+    return TrainingPlan(
+        training_plan_weeks=[
+            TrainingPlanWeek(
+                week_start_date=datetime.date(2025, 1, 6)
+                + datetime.timedelta(weeks=week_number),
+                week_number=week_number,
+                n_weeks_until_race=n_weeks - week_number,
+                week_type=WeekType.BUILD,
+                notes="",
+                total_distance=20 + week_number,
+                long_run_distance=8,
+            )
+            for week_number in range(n_weeks)
+        ]
+    )
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_insert_training_plan_is_a_single_insert(
+    stub_client, monkeypatch, asynchronous
+):
+    """Every week goes in one request, under the same plan_id"""
+    stub = stub_client({})
+    table_name = supabase_helpers.get_training_plan_table_name()
+    if asynchronous:
+        stub = stub.as_async()
+        monkeypatch.setattr(supabase_client, "async_client", stub)
+        asyncio.run(supabase_client.insert_training_plan_async(1, training_plan(12)))
+    else:
+        supabase_client.insert_training_plan(1, training_plan(12))
+
+    rows = stub.rows[table_name]
+    assert stub.tables[table_name].requests == 1
+    assert [row["week_number"] for row in rows] == list(range(12))
+    assert {row["athlete_id"] for row in rows} == {1}
+    assert len({row["plan_id"] for row in rows}) == 1
+
+    # the next plan gets a plan_id of its own
+    if asynchronous:
+        asyncio.run(supabase_client.insert_training_plan_async(1, training_plan(1)))
+    else:
+        supabase_client.insert_training_plan(1, training_plan(1))
+    assert len({row["plan_id"] for row in rows}) == 2
@@ -0,0 +1,99 @@
+import datetime
+import math
+import statistics
+
+import numpy as np
+from src.daily_activity import DailyActivity
+from src.training_load import (
+    compute_training_load,
+    stack_daily_distance,
+)
+
+FIRST_DATE = datetime.date(2024, 1, 1)
+
+
+def get_training_load(daily_load: list) -> dict:
+    """Day by day reference over one athlete's list of daily loads"""
+    metrics = {
+        name: []
+        for name in (
+            "acute_load",
+            "chronic_load",
+            "acute_chronic_ratio",
+            "ramp_rate",
+            "monotony",
+            "strain",
+        )
+    }
+    for day in range(len(daily_load)):
+        week = daily_load[day - 6 : day + 1] if day >= 6 else None
+        acute = sum(week) if week else math.nan
+        chronic = sum(daily_load[day - 27 : day + 1]) / 4 if day >= 27 else math.nan
+        previous = sum(daily_load[day - 13 : day - 6]) if day >= 13 else math.nan
+        std = statistics.pstdev(week) if week else math.nan
+        monotony = acute / 7 / std if std > 0 else math.nan
+        metrics["acute_load"].append(acute)
+        metrics["chronic_load"].append(chronic)
+        metrics["acute_chronic_ratio"].append(
+            acute / chronic if chronic > 0 else math.nan
+        )
+        metrics["ramp_rate"].append(
+            (acute - previous) / previous if previous > 0 else math.nan
+        )
+        metrics["monotony"].append(monotony)
+        metrics["strain"].append(acute * monotony)
+    return metrics
+
+
+def test_matches_per_athlete_reference():
+    rng = np.random.default_rng(0)
+    daily_load = np.round(rng.uniform(0, 12, (20, 90)), 2)
+    # rest weeks & blocks of the same run every day
+    daily_load[rng.random(daily_load.shape) < 0.3] = 0
+    daily_load[0, 30:65] = 0
+    daily_load[1, 40:50] = 3.1
+
+    training_load = compute_training_load(daily_load, FIRST_DATE)
+    assert training_load.shape == daily_load.shape
+    for row, athlete_load in enumerate(daily_load.tolist()):
+        for name, expected in get_training_load(athlete_load).items():
+            np.testing.assert_allclose(
+                getattr(training_load, name)[row], expected, rtol=1e-9, err_msg=name
+            )
+
+    # no load for 28 days leaves no chronic load to compare against
+    assert training_load.chronic_load[0, 64] == 0
+    assert np.isnan(training_load.acute_chronic_ratio[0, 64])
+
+
+def test_injury_risk_flags_load_spikes():
+    daily_load = np.zeros((2, 56))
+    daily_load[:, ::2] = 3.0
+    daily_load[1, 49:] = 10.0
+    injury_risk = compute_training_load(daily_load, FIRST_DATE).get_injury_risk()
+    assert not injury_risk[0].any()
+    assert injury_risk[1, -1]
+
+
+def test_stack_daily_distance_aligns_athletes_on_a_calendar():
+    daily_activities = [
+        DailyActivity(
+            first_date,
+            np.full(n_days, 4.0),
+            *[np.zeros(n_days) for _ in range(3)],
+            np.ones(n_days, dtype=np.int64),
+        )
+        for first_date, n_days in (
+            (FIRST_DATE, 10),
+            (FIRST_DATE + datetime.timedelta(days=5), 3),
+        )
+    ]
+    daily_load = stack_daily_distance(
+        daily_activities,
+        start_date=FIRST_DATE + datetime.timedelta(days=2),
+        end_date=FIRST_DATE + datetime.timedelta(days=11),
+    )
+    assert daily_load.tolist() == [
+        [4.0] * 8 + [0.0] * 2,
+        [0.0] * 3 + [4.0] * 3 + [0.0] * 4,
+    ]
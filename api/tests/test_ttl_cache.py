@@ -0,0 +1,93 @@
+import pytest
+from src.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    """Entries are served until ttl seconds after they were stored"""
+    clock = FakeClock()
+    cache = TTLCache(ttl=60, maxsize=10, clock=clock)
+    cache.set(1, "user")
+
+    clock.now = 59
+    assert cache.get(1) == "user"
+    clock.now = 60
+    assert cache.get(1) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    """Past maxsize, the entry read or written longest ago is evicted"""
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+
+
+def test_get_or_load_reads_through():
+    """Misses are loaded once, invalidation forces a reload"""
+    cache = TTLCache(ttl=60, maxsize=10)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get_or_load("key", load) == 1
+    assert cache.get_or_load("key", load) == 1
+    cache.invalidate("key")
+    assert cache.get_or_load("key", load) == 2
+
+
+def test_get_or_load_does_not_cache_errors():
+    """A failed load leaves nothing behind, the next read retries"""
+    cache = TTLCache(ttl=60, maxsize=10)
+
+    def missing():
+        raise ValueError("Could not find user")
+
+    with pytest.raises(ValueError):
+        cache.get_or_load("key", missing)
+    assert cache.get_or_load("key", lambda: "user") == "user"
+
+
+def test_load_racing_invalidation_is_not_cached():
+    """A value loaded before a concurrent write is returned but not cached"""
+    cache = TTLCache(ttl=60, maxsize=10)
+
+    def stale_load():
+        cache.invalidate("key")
+        return "stale"
+
+    assert cache.get_or_load("key", stale_load) == "stale"
+    assert cache.get("key") is None
+
+
+def test_load_racing_invalidation_after_check_is_not_cached():
+    """Invalidating while a stale load is being stored cannot be lost"""
+    cache = TTLCache(ttl=60, maxsize=10)
+    stored = []
+    store = cache._store
+
+    def racing_store(key, value):
+        # the lock is held, so a concurrent invalidate must wait for the store
+        assert cache._lock.locked()
+        stored.append(value)
+        store(key, value)
+
+    cache._store = racing_store
+    assert cache.get_or_load("key", lambda: "user") == "user"
+    assert stored == ["user"]
@@ -0,0 +1,151 @@
+import asyncio
+import datetime
+import functools
+
+from src import concurrency, job_queue, supabase_client, update_pipeline
+from src.job_queue import SQLiteJobQueue
+from src.types.job_queue import JobStatus
+from src.types.update_pipeline import ConcurrencyConfig, ExeType, Stage
+from src.types.user import UserRow
+from tests.helpers import AsyncTracker, Tracker, user_rows
+from tests.supabase_stub import StubClient
+
+DT = datetime.datetime(2026, 10, 14, 20)
+
+
+def test_worker_pool_and_stage_caps(monkeypatch):
+    """Users fan out over max_workers threads, each stage within its limit"""
+    workers, llm = Tracker(), Tracker()
+
+    @concurrency.limited(Stage.LLM)
+    def call_llm():
+        llm()
+
+    def update_user(user, exe_type, dt):
+        workers()
+        call_llm()
+        return {"success": True}
+
+    monkeypatch.setattr(update_pipeline, "update_training_week_wrapper", update_user)
+    users = [UserRow(athlete_id=athlete_id) for athlete_id in range(20)]
+    responses = update_pipeline.update_users(
+        users,
+        ExeType.MID_WEEK,
+        DT,
+        concurrency_config=ConcurrencyConfig(max_workers=4, llm=2),
+    )
+
+    assert len(responses) == 20
+    assert workers.peak <= 4
+    assert llm.peak <= 2
+
+
+def test_async_gather_and_stage_caps(monkeypatch):
+    """The async fan-out keeps max_workers users in flight, stages within limits"""
+    workers, llm = AsyncTracker(), AsyncTracker()
+
+    async def call_llm():
+        async with concurrency.limit_async(Stage.LLM):
+            await llm()
+
+    async def update_user(user, exe_type, dt):
+        await workers()
+        await call_llm()
+        return {"success": True}
+
+    monkeypatch.setattr(
+        update_pipeline, "update_training_week_wrapper_async", update_user
+    )
+    users = [UserRow(athlete_id=athlete_id) for athlete_id in range(20)]
+    responses = asyncio.run(
+        update_pipeline.update_users_async(
+            users,
+            ExeType.MID_WEEK,
+            DT,
+            concurrency_config=ConcurrencyConfig(max_workers=5, llm=2),
+        )
+    )
+
+    assert len(responses) == 20
+    assert workers.peak <= 5
+    assert llm.peak <= 2
+
+
+def test_iter_run_users_pages(monkeypatch, tmp_path):
+    """Users are enqueued a page at a time, skipped & finished athletes left out"""
+    stub = StubClient({"user": user_rows(range(6))})
+    monkeypatch.setattr(supabase_client, "client", stub)
+    monkeypatch.setattr(
+        supabase_client,
+        "iter_user_pages",
+        functools.partial(supabase_client.iter_user_pages, page_size=2),
+    )
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_queue, "_job_queue", queue)
+    # an earlier attempt at the run already updated athlete 3
+    queue.enqueue("run", [3], ExeType.MID_WEEK)
+    queue.mark_succeeded("run", 3)
+
+    users = update_pipeline.iter_run_users("run", ExeType.MID_WEEK, {1})
+
+    assert next(users).athlete_id == 0
+    assert stub.tables["user"].requests == 1
+    assert [user.athlete_id for user in users] == [2, 4, 5]
+    # pages of exactly page_size end with an empty page
+    assert stub.tables["user"].requests == 4
+    assert {job.athlete_id for job in queue.list_jobs("run")} == {0, 2, 3, 4, 5}
+
+
+def test_async_fan_out_pulls_streamed_users_lazily(monkeypatch):
+    """A streamed user iterator is never more than max_workers users ahead"""
+    produced, finished, lead = [], [], []
+
+    def stream_users():
+        for athlete_id in range(30):
+            lead.append(len(produced) - len(finished))
+            produced.append(athlete_id)
+            yield UserRow(athlete_id=athlete_id)
+
+    async def update_user(user, exe_type, dt):
+        await asyncio.sleep(0.001)
+        finished.append(user.athlete_id)
+        return {"success": True}
+
+    monkeypatch.setattr(
+        update_pipeline, "update_training_week_wrapper_async", update_user
+    )
+    responses = asyncio.run(
+        update_pipeline.update_users_async(
+            stream_users(),
+            ExeType.MID_WEEK,
+            DT,
+            concurrency_config=ConcurrencyConfig(max_workers=4),
+        )
+    )
+
+    assert len(responses) == 30
+    assert sorted(finished) == list(range(30))
+    assert max(lead) <= 4
+
+
+def test_update_all_users_async_records_jobs(monkeypatch, tmp_path):
+    """The nightly run updates every user on the event loop, tracked in the queue"""
+    stub = StubClient({"user": user_rows(range(5))})
+    monkeypatch.setattr(supabase_client, "client", stub)
+    monkeypatch.setattr(supabase_client, "list_athletes_updated_today", lambda: {2})
+    monkeypatch.setattr(update_pipeline.utils, "datetime_now_est", lambda: DT)
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_queue, "_job_queue", queue)
+
+    async def update_user(user, exe_type, dt):
+        return {"success": True}
+
+    monkeypatch.setattr(
+        update_pipeline, "update_training_week_wrapper_async", update_user
+    )
+    response = asyncio.run(update_pipeline.update_all_users_async())
+
+    assert response["n_users"] == 4
+    assert response["n_failed"] == 0
+    counts = queue.get_status_counts(response["run_id"])
+    assert counts[JobStatus.SUCCEEDED] == 4
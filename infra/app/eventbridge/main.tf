@@ -15,7 +15,7 @@ resource "aws_cloudwatch_event_api_destination" "trackflow_daily_destination" {
   connection_arn                   = aws_cloudwatch_event_connection.trackflow_api_connection.arn
   http_method                      = "POST"
   invocation_endpoint             = "${var.api_base_url}/update-all-users/"
-  invocation_rate_limit_per_second = 1
+  invocation_rate_limit_per_second = 10
 }
 
 resource "aws_cloudwatch_event_rule" "trackflow_daily" {
@@ -62,13 +62,26 @@ resource "aws_iam_role_policy" "eventbridge_api_destination" {
 }
 
 resource "aws_cloudwatch_event_target" "trackflow_daily_target" {
+  count     = var.shard_count
   rule      = aws_cloudwatch_event_rule.trackflow_daily.name
-  target_id = "TrackflowDailyTarget"
+  target_id = var.shard_count == 1 ? "TrackflowDailyTarget" : "TrackflowDailyTargetShard${count.index}"
   arn       = aws_cloudwatch_event_api_destination.trackflow_daily_destination.arn
   role_arn  = aws_iam_role.eventbridge_api_destination.arn
 
+  http_target {
+    query_string_parameters = {
+      shard_index = tostring(count.index)
+      shard_count = tostring(var.shard_count)
+    }
+  }
+
   retry_policy {
     maximum_event_age_in_seconds = 3600
     maximum_retry_attempts       = 0
   }
-} 
\ No newline at end of file
+}
+
+moved {
+  from = aws_cloudwatch_event_target.trackflow_daily_target
+  to   = aws_cloudwatch_event_target.trackflow_daily_target[0]
+}
@@ -7,4 +7,9 @@ variable "api_key" {
 variable "api_base_url" {
   description = "Base URL for the API endpoint"
   type        = string
-}
\ No newline at end of file
+}
+variable "shard_count" {
+  description = "Number of shards the nightly update is split into, one API call per shard"
+  type        = number
+  default     = 1
+}
@@ -48,6 +48,7 @@ module "eventbridge" {
   source       = "./eventbridge"
   api_key      = var.api_key
   api_base_url = var.api_base_url
+  shard_count  = var.nightly_shard_count
 }
 
 
@@ -40,4 +40,9 @@ variable "api_key" {
 variable "api_base_url" {
   description = "Base URL for the API endpoint"
   type        = string
-}
\ No newline at end of file
+}
+variable "nightly_shard_count" {
+  description = "Number of shards the nightly update is split across, ideally the ECS task count"
+  type        = number
+  default     = 1
+}